@@ -78,6 +78,8 @@ project = AwsCdkPythonApp(
             ".coverage",
             "htmlcov/",
             ".pytest_cache/",
+            # Cache de configuración de hg_aws_helpers
+            ".cache/",
         ]
     },
     # Configuración de dependencias de producción
@@ -204,6 +206,29 @@ synth_task = project.add_task(
     steps=[TaskStep.exec("cdk synth --context environment=${ENV:-dev}")],
 )
 
+# Tarea para síntesis sin lookups de red (reproduce config/context/<ambiente>.json)
+synth_offline_task = project.add_task(
+    "synth:offline",
+    description="Synthesize CDK app replaying recorded context lookups",
+    steps=[
+        TaskStep.exec(
+            "cdk synth --no-lookups --context environment=${ENV:-dev}"
+        )
+    ],
+)
+
+# Tarea para registrar los lookups de cdk.context.json del ambiente
+context_record_task = project.add_task(
+    "context:record",
+    description="Record CDK context lookups for an environment",
+    steps=[
+        TaskStep.exec(
+            "python -m helpers.hg_aws_helpers.config_context record ${ENV:-dev}"
+        ),
+        TaskStep.exec("python -m helpers.hg_aws_helpers.config_context prune"),
+    ],
+)
+
 # Tarea para deploy con ambiente específico
 deploy_task = project.add_task(
     "deploy:env",
@@ -229,6 +254,17 @@ diff_task = project.add_task(
     steps=[TaskStep.exec("cdk diff --context environment=${ENV:-dev}")],
 )
 
+# Tarea para generar las clases de configuración tipadas desde base.*
+config_types_task = project.add_task(
+    "config:types",
+    description="Generate typed config classes from config/base.*",
+    steps=[
+        TaskStep.exec(
+            f"python -m helpers.hg_aws_helpers.config_codegen config -o src/{module_name}/config_types.py"
+        )
+    ],
+)
+
 # Tareas de documentación
 docs_build_task = project.add_task(
     "docs:build",
@@ -296,6 +332,7 @@ project.add_files_from_dir("skeleton")
 
 # Configuración adicional de archivos
 project.add_git_ignore("*.pyc")
+project.add_git_ignore(".cdk.json.lock")
 project.add_git_ignore("__pycache__/")
 project.add_git_ignore(".env")
 project.add_git_ignore("cdk.out/")
@@ -1,12 +1,43 @@
 """
 HG AWS Helpers - Librería de utilidades reutilizables para AWS CDK
 Versión mejorada con soporte multi-formato y multi-ambiente
+
+Las clases se importan en el primer acceso (PEP 562) para que importar el
+paquete no cargue módulos que la aplicación no usa.
 """
 
-from .config_converter import ConfigConverter
-from .config_loader import ConfigLoader
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .config_cache import ConfigDirectoryIndex
+    from .config_converter import ConfigConverter
+    from .config_loader import ConfigLoader
 
 __version__ = "1.1.0"
 __author__ = "desarrollo-web"
 
-__all__ = ["ConfigLoader", "ConfigConverter"]
+__all__ = ["ConfigLoader", "ConfigConverter", "ConfigDirectoryIndex"]
+
+# Nombre exportado -> módulo que lo define
+_LAZY_EXPORTS = {
+    "ConfigLoader": ".config_loader",
+    "ConfigConverter": ".config_converter",
+    "ConfigDirectoryIndex": ".config_cache",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Importar una clase exportada en su primer acceso"""
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """Incluir las exportaciones diferidas en dir()"""
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,800 @@
+"""
+Micro-benchmarks de ConfigLoader y ConfigConverter
+
+Uso:
+    python benchmark.py
+"""
+
+import os
+import threading
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+import config_backends
+from config_codegen import generate_source, materialize
+from config_converter import ConfigConverter
+from config_environments import EnvironmentGraph, environment_chain
+from config_loader import ConfigLoader, ConfigSection, flatten_paths
+from config_interpolate import resolve_references
+from config_merge import deep_merge
+from config_merkle import MerkleTree, diff_trees
+from config_remote import RemoteLayerCache
+from config_schema import compile_schema, validate_config, validate_environments
+from config_secrets import SecretResolver
+
+
+def sample_config(sections: int = 20, keys: int = 50) -> Dict[str, Any]:
+    """
+    Generar una configuración sintética con secciones anidadas y listas
+
+    Args:
+        sections: Número de secciones de primer nivel
+        keys: Número de claves por sección
+
+    Returns:
+        Dict: Configuración de ejemplo
+    """
+    config: Dict[str, Any] = {
+        "project": {"name": "benchmark", "environment": "dev"},
+        "aws": {"region": "us-east-1", "account_id": "123456789012"},
+        "network": {
+            "vpc_cidr": "10.0.0.0/16",
+            "nat_gateways": 1,
+            "public_subnets": ["10.0.1.0/24", "10.0.2.0/24"],
+            "private_subnets": ["10.0.3.0/24", "10.0.4.0/24"],
+        },
+    }
+    for s in range(sections):
+        config[f"section_{s}"] = {
+            f"key_{k}": {"value": k, "enabled": k % 2 == 0} for k in range(keys)
+        }
+    return config
+
+
+def _time(func: Callable[[], Any], number: int) -> float:
+    """
+    Medir el tiempo medio por llamada en microsegundos
+
+    Args:
+        func: Función a medir
+        number: Número de repeticiones
+
+    Returns:
+        float: Microsegundos por llamada (mejor de 5 rondas)
+    """
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return best / number * 1_000_000
+
+
+def _walk_get(data: Dict[str, Any], key_path: str, default: Any = None) -> Any:
+    """Implementación anterior de ConfigLoader.get(): recorrido por split('.')"""
+    value = data
+    try:
+        for key in key_path.split("."):
+            value = value[key]
+        return value
+    except (KeyError, TypeError):
+        return default
+
+
+def benchmark_get_lookup():
+    """Comparar ConfigLoader.get() con índice plano contra el recorrido anidado"""
+    print("\n=== ConfigLoader.get(): índice plano vs recorrido ===\n")
+
+    loader = ConfigLoader()
+    loader._set_config_data(sample_config())
+    data = loader.config_data
+
+    build = _time(lambda: flatten_paths(data), 20)
+    print(f"Construcción del índice ({len(loader.index)} rutas): {build:.1f} µs")
+
+    paths = ["project.name", "network.vpc_cidr", "section_10.key_25.value"]
+    for path in paths:
+        walk = _time(lambda: _walk_get(data, path), 100_000)
+        indexed = _time(lambda: loader.get(path), 100_000)
+        print(
+            f"{path:<28} recorrido: {walk:.3f} µs  índice: {indexed:.3f} µs  "
+            f"({walk / indexed:.1f}x)"
+        )
+
+    required = paths * 10
+    walk = _time(lambda: [_walk_get(data, k) for k in required], 10_000)
+    indexed = _time(lambda: loader.validate_required_keys(required), 10_000)
+    print(
+        f"validate_required_keys({len(required)} claves) "
+        f"recorrido: {walk:.2f} µs  índice: {indexed:.2f} µs"
+    )
+
+
+class _LegacyConfigSection:
+    """Implementación anterior de ConfigSection: una sección nueva por acceso"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = data or {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name in self._data:
+            value = self._data[name]
+            if isinstance(value, dict):
+                return _LegacyConfigSection(value)
+            return value
+        return _LegacyConfigSection({})
+
+
+def _count_instances(cls: type, func: Callable[[], Any], number: int) -> int:
+    """
+    Contar cuántas instancias de una clase crea una función repetida
+
+    Args:
+        cls: Clase cuyas instancias se cuentan
+        func: Función a medir
+        number: Número de repeticiones
+
+    Returns:
+        int: Número de instancias creadas
+    """
+    created = [0]
+    original_init = cls.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[0] += 1
+        original_init(self, *args, **kwargs)
+
+    cls.__init__ = counting_init
+    try:
+        for _ in range(number):
+            func()
+    finally:
+        cls.__init__ = original_init
+    return created[0]
+
+
+def benchmark_section_access():
+    """Comparar ConfigSection memoizada con la implementación anterior"""
+    print("\n=== ConfigSection: cadenas de atributos ===\n")
+
+    data = {"a": {"b": {"c": {"d": {"e": "valor"}}}}, "network": {"vpc_cidr": "x"}}
+    chains = {
+        "config.network.vpc_cidr": lambda s: s.network.vpc_cidr,
+        "config.a.b.c.d.e": lambda s: s.a.b.c.d.e,
+        "config.missing.key.value": lambda s: s.missing.key.value,
+    }
+
+    for label, chain in chains.items():
+        legacy = _LegacyConfigSection(data)
+        current = ConfigSection(data)
+        chain(current)
+
+        t_legacy = _time(lambda: chain(legacy), 100_000)
+        t_current = _time(lambda: chain(current), 100_000)
+        n_legacy = _count_instances(_LegacyConfigSection, lambda: chain(legacy), 10_000)
+        n_current = _count_instances(ConfigSection, lambda: chain(current), 10_000)
+        print(
+            f"{label:<26} anterior: {t_legacy:.3f} µs / {n_legacy} secciones  "
+            f"actual: {t_current:.3f} µs / {n_current} secciones (10k accesos)"
+        )
+
+
+def benchmark_materialized_access():
+    """Comparar ConfigSection con las clases generadas por config_codegen"""
+    print("\n=== Clases generadas: acceso a atributos ===\n")
+
+    data = sample_config()
+    namespace: Dict[str, Any] = {"__name__": "config_types"}
+    exec(generate_source(data), namespace)
+    config_cls = namespace["Config"]
+
+    section = ConfigSection(data)
+    start = time.perf_counter()
+    typed = materialize(data, config_cls)
+    first = (time.perf_counter() - start) * 1000
+    warm = _time(lambda: materialize(data, config_cls), 10) / 1000
+    print(
+        f"Materialización ({len(flatten_paths(data))} rutas): "
+        f"primera {first:.2f} ms, siguientes {warm:.2f} ms"
+    )
+
+    chains = {
+        "config.network.nat_gateways": lambda c: c.network.nat_gateways,
+        "config.section_3.key_7.value": lambda c: c.section_3.key_7.value,
+    }
+    for label, chain in chains.items():
+        chain(section)
+        t_section = _time(lambda: chain(section), 100_000)
+        t_typed = _time(lambda: chain(typed), 100_000)
+        print(
+            f"{label:<30} ConfigSection: {t_section:.3f} µs  "
+            f"generada: {t_typed:.3f} µs"
+        )
+
+
+def _legacy_deep_merge(base: Dict, update: Dict) -> Dict:
+    """Implementación anterior de _deep_merge: copia cada nivel fusionado"""
+    result = base.copy()
+    for key, value in update.items():
+        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = _legacy_deep_merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def _retained(build: Callable[[], List[Any]]) -> int:
+    """
+    Medir la memoria retenida por los objetos que construye una función
+
+    Args:
+        build: Función que devuelve los objetos a retener
+
+    Returns:
+        int: Bytes asignados que siguen vivos al terminar
+    """
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def benchmark_merge_memory(environments: int = 14):
+    """Medir memoria y tiempo de fusionar N ambientes sobre una base grande"""
+    print(f"\n=== Fusión de {environments} ambientes sobre una base grande ===\n")
+
+    base = sample_config(sections=40, keys=200)
+    base["tags"] = {f"Tag{i}": f"valor-{i}" for i in range(5000)}
+    deltas = [
+        {
+            "project": {"environment": f"env{n}"},
+            "network": {"nat_gateways": n},
+            f"section_{n}": {"key_1": {"value": -n}},
+            # Delta que repite valores de la base (sin cambios reales)
+            "tags": {"Tag1": "valor-1"},
+        }
+        for n in range(environments)
+    ]
+
+    base_size = _retained(lambda: [sample_config(sections=40, keys=200)])
+    print(f"Base: {base_size / 1024:.0f} KiB")
+
+    for label, merge in (("anterior", _legacy_deep_merge), ("compartida", deep_merge)):
+        retained = _retained(lambda: [merge(base, d) for d in deltas])
+        elapsed = _time(lambda: [merge(base, d) for d in deltas], 200)
+        print(
+            f"{label:<11} memoria: {retained / 1024:.1f} KiB  "
+            f"tiempo: {elapsed:.1f} µs"
+        )
+
+
+def _nested_merge_by_key(base: List[Any], update: List[Any], key: str) -> List[Any]:
+    """Fusión por clave con búsqueda lineal por elemento (referencia cuadrática)"""
+    result = list(base)
+    for item in update:
+        for position, existing in enumerate(result):
+            if existing.get(key) == item.get(key):
+                result[position] = {**existing, **item}
+                break
+        else:
+            result.append(item)
+    return result
+
+
+def benchmark_list_merge():
+    """Comparar la fusión de listas por clave con índice hash y con búsqueda lineal"""
+    print("\n=== Fusión de listas por clave (merge_strategies) ===\n")
+
+    for size in (1_000, 5_000, 50_000):
+        rules = [
+            {"id": f"rule-{i}", "cidr": f"10.{i % 256}.0.0/16"} for i in range(size)
+        ]
+        base = {
+            "merge_strategies": {"allowlist": {"strategy": "merge", "key": "id"}},
+            "allowlist": rules,
+        }
+        # Una capa que ajusta una de cada diez reglas y añade otras tantas
+        changes = [{"id": f"rule-{i}", "cidr": "0.0.0.0/0"} for i in range(0, size, 10)]
+        changes += [{"id": f"new-{i}", "cidr": "10.0.0.0/8"} for i in range(size // 10)]
+        update = {"allowlist": changes}
+
+        indexed = _time(lambda: deep_merge(base, update), 5) / 1000
+        line = f"{size:>7} elementos  índice hash: {indexed:>8.2f} ms"
+        if size <= 5_000:
+            nested = _time(lambda: _nested_merge_by_key(rules, changes, "id"), 1)
+            line += f"  búsqueda lineal: {nested / 1000:>8.2f} ms"
+        print(line)
+
+
+REALISTIC_TOML = """
+[project]
+name = "proyecto-ejemplo"
+description = "Proyecto CDK generado desde plantilla Projen_HG"
+version = "1.0.0"
+owner = "Equipo DevOps"
+
+[aws]
+region = "us-east-1"
+account_id = "123456789012"
+
+[network]
+vpc_cidr = "10.0.0.0/16"
+public_subnets = ["10.0.1.0/24", "10.0.2.0/24"]
+private_subnets = ["10.0.3.0/24", "10.0.4.0/24"]
+nat_gateways = 1
+
+[compute]
+instance_type = "t3.micro"
+min_capacity = 1
+max_capacity = 3
+
+[database]
+engine = "mysql"
+instance_class = "db.t3.small"
+allocated_storage = 20
+backup_retention_days = 7
+
+[[storage.lifecycle_rules]]
+prefix = "logs/"
+expiration_days = 30
+
+[[storage.lifecycle_rules]]
+prefix = "tmp/"
+expiration_days = 7
+
+[tags]
+Environment = "base"
+Project = "proyecto-ejemplo"
+ManagedBy = "CDK"
+"""
+
+
+def benchmark_backends():
+    """Comparar los backends de lectura en una configuración real y una de 10k claves"""
+    print("\n=== Backends de parseo por formato ===\n")
+
+    documents = {
+        "realista": config_backends.loads("toml", REALISTIC_TOML),
+        "10k claves": sample_config(sections=100, keys=100),
+    }
+
+    for label, data in documents.items():
+        for format_type in ("toml", "json", "yaml"):
+            content = config_backends.dumps(format_type, data)
+            number = 2000 if label == "realista" else 3
+            results = []
+            for name in config_backends.available_backends(format_type):
+                config_backends.pin_backend(format_type, name, config_backends.READ)
+                elapsed = _time(
+                    lambda: config_backends.loads(format_type, content), number
+                )
+                results.append(f"{name}: {elapsed / 1000:.3f} ms")
+            config_backends.unpin_backend(format_type)
+            print(f"{label:<10} {format_type:<5} " + "  ".join(results))
+
+
+def _concurrent_loads(
+    config_dir: Path, threads: int, load: Callable[[ConfigLoader], Any]
+) -> float:
+    """
+    Lanzar cargas simultáneas de la misma configuración
+
+    Args:
+        config_dir: Directorio de configuración
+        threads: Número de hilos
+        load: Función de carga a ejecutar en cada hilo
+
+    Returns:
+        float: Milisegundos hasta que terminan todos los hilos
+    """
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        loader = ConfigLoader(config_dir=str(config_dir), environment="dev")
+        barrier.wait()
+        load(loader)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return (time.perf_counter() - start) * 1000
+
+
+def _legacy_load(loader: ConfigLoader) -> Dict[str, Any]:
+    """Carga anterior: consultar el cache y, si falta, parsear sin coordinación"""
+    config_path = loader._resolve_config_path()
+    cache_key = loader._cache_key(config_path)
+    data = ConfigLoader._cache.get(cache_key)
+    if data is None:
+        data = loader._load_uncached(config_path)
+        ConfigLoader._cache.put(cache_key, data)
+    return data
+
+
+def benchmark_single_flight(threads: int = 16):
+    """Comparar parseos duplicados con y sin carga single-flight"""
+    print(f"\n=== Carga concurrente desde {threads} hilos ===\n")
+
+    with TemporaryDirectory() as temp_dir:
+        config_dir = Path(temp_dir)
+        data = sample_config(sections=40, keys=100)
+        (config_dir / "proyecto.json").write_text(
+            config_backends.dumps("json", data), encoding="utf-8"
+        )
+        (config_dir / "env.dev.toml").write_text(
+            "[network]\nnat_gateways = 2\n", encoding="utf-8"
+        )
+
+        def legacy(loader: ConfigLoader):
+            loader.config_file = "proyecto.json"
+            _legacy_load(loader)
+
+        def single_flight(loader: ConfigLoader):
+            loader.load_config("proyecto.json")
+
+        for label, load in (("anterior", legacy), ("single-flight", single_flight)):
+            parses = [0]
+            merge_layers = ConfigLoader._merge_layers
+
+            def counting_merge(loader, layers):
+                parses[0] += 1
+                return merge_layers(loader, layers)
+
+            ConfigLoader.clear_cache()
+            ConfigLoader._merge_layers = counting_merge
+            try:
+                elapsed = _concurrent_loads(config_dir, threads, load)
+            finally:
+                ConfigLoader._merge_layers = merge_layers
+            stats = ConfigLoader.cache_stats()
+            print(
+                f"{label:<14} fusiones: {parses[0]:>2}  tiempo: {elapsed:.1f} ms  "
+                f"misses: {stats['misses']}  compartidas: {stats['coalesced']}"
+            )
+        ConfigLoader.clear_cache()
+
+
+def _sample_model(sections: int, keys: int, typed_dict: bool = False) -> Any:
+    """
+    Construir un modelo pydantic equivalente a sample_config()
+
+    Args:
+        sections: Número de secciones de primer nivel
+        keys: Número de claves por sección
+        typed_dict: Describir las secciones con TypedDict en lugar de BaseModel
+
+    Returns:
+        Modelo pydantic de la configuración
+    """
+    from pydantic import BaseModel, create_model
+    from typing_extensions import TypedDict
+
+    class Network(BaseModel):
+        vpc_cidr: str
+        nat_gateways: int
+        public_subnets: List[str]
+        private_subnets: List[str]
+
+    if typed_dict:
+        entry: Any = TypedDict("Entry", {"value": int, "enabled": bool})
+        section: Any = TypedDict("Section", {f"key_{k}": entry for k in range(keys)})
+    else:
+        entry = create_model("Entry", value=(int, ...), enabled=(bool, ...))
+        section = create_model(
+            "Section", **{f"key_{k}": (entry, ...) for k in range(keys)}
+        )
+
+    fields: Dict[str, Any] = {
+        "project": (Dict[str, str], ...),
+        "aws": (Dict[str, str], ...),
+        "network": (Network, ...),
+    }
+    fields.update({f"section_{s}": (section, ...) for s in range(sections)})
+    return create_model("SampleConfig", **fields)
+
+
+def benchmark_schema_validation(environments: int = 14):
+    """Medir la validación con esquema frente a validate_required_keys()"""
+    print(f"\n=== Validación con esquema ({environments} ambientes) ===\n")
+
+    data = sample_config()
+    loader = ConfigLoader()
+    loader._set_config_data(data)
+    required = list(flatten_paths(data))
+    configs = {f"env_{i}": data for i in range(environments)}
+    print(f"Configuración: {len(required)} rutas")
+    print(
+        f"{'validate_required_keys':<24} "
+        f"{_time(lambda: loader.validate_required_keys(required), 20) / 1000:>6.2f} ms"
+    )
+
+    for label, typed_dict in (("BaseModel", False), ("TypedDict", True)):
+        model = _sample_model(20, 50, typed_dict)
+        start = time.perf_counter()
+        compile_schema(model)
+        compiled = (time.perf_counter() - start) * 1000
+        single = _time(lambda: validate_config(data, model), 20) / 1000
+        batch = _time(lambda: validate_environments(configs, model), 5) / 1000
+        print(
+            f"{label:<24} compilación: {compiled:.1f} ms  "
+            f"1 ambiente: {single:.2f} ms  lote: {batch:.2f} ms"
+        )
+
+
+def benchmark_convert_directory(files: int = 300):
+    """Comparar la conversión archivo a archivo con convert_directory()"""
+    print(f"\n=== Conversión de {files} archivos TOML a JSON ===\n")
+
+    with TemporaryDirectory() as temp_dir:
+        src = Path(temp_dir) / "src"
+        src.mkdir()
+        content = config_backends.dumps("toml", sample_config(sections=5, keys=20))
+        for i in range(files):
+            (src / f"config-{i}.toml").write_text(content, encoding="utf-8")
+
+        converter = ConfigConverter(config_dir=str(Path(temp_dir) / "serie"))
+        start = time.perf_counter()
+        for input_path in sorted(src.glob("*.toml")):
+            converter.convert_file(str(input_path), "json")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{'convert_file en serie':<30} {elapsed_ms:.0f} ms")
+
+        converter = ConfigConverter(config_dir=str(Path(temp_dir) / "mirror"))
+        for label in ("convert_directory", "convert_directory (sin cambios)"):
+            start = time.perf_counter()
+            result = converter.convert_directory(str(src), "json")
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"{label:<30} {elapsed:.0f} ms  convertidos: {len(result.converted)}  "
+                f"omitidos: {len(result.skipped)}"
+            )
+
+
+def benchmark_interpolation():
+    """Medir que la resolución de referencias escala linealmente"""
+    print("\n=== Interpolación de referencias ${...} ===\n")
+
+    for references in (1_000, 10_000, 100_000):
+        data = sample_config(sections=references // 100, keys=100)
+        for section in range(references // 100):
+            for key in range(100):
+                data[f"section_{section}"][f"key_{key}"]["value"] = (
+                    "${project.name}-${network.vpc_cidr}"
+                    if key % 2
+                    else f"${{section_{section}.key_{key + 1}.value}}"
+                )
+        elapsed = _time(lambda: resolve_references(data), 3)
+        print(
+            f"{references:>7} referencias  {elapsed / 1000:>7.1f} ms  "
+            f"{elapsed / references:.2f} µs/referencia"
+        )
+
+
+def benchmark_diff(environments: int = 14):
+    """Comparar diff con hashes Merkle frente a recorrer todas las rutas"""
+    print("\n=== Comparación entre ambientes (diff) ===\n")
+
+    base = sample_config(sections=50, keys=50)
+    configs = []
+    for env in range(environments):
+        override = {"aws": {"region": f"region-{env}"}, "section_7": {"key_3": {}}}
+        override["section_7"]["key_3"]["value"] = env
+        configs.append(deep_merge(base, override))
+
+    def full_walk():
+        for old in configs:
+            for new in configs:
+                old_paths, new_paths = flatten_paths(old), flatten_paths(new)
+                [
+                    p
+                    for p in old_paths.keys() | new_paths.keys()
+                    if old_paths.get(p) != new_paths.get(p)
+                ]
+
+    start = time.perf_counter()
+    trees = [MerkleTree(config) for config in configs]
+    hashing = (time.perf_counter() - start) * 1000
+
+    def merkle_diff():
+        for old, old_tree in zip(configs, trees):
+            for new, new_tree in zip(configs, trees):
+                diff_trees(old, new, old_tree, new_tree)
+
+    pairs = environments * environments
+    walk = _time(full_walk, 1) / 1000
+    merkle = _time(merkle_diff, 5) / 1000
+    print(f"{'hashes (una vez por ambiente)':<32} {hashing:>8.1f} ms")
+    print(f"{'recorrido completo':<32} {walk:>8.1f} ms  ({pairs} pares)")
+    print(f"{'diff con hashes Merkle':<32} {merkle:>8.1f} ms  ({pairs} pares)")
+
+
+def benchmark_inheritance(leaves: int = 40):
+    """Medir la herencia de ambientes con ancestros compartidos"""
+    print("\n=== Herencia de ambientes (extends) ===\n")
+
+    with TemporaryDirectory() as temp_dir:
+        config_dir = Path(temp_dir)
+        files = {
+            "base.json": config_backends.dumps("json", sample_config(200, 50)),
+            "proyecto.json": '{"project": {"name": "benchmark"}}',
+            "env.staging.json": '{"section_1": {"key_1": {"value": -1}}}',
+            "env.prod.json": '{"extends": "staging", "network": {"nat_gateways": 3}}',
+        }
+        regions = ["us-east-1", "us-west-2", "eu-west-1", "ap-south-1"]
+        for region in regions:
+            files[f"env.prod-{region}.json"] = (
+                f'{{"extends": "prod", "aws": {{"region": "{region}"}}}}'
+            )
+        for index in range(leaves):
+            region = regions[index % len(regions)]
+            files[f"env.prod-{region}-{index}.json"] = (
+                f'{{"extends": "prod-{region}", "section_2": {{"key_2": {index}}}}}'
+            )
+        for name, content in files.items():
+            (config_dir / name).write_text(content, encoding="utf-8")
+
+        loader = ConfigLoader(config_dir=str(config_dir))
+        start = time.perf_counter()
+        configs = loader.load_all_environments("proyecto.json")
+        elapsed = (time.perf_counter() - start) * 1000
+
+        shared = loader._merge_layers(
+            loader._shared_layers(loader._resolve_config_path())
+        )
+        graph = EnvironmentGraph(loader, shared)
+        for environment in configs:
+            graph.resolve(environment)
+        chained = sum(len(environment_chain(e, graph.parent)) for e in configs)
+
+        print(f"{'ambientes':<32} {len(configs)}")
+        print(f"{'load_all_environments':<32} {elapsed:.1f} ms")
+        print(f"{'fusiones sin memoización':<32} {chained}")
+        print(f"{'fusiones con memoización':<32} {graph.merges}")
+
+
+def fake_aws_environment() -> Any:
+    """Credenciales y región ficticias para los benchmarks contra moto"""
+    return mock.patch.dict(
+        os.environ,
+        {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        },
+    )
+
+
+def benchmark_remote_layers(objects: int = 4, parameters: int = 200):
+    """Medir la descarga de capas remotas en frío y con la copia vigente (moto)"""
+    print("\n=== Capas remotas (S3 y SSM contra moto) ===\n")
+
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        print("boto3 o moto no están instalados")
+        return
+
+    with fake_aws_environment(), mock_aws(), TemporaryDirectory() as temp_dir:
+        s3 = boto3.client("s3")
+        s3.create_bucket(Bucket="benchmark")
+        for index in range(objects):
+            content = config_backends.dumps("json", sample_config(20, 50))
+            s3.put_object(Bucket="benchmark", Key=f"layer{index}.json", Body=content)
+        ssm = boto3.client("ssm")
+        for index in range(parameters):
+            ssm.put_parameter(
+                Name=f"/benchmark/section_{index % 10}/key_{index}",
+                Value=str(index),
+                Type="String",
+            )
+
+        calls = {"ssm": 0}
+
+        def client(service: str) -> Any:
+            created = boto3.client(service)
+            created.meta.events.register(
+                "before-call.ssm.GetParametersByPath",
+                lambda **kwargs: calls.__setitem__("ssm", calls["ssm"] + 1),
+            )
+            return created
+
+        cache = RemoteLayerCache(temp_dir, client_factory=client)
+        uris = [f"s3://benchmark/layer{i}.json" for i in range(objects)]
+        uris.append("ssm:/benchmark/")
+
+        start = time.perf_counter()
+        cache.fetch_all(uris)
+        cold = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        statuses = [result.status for result in cache.fetch_all(uris)]
+        warm = (time.perf_counter() - start) * 1000
+
+    print(f"{'capas':<32} {len(uris)} ({parameters} parámetros SSM)")
+    print(f"{'descarga en frío':<32} {cold:.1f} ms")
+    print(f"{'descarga con copia vigente':<32} {warm:.1f} ms")
+    print(f"{'capas sin cambios':<32} {statuses.count('not_modified')}")
+    print(f"{'llamadas GetParametersByPath':<32} {calls['ssm']}")
+
+
+def benchmark_secret_resolution(
+    environments: int = 14, parameters: int = 40, secrets: int = 4
+):
+    """Medir la resolución agrupada de parámetros y secretos (moto)"""
+    print("\n=== Resolución de parámetros y secretos (contra moto) ===\n")
+
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        print("boto3 o moto no están instalados")
+        return
+
+    with fake_aws_environment(), mock_aws():
+        ssm = boto3.client("ssm")
+        for index in range(parameters):
+            ssm.put_parameter(
+                Name=f"/benchmark/p{index}", Value=str(index), Type="String"
+            )
+        manager = boto3.client("secretsmanager")
+        for index in range(secrets):
+            manager.create_secret(
+                Name=f"benchmark/s{index}",
+                SecretString='{"user": "u", "password": "p"}',
+            )
+
+        # Cada ambiente referencia todos los parámetros y dos campos por secreto
+        configs = {
+            f"env{e}": {
+                "params": {f"p{i}": f"ssm:/benchmark/p{i}" for i in range(parameters)},
+                "secrets": {
+                    f"s{i}": {
+                        "user": f"secretsmanager:benchmark/s{i}#user",
+                        "password": f"secretsmanager:benchmark/s{i}#password",
+                    }
+                    for i in range(secrets)
+                },
+            }
+            for e in range(environments)
+        }
+        values = environments * (parameters + 2 * secrets)
+
+        resolver = SecretResolver()
+        start = time.perf_counter()
+        resolver.resolve_all(configs)
+        cold = (time.perf_counter() - start) * 1000
+        stats = resolver.stats()
+        start = time.perf_counter()
+        resolver.resolve_all(configs)
+        warm = (time.perf_counter() - start) * 1000
+
+    calls = stats["GetParameters"] + stats["GetSecretValue"]
+    print(f"{'valores con referencias':<32} {values}")
+    print(f"{'llamadas sin agrupar':<32} {values}")
+    print(f"{'llamadas agrupadas':<32} {calls}")
+    print(f"{'resolución en frío':<32} {cold:.1f} ms")
+    print(f"{'resolución desde el cache':<32} {warm:.1f} ms")
+
+
+if __name__ == "__main__":
+    benchmark_get_lookup()
+    benchmark_section_access()
+    benchmark_materialized_access()
+    benchmark_backends()
+    benchmark_convert_directory()
+    benchmark_merge_memory()
+    benchmark_list_merge()
+    benchmark_inheritance()
+    benchmark_interpolation()
+    benchmark_diff()
+    benchmark_single_flight()
+    benchmark_schema_validation()
+    benchmark_remote_layers()
+    benchmark_secret_resolution()
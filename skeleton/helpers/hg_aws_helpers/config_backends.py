@@ -0,0 +1,351 @@
+"""
+Backends de parseo y serialización para ConfigLoader y ConfigConverter
+Selecciona automáticamente la implementación más rápida disponible para cada
+formato (tomllib, libyaml, orjson) manteniendo resultados idénticos a los
+parsers de referencia (toml, PyYAML, json).
+"""
+
+import importlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Operaciones soportadas por los backends
+READ = "read"
+WRITE = "write"
+
+# Variable de ambiente para fijar un backend: HG_AWS_HELPERS_<FORMATO>_BACKEND
+BACKEND_ENV_VAR = "HG_AWS_HELPERS_{format}_BACKEND"
+
+
+class FormatBackend:
+    """
+    Implementación de lectura o escritura de un formato de configuración.
+
+    El módulo subyacente se importa en el primer uso; si no está instalado el
+    backend se considera no disponible.
+    """
+
+    __slots__ = (
+        "name",
+        "format_type",
+        "operation",
+        "priority",
+        "auto",
+        "reference",
+        "_factory",
+        "_func",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        format_type: str,
+        operation: str,
+        factory: Callable[[], Callable[..., Any]],
+        priority: int = 0,
+        auto: bool = True,
+        reference: bool = False,
+    ):
+        """
+        Inicializar FormatBackend
+
+        Args:
+            name: Nombre del backend (ej: 'tomllib', 'orjson')
+            format_type: Formato que maneja ('toml', 'json', 'yaml')
+            operation: Operación que implementa (READ o WRITE)
+            factory: Función que importa el módulo y devuelve la implementación
+            priority: Prioridad en la selección automática (mayor gana)
+            auto: Si puede elegirse automáticamente (False: solo fijándolo)
+            reference: Si es la implementación de referencia del formato
+        """
+        self.name = name
+        self.format_type = format_type
+        self.operation = operation
+        self.priority = priority
+        self.auto = auto
+        self.reference = reference
+        self._factory = factory
+        self._func: Optional[Callable[..., Any]] = None
+
+    def resolve(self) -> Callable[..., Any]:
+        """
+        Obtener la implementación importando el módulo si hace falta
+
+        Returns:
+            Función de lectura (str -> datos) o escritura (datos -> str)
+
+        Raises:
+            ImportError: Si el módulo del backend no está disponible
+        """
+        if self._func is None:
+            try:
+                self._func = self._factory()
+            except AttributeError as e:
+                raise ImportError(str(e))
+        return self._func
+
+    def is_available(self) -> bool:
+        """Indicar si el módulo del backend puede importarse"""
+        try:
+            self.resolve()
+            return True
+        except ImportError:
+            return False
+
+    def __repr__(self) -> str:
+        """Representación legible del backend"""
+        return f"FormatBackend({self.format_type}/{self.operation}: {self.name})"
+
+
+# Backends registrados por (formato, operación)
+_registry: Dict[Tuple[str, str], List[FormatBackend]] = {}
+
+# Backends fijados explícitamente por (formato, operación)
+_pinned: Dict[Tuple[str, str], str] = {}
+
+# Selección automática ya resuelta por (formato, operación)
+_selected: Dict[Tuple[str, str], FormatBackend] = {}
+
+
+def register_backend(backend: FormatBackend):
+    """
+    Registrar un backend de lectura o escritura
+
+    Args:
+        backend: Backend a registrar
+    """
+    key = (backend.format_type, backend.operation)
+    backends = [b for b in _registry.get(key, []) if b.name != backend.name]
+    backends.append(backend)
+    backends.sort(key=lambda b: b.priority, reverse=True)
+    _registry[key] = backends
+    _selected.pop(key, None)
+
+
+def available_backends(format_type: str, operation: str = READ) -> List[str]:
+    """
+    Listar los backends instalados para un formato, de mayor a menor prioridad
+
+    Args:
+        format_type: Formato ('toml', 'json', 'yaml')
+        operation: Operación (READ o WRITE)
+
+    Returns:
+        List: Nombres de los backends disponibles
+    """
+    return [
+        b.name for b in _registry.get((format_type, operation), []) if b.is_available()
+    ]
+
+
+def pin_backend(format_type: str, name: str, operation: Optional[str] = None):
+    """
+    Fijar el backend de un formato desactivando la selección automática
+
+    Args:
+        format_type: Formato ('toml', 'json', 'yaml')
+        name: Nombre del backend a usar
+        operation: READ, WRITE o None para ambas operaciones
+
+    Raises:
+        ValueError: Si el backend no está registrado para el formato
+    """
+    operations = [operation] if operation else [READ, WRITE]
+    pinned_any = False
+    for op in operations:
+        if any(b.name == name for b in _registry.get((format_type, op), [])):
+            _pinned[(format_type, op)] = name
+            _selected.pop((format_type, op), None)
+            pinned_any = True
+
+    if not pinned_any:
+        raise ValueError(f"Backend no registrado para {format_type}: {name}")
+
+
+def unpin_backend(format_type: Optional[str] = None):
+    """
+    Restaurar la selección automática de backends
+
+    Args:
+        format_type: Formato a restaurar (None para todos)
+    """
+    for key in list(_pinned):
+        if format_type is None or key[0] == format_type:
+            del _pinned[key]
+            _selected.pop(key, None)
+
+
+def _pinned_name(format_type: str, operation: str) -> Optional[str]:
+    """Obtener el backend fijado por código o por variable de ambiente"""
+    name = _pinned.get((format_type, operation))
+    if name:
+        return name
+    return os.environ.get(BACKEND_ENV_VAR.format(format=format_type.upper())) or None
+
+
+def get_backend(format_type: str, operation: str = READ) -> FormatBackend:
+    """
+    Obtener el backend a usar para un formato y operación
+
+    Args:
+        format_type: Formato ('toml', 'json', 'yaml')
+        operation: Operación (READ o WRITE)
+
+    Returns:
+        FormatBackend: Backend fijado o el más rápido disponible
+
+    Raises:
+        ValueError: Si el formato no es soportado
+        ImportError: Si ningún backend del formato está instalado
+    """
+    key = (format_type, operation)
+    backends = _registry.get(key)
+    if not backends:
+        raise ValueError(f"Formato no soportado: {format_type}")
+
+    pinned = _pinned_name(format_type, operation)
+    if pinned:
+        for backend in backends:
+            if backend.name == pinned:
+                backend.resolve()
+                return backend
+        # Un backend fijado por variable de ambiente puede no aplicar a la operación
+        if (format_type, operation) in _pinned:
+            raise ValueError(f"Backend no registrado para {format_type}: {pinned}")
+
+    backend = _selected.get(key)
+    if backend is not None:
+        return backend
+
+    for backend in backends:
+        if backend.auto and backend.is_available():
+            _selected[key] = backend
+            return backend
+
+    raise ImportError(f"No hay backend instalado para el formato {format_type}")
+
+
+def _reference_backend(format_type: str, operation: str) -> Optional[FormatBackend]:
+    """Obtener el backend de referencia de un formato si está disponible"""
+    for backend in _registry.get((format_type, operation), []):
+        if backend.reference and backend.is_available():
+            return backend
+    return None
+
+
+def loads(format_type: str, content: str) -> Any:
+    """
+    Parsear contenido de texto en el formato indicado
+
+    Si el backend rápido rechaza el contenido se reintenta con el backend de
+    referencia, de modo que los resultados y errores coinciden con los parsers
+    originales.
+
+    Args:
+        format_type: Formato ('toml', 'json', 'yaml')
+        content: Contenido a parsear
+
+    Returns:
+        Datos parseados
+    """
+    backend = get_backend(format_type, READ)
+    try:
+        return backend.resolve()(content)
+    except Exception:
+        if backend.reference or _pinned_name(format_type, READ):
+            raise
+        reference = _reference_backend(format_type, READ)
+        if reference is None:
+            raise
+    return reference.resolve()(content)
+
+
+def dumps(format_type: str, data: Any) -> str:
+    """
+    Serializar datos en el formato indicado
+
+    Args:
+        format_type: Formato ('toml', 'json', 'yaml')
+        data: Datos a serializar
+
+    Returns:
+        str: Contenido serializado
+    """
+    return get_backend(format_type, WRITE).resolve()(data)
+
+
+def _tomllib_loads() -> Callable[[str], Any]:
+    return importlib.import_module("tomllib").loads
+
+
+def _tomli_loads() -> Callable[[str], Any]:
+    return importlib.import_module("tomli").loads
+
+
+def _toml_loads() -> Callable[[str], Any]:
+    return importlib.import_module("toml").loads
+
+
+def _toml_dumps() -> Callable[[Any], str]:
+    return importlib.import_module("toml").dumps
+
+
+def _libyaml_loads() -> Callable[[str], Any]:
+    yaml = importlib.import_module("yaml")
+    loader = yaml.CSafeLoader
+    return lambda content: yaml.load(content, Loader=loader)
+
+
+def _pyyaml_loads() -> Callable[[str], Any]:
+    return importlib.import_module("yaml").safe_load
+
+
+def _libyaml_dumps() -> Callable[[Any], str]:
+    yaml = importlib.import_module("yaml")
+    dumper = yaml.CSafeDumper
+    return lambda data: yaml.dump(data, Dumper=dumper, default_flow_style=False)
+
+
+def _pyyaml_dumps() -> Callable[[Any], str]:
+    yaml = importlib.import_module("yaml")
+    return lambda data: yaml.dump(data, default_flow_style=False)
+
+
+def _orjson_loads() -> Callable[[str], Any]:
+    return importlib.import_module("orjson").loads
+
+
+def _orjson_dumps() -> Callable[[Any], str]:
+    orjson = importlib.import_module("orjson")
+    option = orjson.OPT_INDENT_2
+    return lambda data: orjson.dumps(data, option=option).decode("utf-8")
+
+
+def _json_dumps(data: Any) -> str:
+    return json.dumps(data, indent=2)
+
+
+for _backend in (
+    # TOML: tomllib (3.11+) o tomli para lectura; toml es la referencia
+    FormatBackend("tomllib", "toml", READ, _tomllib_loads, priority=30),
+    FormatBackend("tomli", "toml", READ, _tomli_loads, priority=20),
+    FormatBackend("toml", "toml", READ, _toml_loads, priority=10, reference=True),
+    FormatBackend("toml", "toml", WRITE, _toml_dumps, priority=10, reference=True),
+    # YAML: libyaml (CSafeLoader/CSafeDumper) cuando PyYAML se compiló con soporte
+    FormatBackend("libyaml", "yaml", READ, _libyaml_loads, priority=20),
+    FormatBackend("pyyaml", "yaml", READ, _pyyaml_loads, priority=10, reference=True),
+    FormatBackend("libyaml", "yaml", WRITE, _libyaml_dumps, priority=20),
+    FormatBackend("pyyaml", "yaml", WRITE, _pyyaml_dumps, priority=10, reference=True),
+    # JSON: orjson para lectura; su salida no escapa caracteres no ASCII, por
+    # lo que para escritura solo se usa si se fija explícitamente
+    FormatBackend("orjson", "json", READ, _orjson_loads, priority=20),
+    FormatBackend(
+        "json", "json", READ, lambda: json.loads, priority=10, reference=True
+    ),
+    FormatBackend("orjson", "json", WRITE, _orjson_dumps, priority=20, auto=False),
+    FormatBackend(
+        "json", "json", WRITE, lambda: _json_dumps, priority=10, reference=True
+    ),
+):
+    register_backend(_backend)
@@ -0,0 +1,799 @@
+"""
+Cache de configuraciones para ConfigLoader
+Incluye un cache LRU acotado en memoria, un cache persistente en disco que se
+invalida cuando cambia el mtime, el tamaño o el contenido de alguna capa, y un
+índice de directorios para resolver capas sin sondear el sistema de archivos.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Directorio por defecto del cache en disco (relativo al directorio de trabajo)
+DEFAULT_CACHE_DIR = ".cache/hg_aws_helpers"
+
+# Versión del formato de las entradas; cambiarla invalida todo el cache
+CACHE_FORMAT_VERSION = 2
+
+# Número máximo de configuraciones fusionadas en el cache en memoria
+DEFAULT_MAX_ENTRIES = 64
+
+# Un directorio modificado hace menos de este tiempo se vuelve a escanear en la
+# siguiente consulta: su mtime podría no reflejar todavía cambios recientes
+# en sistemas de archivos con resolución de tiempo gruesa
+RACY_WINDOW_NS = 2_000_000_000
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimar el tamaño en bytes de una estructura de configuración
+
+    Args:
+        value: Valor a medir (dict, list, escalares)
+
+    Returns:
+        int: Tamaño aproximado en bytes incluyendo los objetos anidados
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+    return total
+
+
+def json_round_trips(value: Any) -> bool:
+    """
+    Indicar si un valor se recupera idéntico (mismos tipos) de JSON
+
+    JSON convierte las claves en cadenas (ej: {80: 'http'} de YAML) y las
+    tuplas en listas, y no representa fechas: esos valores se cargarían
+    distintos desde disco.
+
+    Args:
+        value: Valor a comprobar (dict, list, escalares)
+
+    Returns:
+        bool: True si json.loads(json.dumps(value)) es igual y del mismo tipo
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if not all(isinstance(key, str) for key in item):
+                return False
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif item is not None and not isinstance(item, (str, int, float)):
+            return False
+    return True
+
+
+def sha256_hex(content: bytes) -> str:
+    """
+    Calcular el hash SHA-256 de un contenido
+
+    hashlib (y OpenSSL) se importa en el primer uso para no cargarlo en el
+    arranque cuando no hay nada que verificar.
+
+    Args:
+        content: Bytes a resumir
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    import hashlib
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_sha256(file_path: Path) -> str:
+    """
+    Calcular el hash SHA-256 del contenido de un archivo
+
+    Args:
+        file_path: Ruta al archivo
+
+    Returns:
+        str: Hash hexadecimal del contenido
+    """
+    with open(file_path, "rb") as f:
+        return sha256_hex(f.read())
+
+
+def content_signature(
+    file_path: Path, stat: os.stat_result, content: bytes
+) -> Dict[str, Any]:
+    """
+    Construir la firma de una capa a partir del contenido que se leyó
+
+    El stat debe tomarse antes de leer: si el archivo cambia después, su mtime
+    ya no coincide y la firma se valida por hash. Un mtime dentro de la ventana
+    RACY_WINDOW_NS no se guarda, porque una escritura en el mismo intervalo de
+    resolución podría no modificarlo.
+
+    Args:
+        file_path: Ruta al archivo de la capa
+        stat: Resultado de stat() tomado antes de leer el contenido
+        content: Bytes leídos (los mismos que se parsearon)
+
+    Returns:
+        Dict: Ruta, mtime (None si no es fiable), tamaño y hash del contenido
+    """
+    return {
+        "path": str(file_path),
+        "mtime_ns": _trusted_mtime(stat.st_mtime_ns),
+        "size": len(content),
+        "sha256": sha256_hex(content),
+    }
+
+
+def read_with_signature(file_path: Path) -> Tuple[bytes, Dict[str, Any]]:
+    """
+    Leer un archivo y obtener la firma de los bytes leídos
+
+    Args:
+        file_path: Ruta al archivo
+
+    Returns:
+        Tupla (contenido, firma calculada con content_signature())
+    """
+    stat = os.stat(file_path)
+    with open(file_path, "rb") as f:
+        content = f.read()
+    return content, content_signature(file_path, stat, content)
+
+
+def layer_signature(file_path: Path) -> Dict[str, Any]:
+    """
+    Obtener la firma actual de una capa de configuración
+
+    Solo es correcta si la capa no se parsea a partir de otra lectura; para
+    firmar datos ya cargados use la firma de los bytes que se parsearon.
+
+    Args:
+        file_path: Ruta al archivo de la capa
+
+    Returns:
+        Dict: Ruta resuelta, mtime, tamaño y hash del contenido
+    """
+    return read_with_signature(file_path)[1]
+
+
+def _trusted_mtime(mtime_ns: int) -> Optional[int]:
+    """
+    Devolver el mtime solo si es lo bastante antiguo para confiar en él
+
+    Args:
+        mtime_ns: mtime del archivo en nanosegundos
+
+    Returns:
+        El mtime o None si está dentro de la ventana RACY_WINDOW_NS
+    """
+    if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+        return None
+    return mtime_ns
+
+
+def signature_matches(signature: Dict[str, Any]) -> bool:
+    """
+    Verificar si una capa sigue coincidiendo con su firma
+
+    Si el mtime y el tamaño coinciden se considera válida sin leer el archivo;
+    en otro caso (o si el mtime de la firma no era fiable) se compara el hash
+    del contenido.
+
+    Args:
+        signature: Firma previamente calculada con content_signature()
+
+    Returns:
+        bool: True si la capa no ha cambiado
+    """
+    file_path = Path(signature["path"])
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return False
+
+    if stat.st_size != signature["size"]:
+        return False
+    if signature["mtime_ns"] is not None and stat.st_mtime_ns == signature["mtime_ns"]:
+        return True
+
+    # Mismo tamaño pero distinto mtime (ej: touch, checkout): comparar contenido
+    if file_sha256(file_path) != signature["sha256"]:
+        return False
+    signature["mtime_ns"] = _trusted_mtime(stat.st_mtime_ns)
+    return True
+
+
+class _InFlightLoad:
+    """Carga en curso de una clave, compartida por los hilos que la esperan"""
+
+    __slots__ = ("done", "data", "error", "stale")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data: Any = None
+        self.error: Optional[BaseException] = None
+        # Invalidada mientras cargaba: el resultado no se guarda en el cache
+        self.stale = False
+
+
+class ConfigCache:
+    """
+    Cache LRU acotado de configuraciones fusionadas con estadísticas de uso.
+
+    Las claves combinan ruta, ambiente, formato y directorio de configuración,
+    por lo que un mismo proceso puede renderizar varios ambientes sin mezclar
+    resultados. Es seguro entre hilos y get_or_load() agrupa las cargas
+    concurrentes de una misma clave en una sola (single-flight).
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Inicializar ConfigCache
+
+        Args:
+            max_entries: Número máximo de entradas antes de desalojar la menos usada
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._in_flight: Dict[Hashable, _InFlightLoad] = {}
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._coalesced = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Obtener una configuración del cache
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            Dict con la configuración o None si no está en el cache
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+
+    def get_or_load(
+        self, key: Hashable, load: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Obtener una configuración del cache o cargarla una sola vez
+
+        Si otro hilo ya está cargando la misma clave se espera su resultado
+        (o su excepción) en lugar de volver a parsear los archivos.
+
+        Args:
+            key: Clave de la entrada
+            load: Función que carga la configuración si no está en el cache
+
+        Returns:
+            Dict: Configuración cacheada o recién cargada
+
+        Raises:
+            Exception: La excepción producida por load()
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlightLoad()
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data
+
+        try:
+            flight.data = load()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            size = estimate_size(flight.data)
+            with self._lock:
+                if not flight.stale:
+                    self._store(key, flight.data, size)
+            return flight.data
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+            flight.done.set()
+
+    def put(self, key: Hashable, data: Dict[str, Any]):
+        """
+        Guardar una configuración en el cache
+
+        Args:
+            key: Clave de la entrada
+            data: Configuración fusionada
+        """
+        size = estimate_size(data)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                flight.stale = True
+            self._store(key, data, size)
+
+    def _store(self, key: Hashable, data: Dict[str, Any], size: int):
+        """Guardar una entrada y desalojar las sobrantes (con el lock tomado)"""
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        self._sizes[key] = size
+        self._evict()
+
+    def invalidate(
+        self,
+        key: Optional[Hashable] = None,
+        predicate: Optional[Callable[[Hashable], bool]] = None,
+    ) -> int:
+        """
+        Eliminar entradas del cache
+
+        Las cargas en curso de las claves eliminadas no guardan su resultado.
+
+        Args:
+            key: Clave concreta a eliminar
+            predicate: Función que indica qué claves eliminar
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._lock:
+            if key is not None:
+                keys = [key] if key in self._entries else []
+                flights = [key] if key in self._in_flight else []
+            elif predicate is not None:
+                keys = [k for k in self._entries if predicate(k)]
+                flights = [k for k in self._in_flight if predicate(k)]
+            else:
+                return 0
+
+            for k in flights:
+                self._in_flight.pop(k).stale = True
+            for k in keys:
+                del self._entries[k]
+                del self._sizes[k]
+            return len(keys)
+
+    def clear(self):
+        """Eliminar todas las entradas y reiniciar las estadísticas"""
+        with self._lock:
+            for flight in self._in_flight.values():
+                flight.stale = True
+            self._in_flight.clear()
+            self._entries.clear()
+            self._sizes.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+            self._coalesced = 0
+
+    def resize(self, max_entries: int):
+        """
+        Cambiar el número máximo de entradas
+
+        Args:
+            max_entries: Nuevo límite de entradas
+        """
+        with self._lock:
+            self.max_entries = max_entries
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtener estadísticas del cache
+
+        Returns:
+            Dict: hits, misses, coalesced (cargas compartidas con otro hilo),
+            evictions, entries, max_entries y bytes estimados
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(self._sizes.values()),
+            }
+
+    def _evict(self):
+        """Desalojar las entradas menos usadas que excedan el límite"""
+        while len(self._entries) > max(self.max_entries, 0):
+            key, _ = self._entries.popitem(last=False)
+            del self._sizes[key]
+            self._evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Permite usar 'in' sin afectar estadísticas ni orden LRU"""
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        """Número de entradas en el cache"""
+        return len(self._entries)
+
+
+class ConfigDirectoryIndex:
+    """
+    Índice en memoria de los archivos de un directorio de configuración.
+
+    Se construye con una sola pasada de os.scandir y se comparte entre todas
+    las instancias de ConfigLoader que usan el mismo directorio. Solo se vuelve
+    a escanear cuando cambia el mtime del directorio.
+    """
+
+    _instances: Dict[str, "ConfigDirectoryIndex"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, directory: Path):
+        """
+        Inicializar ConfigDirectoryIndex
+
+        Args:
+            directory: Directorio a indexar
+        """
+        self.directory = Path(directory)
+        self._mtime_ns: Optional[int] = None
+        self._files: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_directory(cls, directory: Path) -> "ConfigDirectoryIndex":
+        """
+        Obtener el índice compartido de un directorio
+
+        Args:
+            directory: Directorio de configuración
+
+        Returns:
+            ConfigDirectoryIndex: Índice compartido del directorio
+        """
+        key = os.path.abspath(str(directory))
+        index = cls._instances.get(key)
+        if index is None:
+            with cls._instances_lock:
+                index = cls._instances.setdefault(key, cls(Path(key)))
+        return index
+
+    @classmethod
+    def clear(cls):
+        """Descartar todos los índices compartidos"""
+        with cls._instances_lock:
+            cls._instances.clear()
+
+    def refresh(self, force: bool = False):
+        """
+        Volver a escanear el directorio si su mtime cambió
+
+        Args:
+            force: Escanear aunque el mtime no haya cambiado
+        """
+        try:
+            mtime_ns = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._files = {}
+                self._mtime_ns = None
+            return
+
+        if not force and mtime_ns == self._mtime_ns:
+            return
+
+        with os.scandir(self.directory) as entries:
+            files = {
+                entry.name: Path(entry.path) for entry in entries if entry.is_file()
+            }
+
+        # Si el directorio acaba de cambiar no confiar en el mtime todavía
+        if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+            mtime_ns = None
+
+        with self._lock:
+            self._files = files
+            self._mtime_ns = mtime_ns
+
+    def files(self) -> Dict[str, Path]:
+        """
+        Obtener los archivos del directorio
+
+        Returns:
+            Dict: Nombre de archivo -> ruta
+        """
+        self.refresh()
+        return self._files
+
+    def find(
+        self, stem: str, formats: Dict[str, List[str]]
+    ) -> Optional[Tuple[Path, str]]:
+        """
+        Buscar un archivo por nombre base en el orden de formatos indicado
+
+        Args:
+            stem: Nombre del archivo sin extensión (ej: 'base', 'env.dev')
+            formats: Formatos y sus extensiones, en orden de preferencia
+
+        Returns:
+            Tupla (ruta, formato) o None si no existe
+        """
+        files = self.files()
+        for format_name, extensions in formats.items():
+            for ext in extensions:
+                file_path = files.get(f"{stem}{ext}")
+                if file_path is not None:
+                    return file_path, format_name
+        return None
+
+
+# umask del proceso, leído en la primera escritura de un archivo nuevo
+_umask: Optional[int] = None
+
+
+def _file_mode(file_path: Path) -> int:
+    """
+    Obtener los permisos para escribir un archivo
+
+    Args:
+        file_path: Ruta destino
+
+    Returns:
+        int: Permisos del archivo existente o los de un archivo nuevo según umask
+    """
+    global _umask
+    try:
+        return os.stat(file_path).st_mode & 0o7777
+    except OSError:
+        pass
+    if _umask is None:
+        # os.umask() solo se puede leer cambiándolo; se consulta una vez
+        _umask = os.umask(0o022)
+        os.umask(_umask)
+    return 0o666 & ~_umask
+
+
+def write_atomic(file_path: Path, content: str):
+    """
+    Escribir un archivo de forma atómica (archivo temporal + rename)
+
+    Se conservan los permisos del archivo existente (mkstemp crea el temporal
+    con permisos 0600).
+
+    Args:
+        file_path: Ruta destino
+        content: Contenido de texto a escribir
+    """
+    # Importación diferida: tempfile solo hace falta al escribir
+    import tempfile
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    mode = _file_mode(file_path)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=str(file_path.parent), prefix=f".{file_path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Bloqueo exclusivo consultivo entre procesos sobre un archivo de bloqueo
+
+    Se bloquea un archivo auxiliar y no el archivo protegido, porque
+    write_atomic() lo reemplaza por otro inodo. El archivo de bloqueo no se
+    elimina al terminar para no romper el bloqueo de otros procesos.
+
+    Args:
+        lock_path: Ruta al archivo de bloqueo (se crea si no existe)
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(str(lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+class DiskConfigCache:
+    """
+    Cache persistente en disco del resultado fusionado de ConfigLoader.
+
+    Cada entrada es un archivo JSON con la firma de todas las capas que
+    intervinieron en la fusión, de modo que un proceso nuevo puede reutilizar
+    el resultado con una sola lectura mientras ninguna capa cambie.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        """
+        Inicializar DiskConfigCache
+
+        Args:
+            cache_dir: Directorio donde guardar las entradas del cache
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def _entry_path(self, key: Sequence[Any]) -> Path:
+        """
+        Obtener la ruta del archivo de una entrada
+
+        Args:
+            key: Componentes de la clave (rutas de capas, ambiente, formato)
+
+        Returns:
+            Path: Ruta al archivo de la entrada
+        """
+        digest = sha256_hex(json.dumps(list(key), default=str).encode("utf-8"))
+        return self.cache_dir / f"{digest}.json"
+
+    def load(self, key: Sequence[Any], layers: List[Path]) -> Optional[Dict[str, Any]]:
+        """
+        Obtener configuración fusionada desde el cache
+
+        Args:
+            key: Componentes de la clave de la entrada
+            layers: Capas que intervienen en la fusión, en orden
+
+        Returns:
+            Dict con la configuración fusionada o None si no hay entrada válida
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("version") != CACHE_FORMAT_VERSION:
+            return None
+
+        # Las firmas incluyen las capas y, a continuación, sus dependencias
+        signatures = entry.get("layers", [])
+        if [s["path"] for s in signatures[: len(layers)]] != [str(p) for p in layers]:
+            return None
+
+        refreshed = False
+        for signature in signatures:
+            previous_mtime = signature["mtime_ns"]
+            if not signature_matches(signature):
+                return None
+            refreshed = refreshed or signature["mtime_ns"] != previous_mtime
+
+        # Actualizar mtime para no volver a calcular hashes en la próxima carga
+        if refreshed:
+            self._write_entry(entry_path, entry)
+
+        return entry["data"]
+
+    def store(
+        self,
+        key: Sequence[Any],
+        layers: List[Path],
+        data: Dict[str, Any],
+        dependencies: Sequence[Path] = (),
+        signatures: Optional[Sequence[Dict[str, Any]]] = None,
+    ):
+        """
+        Guardar configuración fusionada en el cache
+
+        Los valores que no vuelven idénticos de JSON (ej: fechas TOML o claves
+        que no son cadenas) hacen que la entrada no se guarde.
+
+        Args:
+            key: Componentes de la clave de la entrada
+            layers: Capas que intervienen en la fusión, en orden
+            data: Configuración fusionada
+            dependencies: Archivos adicionales que invalidan la entrada (ej:
+                fragmentos incluidos por las capas)
+            signatures: Firmas de las capas y dependencias (en ese orden) de
+                los bytes que produjeron data. Sin ellas se firman los archivos
+                actuales, que podrían haber cambiado después de parsearlos
+        """
+        if not json_round_trips(data):
+            return
+        if signatures is None:
+            signatures = [layer_signature(p) for p in list(layers) + list(dependencies)]
+        entry = {
+            "version": CACHE_FORMAT_VERSION,
+            "layers": list(signatures),
+            "data": data,
+        }
+        self._write_entry(self._entry_path(key), entry)
+
+    def _write_entry(self, entry_path: Path, entry: Dict[str, Any]):
+        """
+        Serializar y escribir una entrada ignorando errores de escritura
+
+        Args:
+            entry_path: Ruta al archivo de la entrada
+            entry: Contenido de la entrada
+        """
+        try:
+            content = json.dumps(entry)
+        except (TypeError, ValueError):
+            return
+        try:
+            write_atomic(entry_path, content)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Eliminar todas las entradas del cache"""
+        if not self.cache_dir.exists():
+            return
+        for entry_path in self.cache_dir.glob("*.json"):
+            try:
+                entry_path.unlink()
+            except OSError:
+                pass
@@ -0,0 +1,336 @@
+"""
+Generación de clases de configuración tipadas
+Lee la configuración base (base.*) y genera un módulo con una dataclass
+congelada con __slots__ por sección. ConfigLoader.materialize() convierte la
+configuración fusionada en esas clases: el acceso a atributos es una lectura
+de slot y mypy detecta las claves mal escritas.
+
+Uso:
+    python -m helpers.hg_aws_helpers.config_codegen config -o src/app/config_types.py
+"""
+
+import argparse
+import dataclasses
+import keyword
+import sys
+import threading
+import typing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Type, TypeVar
+
+try:
+    from .config_cache import write_atomic
+    from .config_loader import ConfigLoader
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_cache import write_atomic
+    from config_loader import ConfigLoader
+
+T = TypeVar("T")
+
+# Longitud máxima de línea del código generado (la de black)
+LINE_LENGTH = 88
+
+# Plan de materialización por clase: (campo, tipo de conversión, clase anidada)
+_plans: Dict[type, Tuple[Tuple[str, str, Optional[type]], ...]] = {}
+_plans_lock = threading.Lock()
+
+
+class _ClassSpec:
+    """Descripción de una clase generada: nombre y (campo, anotación)"""
+
+    __slots__ = ("name", "fields")
+
+    def __init__(self, name: str, fields: List[Tuple[str, str]]):
+        self.name = name
+        self.fields = fields
+
+
+def _is_field_name(key: Any) -> bool:
+    """Indicar si una clave puede ser un atributo de dataclass"""
+    return (
+        isinstance(key, str)
+        and key.isidentifier()
+        and not keyword.iskeyword(key)
+        and not key.startswith("__")
+    )
+
+
+def _class_name(path: List[str], root_name: str) -> str:
+    """Nombre de la clase de una sección (ej: ['network', 'vpc'] -> NetworkVpcConfig)"""
+    if not path:
+        return root_name
+    words = [w for part in path for w in part.split("_") if w]
+    return "".join(w[0].upper() + w[1:] for w in words) + "Config"
+
+
+class _Generator:
+    """Inferencia de tipos y construcción de las clases de una configuración"""
+
+    def __init__(self, root_name: str):
+        self.root_name = root_name
+        self.classes: List[_ClassSpec] = []
+        self.names: Set[str] = set()
+        self.typing_names: Set[str] = set()
+
+    def _unique(self, name: str) -> str:
+        """Evitar colisiones de nombres añadiendo un sufijo numérico"""
+        candidate, index = name, 2
+        while candidate in self.names:
+            candidate, index = f"{name}{index}", index + 1
+        self.names.add(candidate)
+        return candidate
+
+    def section(self, data: Dict[str, Any], path: List[str]) -> str:
+        """
+        Generar la clase de una sección y las de sus subsecciones
+
+        Args:
+            data: Contenido de la sección
+            path: Ruta de la sección desde la raíz
+
+        Returns:
+            str: Nombre de la clase generada
+        """
+        name = self._unique(_class_name(path, self.root_name))
+        fields = [
+            (key, self.annotation(value, path + [key])) for key, value in data.items()
+        ]
+        # Las subsecciones se añaden antes para que las anotaciones se resuelvan
+        self.classes.append(_ClassSpec(name, fields))
+        return name
+
+    def annotation(self, value: Any, path: List[str]) -> str:
+        """
+        Inferir la anotación de tipo de un valor
+
+        Args:
+            value: Valor de la configuración base
+            path: Ruta del valor desde la raíz
+
+        Returns:
+            str: Anotación de tipo en código Python
+        """
+        if isinstance(value, dict):
+            if value and all(_is_field_name(k) for k in value):
+                return self.section(value, path)
+            self.typing_names.update(("Any", "Dict"))
+            return "Dict[str, Any]"
+        if isinstance(value, list):
+            self.typing_names.add("Tuple")
+            items = {self._scalar(item) for item in value}
+            if len(items) == 1 and None not in items:
+                return f"Tuple[{items.pop()}, ...]"
+            self.typing_names.add("Any")
+            return "Tuple[Any, ...]"
+        scalar = self._scalar(value)
+        if scalar is None:
+            self.typing_names.add("Any")
+            return "Any"
+        return scalar
+
+    @staticmethod
+    def _scalar(value: Any) -> Optional[str]:
+        """Anotación de un valor escalar o None si no es escalar"""
+        for scalar_type in (bool, int, float, str):
+            if isinstance(value, scalar_type):
+                return scalar_type.__name__
+        return None
+
+
+def _format_slots(fields: List[Tuple[str, str]]) -> List[str]:
+    """Formatear la declaración __slots__ con el estilo de black"""
+    names = [f'"{name}"' for name, _ in fields]
+    inline = ", ".join(names) + ("," if len(names) == 1 else "")
+    line = f"    __slots__ = ({inline})"
+    if len(line) <= LINE_LENGTH:
+        return [line]
+    return ["    __slots__ = ("] + [f"        {n}," for n in names] + ["    )"]
+
+
+def generate_source(
+    data: Dict[str, Any], root_name: str = "Config", source: Optional[str] = None
+) -> str:
+    """
+    Generar el código de las clases de configuración
+
+    Args:
+        data: Configuración de referencia (normalmente base.*)
+        root_name: Nombre de la clase raíz
+        source: Archivo de origen, solo para la cabecera del módulo
+
+    Returns:
+        str: Código fuente del módulo generado
+    """
+    generator = _Generator(root_name)
+    generator.section(data, [])
+
+    header = "Clases de configuración generadas por hg_aws_helpers.config_codegen"
+    lines = ['"""', header]
+    if source:
+        lines.append(f"Origen: {source}")
+    lines += ["No editar a mano: regenerar con config_codegen", '"""', ""]
+    lines.append("from dataclasses import dataclass")
+    if generator.typing_names:
+        lines.append(f"from typing import {', '.join(sorted(generator.typing_names))}")
+
+    for spec in generator.classes:
+        lines += ["", "", "@dataclass(frozen=True)", f"class {spec.name}:"]
+        if not spec.fields:
+            lines.append("    pass")
+            continue
+        lines += _format_slots(spec.fields) + [""]
+        lines += [f"    {name}: {annotation}" for name, annotation in spec.fields]
+
+    return "\n".join(lines) + "\n"
+
+
+def generate_from_base(config_dir: str = "config", root_name: str = "Config") -> str:
+    """
+    Generar las clases a partir de la configuración base de un directorio
+
+    Args:
+        config_dir: Directorio de configuración
+        root_name: Nombre de la clase raíz
+
+    Returns:
+        str: Código fuente del módulo generado
+
+    Raises:
+        FileNotFoundError: Si no existe base.* en el directorio
+    """
+    loader = ConfigLoader(config_dir=config_dir)
+    layer = loader._find_layer("base")
+    if layer is None:
+        raise FileNotFoundError(f"Configuración base no encontrada en {config_dir}")
+
+    file_path, format_type = layer
+    data = loader._load_by_format(file_path, format_type) or {}
+    return generate_source(data, root_name, source=file_path.name)
+
+
+def write_module(
+    output: str, config_dir: str = "config", root_name: str = "Config"
+) -> bool:
+    """
+    Generar las clases y escribir el módulo solo si su contenido cambió
+
+    Args:
+        output: Ruta del módulo a escribir
+        config_dir: Directorio de configuración
+        root_name: Nombre de la clase raíz
+
+    Returns:
+        bool: True si el módulo se escribió
+    """
+    source = generate_from_base(config_dir, root_name)
+    output_path = Path(output)
+    try:
+        if output_path.read_text(encoding="utf-8") == source:
+            return False
+    except OSError:
+        pass
+    write_atomic(output_path, source)
+    return True
+
+
+def _plan(cls: type) -> Tuple[Tuple[str, str, Optional[type]], ...]:
+    """
+    Obtener el plan de materialización de una clase generada
+
+    Args:
+        cls: Dataclass generada
+
+    Returns:
+        Tupla de (campo, conversión, clase anidada) donde la conversión es
+        'section', 'tuple' o 'value'
+    """
+    plan = _plans.get(cls)
+    if plan is not None:
+        return plan
+
+    hints = typing.get_type_hints(cls)
+    entries = []
+    for field in dataclasses.fields(cls):
+        hint = hints.get(field.name, Any)
+        if isinstance(hint, type) and dataclasses.is_dataclass(hint):
+            entries.append((field.name, "section", hint))
+        elif getattr(hint, "__origin__", None) is tuple:
+            entries.append((field.name, "tuple", None))
+        else:
+            entries.append((field.name, "value", None))
+
+    plan = tuple(entries)
+    with _plans_lock:
+        _plans[cls] = plan
+    return plan
+
+
+def materialize(data: Dict[str, Any], cls: Type[T], _path: str = "") -> T:
+    """
+    Convertir una configuración en instancias de las clases generadas
+
+    Las claves que la clase no declara se ignoran; siguen disponibles en
+    ConfigLoader.config_data.
+
+    Args:
+        data: Configuración fusionada
+        cls: Clase raíz generada por config_codegen
+
+    Returns:
+        Instancia de cls
+
+    Raises:
+        KeyError: Si falta una clave declarada en la clase
+        ValueError: Si una sección no es un diccionario
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Se esperaba una sección en '{_path}': {data!r}")
+
+    kwargs = {}
+    for name, conversion, section_cls in _plan(cls):
+        path = f"{_path}.{name}" if _path else name
+        try:
+            value = data[name]
+        except KeyError:
+            raise KeyError(f"Parámetro requerido no encontrado: {path}")
+        if conversion == "section":
+            value = materialize(value, section_cls, path)
+        elif conversion == "tuple" and isinstance(value, list):
+            value = tuple(value)
+        kwargs[name] = value
+    return cls(**kwargs)  # type: ignore[call-arg]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+
+    Args:
+        argv: Argumentos (por defecto sys.argv[1:])
+
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(
+        description="Generar clases de configuración tipadas desde base.*"
+    )
+    parser.add_argument("config_dir", nargs="?", default="config")
+    parser.add_argument("-o", "--output", help="Módulo a escribir (por defecto stdout)")
+    parser.add_argument("--root-name", default="Config", help="Nombre de la clase raíz")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.output:
+            written = write_module(args.output, args.config_dir, args.root_name)
+            status = "actualizado" if written else "sin cambios"
+            print(f"{args.output}: {status}")
+        else:
+            sys.stdout.write(generate_from_base(args.config_dir, args.root_name))
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+Almacén de resultados de lookups de contexto de CDK
+Registra los lookups que CDK guarda en cdk.context.json (zonas de
+disponibilidad, Vpc.from_lookup, AMIs y hosted zones) en un archivo por
+ambiente que se versiona con el proyecto. La síntesis los reproduce sin acceso
+a la red (cdk synth --no-lookups). La caducidad es opcional: las entradas que
+llevan tiempo sin verificarse se siguen reproduciendo con un aviso hasta que se
+depuran con prune.
+
+Uso:
+    python -m helpers.hg_aws_helpers.config_context record dev
+    python -m helpers.hg_aws_helpers.config_context prune
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+try:
+    from .config_cache import file_lock, write_atomic
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_cache import file_lock, write_atomic
+
+# Proveedores de lookup de CDK que se registran (prefijo de la clave)
+LOOKUP_PROVIDERS = ("availability-zones", "vpc-provider", "ami", "hosted-zone")
+
+# Directorio por defecto del almacén (relativo al directorio de trabajo)
+DEFAULT_CONTEXT_STORE_DIR = "config/context"
+
+# Antigüedad máxima sugerida de una entrada para el comando prune (30 días)
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+# Intervalo mínimo entre actualizaciones de verified_at de un valor sin cambios
+# (1 día): volver a registrar el mismo contexto no reescribe el shard cada vez
+VERIFY_INTERVAL = 24 * 3600
+
+CONTEXT_STORE_VERSION = 1
+
+
+def parse_context_key(key: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """
+    Separar una clave de contexto de CDK en proveedor y parámetros
+
+    Args:
+        key: Clave de cdk.context.json
+            (ej: 'availability-zones:account=123456789012:region=us-east-1')
+
+    Returns:
+        Tupla (proveedor, parámetros) o None si no es un lookup registrable
+    """
+    provider, _, rest = key.partition(":")
+    if provider not in LOOKUP_PROVIDERS:
+        return None
+
+    params: Dict[str, str] = {}
+    last = None
+    for part in rest.split(":") if rest else []:
+        name, sep, value = part.partition("=")
+        if sep:
+            params[name] = value
+            last = name
+        elif last is not None:
+            # Valores que contienen ':' (ej: nombres de AMI)
+            params[last] += f":{part}"
+    return provider, params
+
+
+class CdkContextStore:
+    """
+    Almacén de lookups de CDK con un archivo (shard) por ambiente.
+
+    Las lecturas se guardan en memoria mientras el archivo no cambie; las
+    escrituras son atómicas y se hacen bajo un bloqueo de archivo, por lo que
+    varias síntesis pueden registrar ambientes distintos a la vez.
+    """
+
+    def __init__(
+        self,
+        store_dir: str = DEFAULT_CONTEXT_STORE_DIR,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Inicializar CdkContextStore
+
+        Args:
+            store_dir: Directorio de los shards
+            max_age: Segundos desde la última verificación tras los que una
+                entrada caduca (None: nunca). Las entradas caducadas se siguen
+                reproduciendo con un aviso; solo prune() las elimina
+            clock: Función que devuelve la hora actual en segundos
+        """
+        self.store_dir = Path(store_dir)
+        self.max_age = max_age
+        # Con una caducidad corta, verified_at se actualiza antes de que caduque
+        self.verify_interval = (
+            VERIFY_INTERVAL if max_age is None else min(VERIFY_INTERVAL, max_age / 2)
+        )
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._shards: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+    def shard_path(self, environment: str) -> Path:
+        """
+        Obtener la ruta del shard de un ambiente
+
+        Args:
+            environment: Ambiente (dev, prod, etc.)
+
+        Returns:
+            Path: Ruta al archivo del shard
+        """
+        return self.store_dir / f"{environment.lower()}.json"
+
+    def _read(self, shard: Path) -> Dict[str, Any]:
+        """
+        Leer las entradas de un shard (con cache en memoria por mtime y tamaño)
+
+        Args:
+            shard: Ruta al archivo del shard
+
+        Returns:
+            Dict: Clave de contexto -> entrada (vacío si no existe)
+        """
+        try:
+            stat = shard.stat()
+        except OSError:
+            return {}
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._shards.get(shard)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+
+        try:
+            with open(shard, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if document.get("version") != CONTEXT_STORE_VERSION:
+            return {}
+
+        entries = document.get("entries", {})
+        with self._lock:
+            self._shards[shard] = (signature, entries)
+        return entries
+
+    def _write(self, shard: Path, entries: Dict[str, Any]):
+        """Escribir un shard de forma atómica con las claves ordenadas"""
+        document = {"version": CONTEXT_STORE_VERSION, "entries": entries}
+        write_atomic(shard, json.dumps(document, indent=2, sort_keys=True) + "\n")
+
+    @staticmethod
+    def _verified_at(entry: Dict[str, Any]) -> float:
+        """Última verificación de una entrada (recorded_at en shards anteriores)"""
+        return entry.get("verified_at", entry["recorded_at"])
+
+    def _is_stale(self, entry: Dict[str, Any], now: float) -> bool:
+        """Indicar si una entrada superó la antigüedad máxima (si hay una)"""
+        return (
+            self.max_age is not None and now - self._verified_at(entry) > self.max_age
+        )
+
+    def record(self, environment: str, context: Mapping[str, Any]) -> List[str]:
+        """
+        Registrar los lookups de un contexto de CDK en el shard del ambiente
+
+        Solo se registran las claves de LOOKUP_PROVIDERS; los lookups fallidos
+        (marcados por CDK con '$dontSaveContext') se ignoran. recorded_at es
+        el momento del último cambio de valor y verified_at el del último
+        registro, del que depende la caducidad. Un valor sin cambios solo
+        actualiza verified_at si pasó verify_interval desde la anterior, de
+        modo que volver a registrar el mismo contexto no modifica el shard
+        versionado cada vez.
+
+        Args:
+            environment: Ambiente al que pertenecen los lookups
+            context: Contexto de CDK (ej: contenido de cdk.context.json)
+
+        Returns:
+            List: Claves añadidas o cuyo valor cambió
+        """
+        now = self._clock()
+        shard = self.shard_path(environment)
+        changed: List[str] = []
+        verified = False
+
+        with file_lock(shard.with_name(f".{shard.name}.lock")):
+            entries = dict(self._read(shard))
+            for key, value in context.items():
+                parsed = parse_context_key(key)
+                if parsed is None:
+                    continue
+                if isinstance(value, dict) and value.get("$dontSaveContext"):
+                    continue
+                previous = entries.get(key)
+                if previous is not None and previous["value"] == value:
+                    if now - self._verified_at(previous) >= self.verify_interval:
+                        entries[key] = {**previous, "verified_at": now}
+                        verified = True
+                    continue
+                provider, params = parsed
+                changed.append(key)
+                entries[key] = {
+                    "provider": provider,
+                    "account": params.get("account"),
+                    "region": params.get("region"),
+                    "recorded_at": now,
+                    "verified_at": now,
+                    "value": value,
+                }
+            if changed or verified:
+                self._write(shard, entries)
+
+        return changed
+
+    def record_file(
+        self, environment: str, cdk_context_path: str = "cdk.context.json"
+    ) -> List[str]:
+        """
+        Registrar los lookups de un archivo cdk.context.json
+
+        Args:
+            environment: Ambiente al que pertenecen los lookups
+            cdk_context_path: Ruta al archivo de contexto de CDK
+
+        Returns:
+            List: Claves añadidas o cuyo valor cambió
+
+        Raises:
+            FileNotFoundError: Si el archivo de contexto no existe
+        """
+        with open(cdk_context_path, "r", encoding="utf-8") as f:
+            return self.record(environment, json.load(f))
+
+    def context(
+        self,
+        environment: str,
+        account: Optional[str] = None,
+        region: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Obtener los lookups registrados de un ambiente para reproducirlos
+
+        No accede a la red ni escribe en disco. El resultado se pasa al
+        contexto de la App de CDK (app.node.set_context o App(context=...)).
+        Las entradas caducadas también se reproducen, con un RuntimeWarning
+        que las nombra para volver a registrarlas o depurarlas.
+
+        Args:
+            environment: Ambiente
+            account: Filtrar por cuenta de AWS (opcional)
+            region: Filtrar por región de AWS (opcional)
+
+        Returns:
+            Dict: Clave de contexto de CDK -> valor
+        """
+        now = self._clock()
+        entries = {
+            key: entry
+            for key, entry in self._read(self.shard_path(environment)).items()
+            if (account is None or entry["account"] == account)
+            and (region is None or entry["region"] == region)
+        }
+        stale = sorted(k for k, e in entries.items() if self._is_stale(e, now))
+        if stale:
+            warnings.warn(
+                f"Lookups de contexto de CDK caducados en {environment}: "
+                f"{', '.join(stale)}. Vuelva a registrarlos con acceso a AWS "
+                "o elimínelos con prune",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        return {key: entry["value"] for key, entry in entries.items()}
+
+    def availability_zones(
+        self, environment: str, account: str, region: str
+    ) -> Optional[List[str]]:
+        """
+        Obtener las zonas de disponibilidad registradas de una cuenta y región
+
+        Args:
+            environment: Ambiente
+            account: Cuenta de AWS
+            region: Región de AWS
+
+        Returns:
+            List: Zonas de disponibilidad o None si no hay un registro vigente
+        """
+        key = f"availability-zones:account={account}:region={region}"
+        return self.context(environment, account, region).get(key)
+
+    def prune(self, environment: Optional[str] = None) -> int:
+        """
+        Eliminar las entradas caducadas de un shard o de todos
+
+        Sin max_age ninguna entrada caduca y no se elimina nada.
+
+        Args:
+            environment: Ambiente a depurar (None para todos los shards)
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        if environment is not None:
+            shards = [self.shard_path(environment)]
+        else:
+            shards = sorted(self.store_dir.glob("*.json"))
+
+        now = self._clock()
+        removed = 0
+        for shard in shards:
+            with file_lock(shard.with_name(f".{shard.name}.lock")):
+                entries = self._read(shard)
+                kept = {k: e for k, e in entries.items() if not self._is_stale(e, now)}
+                if len(kept) != len(entries):
+                    removed += len(entries) - len(kept)
+                    self._write(shard, kept)
+        return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Punto de entrada de la línea de comandos
+
+    Args:
+        argv: Argumentos (por defecto sys.argv[1:])
+
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(
+        description="Registrar y depurar lookups de contexto de CDK por ambiente"
+    )
+    parser.add_argument("--store-dir", default=DEFAULT_CONTEXT_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Registrar cdk.context.json")
+    record.add_argument("environment")
+    record.add_argument("--cdk-context", default="cdk.context.json")
+
+    prune = commands.add_parser("prune", help="Eliminar entradas caducadas")
+    prune.add_argument("environment", nargs="?")
+    prune.add_argument(
+        "--max-age-days",
+        type=float,
+        default=DEFAULT_MAX_AGE / (24 * 3600),
+        help="Días sin verificarse tras los que una entrada caduca",
+    )
+
+    args = parser.parse_args(argv)
+    max_age = getattr(args, "max_age_days", None)
+    store = CdkContextStore(
+        args.store_dir, max_age * 24 * 3600 if max_age is not None else None
+    )
+
+    try:
+        if args.command == "record":
+            changed = store.record_file(args.environment, args.cdk_context)
+            print(f"{store.shard_path(args.environment)}: {len(changed)} cambios")
+        else:
+            print(f"{store.prune(args.environment)} entradas caducadas eliminadas")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,15 +6,150 @@ Maneja la conversión entre formatos de configuración y la integración con CDK
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    from . import config_backends
+    from .config_cache import (
+        file_lock,
+        layer_signature,
+        read_with_signature,
+        signature_matches,
+        write_atomic,
+    )
+    from .config_context import CdkContextStore
+    from .config_merge import _same_value, deep_merge
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    import config_backends
+    from config_cache import (
+        file_lock,
+        layer_signature,
+        read_with_signature,
+        signature_matches,
+        write_atomic,
+    )
+    from config_context import CdkContextStore
+    from config_merge import _same_value, deep_merge
+
+# Manifiesto de conversiones por directorio de salida y formato
+MANIFEST_PREFIX = ".convert-manifest."
+MANIFEST_NAME = MANIFEST_PREFIX + "{format}.json"
+MANIFEST_VERSION = 1
+
+# Número mínimo de archivos pendientes para usar un pool de procesos
+PARALLEL_THRESHOLD = 8
+
+
+class DirectoryConversion(NamedTuple):
+    """Resultado de ConfigConverter.convert_directory()"""
+
+    converted: List[str]
+    skipped: List[str]
+
+
+class ContextExport(NamedTuple):
+    """
+    Resultado de ConfigConverter.export_to_cdk_context()
+
+    Se comporta como la ruta de cdk.json en str() y os.fspath().
+    """
+
+    path: str
+    changed: bool
+    added: List[str]
+    updated: List[str]
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __fspath__(self) -> str:
+        return self.path
+
+
+def _context_changes(
+    old: Dict[str, Any],
+    new: Dict[str, Any],
+    added: List[str],
+    updated: List[str],
+    prefix: str = "",
+):
+    """
+    Clasificar las rutas añadidas y modificadas al fusionar el contexto
+
+    La fusión nunca elimina claves, por lo que basta recorrer el resultado.
+    Las subsecciones compartidas (mismo objeto) se omiten sin recorrerlas y
+    un cambio de tipo (ej: 1 -> True o 1 -> 1.0) cuenta como modificación.
+
+    Args:
+        old: Contexto anterior
+        new: Contexto fusionado
+        added: Lista donde acumular las rutas añadidas
+        updated: Lista donde acumular las rutas modificadas
+        prefix: Ruta de la sección comparada
+    """
+    for key, value in new.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if key not in old:
+            added.append(path)
+            continue
+        previous = old[key]
+        if previous is value:
+            continue
+        if isinstance(previous, dict) and isinstance(value, dict):
+            _context_changes(previous, value, added, updated, path)
+        elif not _same_value(previous, value):
+            updated.append(path)
+
+
+def _convert_one(
+    input_path: str, input_format: str, output_path: str, output_format: str
+) -> Dict[str, Any]:
+    """
+    Convertir un archivo
 
-import toml
-import yaml
+    Args:
+        input_path: Ruta al archivo de entrada
+        input_format: Formato de entrada
+        output_path: Ruta al archivo de salida
+        output_format: Formato de salida
+
+    Returns:
+        Dict: Entrada del manifiesto con la firma de los bytes de entrada que
+        se convirtieron y la firma de la salida escrita
+    """
+    content, source = read_with_signature(Path(input_path))
+    data = config_backends.loads(input_format, content.decode("utf-8"))
+    write_atomic(Path(output_path), config_backends.dumps(output_format, data))
+    return {"source": source, "output": layer_signature(Path(output_path))}
+
+
+def _convert_batch(
+    jobs: List[Tuple[str, Tuple[str, str, str, str]]],
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Convertir un lote de archivos (ejecutado en los procesos del pool)
+
+    Args:
+        jobs: Tuplas (ruta relativa, argumentos de _convert_one)
+
+    Returns:
+        Tupla (ruta relativa -> entrada del manifiesto de las conversiones
+        correctas, ruta relativa -> mensaje de error de las fallidas)
+    """
+    entries = {}
+    errors = {}
+    for relative, args in jobs:
+        try:
+            entries[relative] = _convert_one(*args)
+        except Exception as e:
+            errors[relative] = str(e)
+    return entries, errors
 
 
 class ConfigConverter:
     """
-    Clase para convertir configuraciones entre formatos y manejar la integración con CDK context
+    Clase para convertir configuraciones entre formatos y manejar la integración
+    con CDK context
     """
 
     # Formatos soportados y sus extensiones
@@ -78,6 +213,168 @@ class ConfigConverter:
 
         return str(output_path)
 
+    def convert_directory(
+        self,
+        src: str,
+        output_format: str,
+        pattern: str = "*.toml",
+        output_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> DirectoryConversion:
+        """
+        Convertir todos los archivos de un directorio a otro formato
+
+        Un manifiesto en el directorio de salida registra la firma de cada
+        origen y de su salida: los archivos cuyo contenido no cambió desde la
+        última conversión se omiten. Los archivos pendientes se convierten en
+        un pool de procesos y cada salida se escribe de forma atómica.
+
+        Args:
+            src: Directorio de origen
+            output_format: Formato de salida ('toml', 'json', 'yaml')
+            pattern: Patrón glob relativo a src (ej: '**/*.toml')
+            output_dir: Directorio de salida (por defecto config_dir); se
+                conserva la estructura de subdirectorios de src
+            max_workers: Número máximo de procesos
+
+        Returns:
+            DirectoryConversion: Rutas de salida convertidas y omitidas
+
+        Raises:
+            FileNotFoundError: Si el directorio de origen no existe
+            ValueError: Si el formato no es soportado o falla alguna conversión
+        """
+        src_path = Path(src)
+        if not src_path.is_dir():
+            raise FileNotFoundError(f"Directorio de origen no encontrado: {src_path}")
+
+        if output_format not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Formato de salida no soportado: {output_format}")
+
+        out_path = Path(output_dir) if output_dir else self.config_dir
+        manifest_path = out_path / MANIFEST_NAME.format(format=output_format)
+        manifest = self._load_manifest(manifest_path)
+        entries: Dict[str, Any] = {}
+
+        pending: List[Tuple[str, Path, str, Path]] = []
+        skipped: List[str] = []
+        refreshed = False
+        for input_path in sorted(src_path.glob(pattern)):
+            if not input_path.is_file() or input_path.name.startswith(MANIFEST_PREFIX):
+                continue
+            relative = input_path.relative_to(src_path).as_posix()
+            output_path = (out_path / relative).with_suffix(
+                self.SUPPORTED_FORMATS[output_format]
+            )
+            if output_path.resolve() == input_path.resolve():
+                continue
+
+            entry = manifest.get(relative)
+            if entry is not None and entry["output"]["path"] == str(output_path):
+                mtimes = (entry["source"]["mtime_ns"], entry["output"]["mtime_ns"])
+                if signature_matches(entry["source"]) and signature_matches(
+                    entry["output"]
+                ):
+                    # Un mtime actualizado evita recalcular el hash la próxima vez
+                    refreshed = refreshed or mtimes != (
+                        entry["source"]["mtime_ns"],
+                        entry["output"]["mtime_ns"],
+                    )
+                    entries[relative] = entry
+                    skipped.append(str(output_path))
+                    continue
+            pending.append(
+                (relative, input_path, self._detect_format(input_path), output_path)
+            )
+
+        # Las firmas se calculan en el worker a partir de los bytes que leyó:
+        # un origen editado durante la conversión se vuelve a convertir
+        results, errors = self._run_conversions(pending, output_format, max_workers)
+
+        converted = []
+        for relative, _, _, output_path in pending:
+            if relative in results:
+                entries[relative] = results[relative]
+                converted.append(str(output_path))
+
+        if pending or refreshed or set(entries) != set(manifest):
+            document = {
+                "version": MANIFEST_VERSION,
+                "format": output_format,
+                "files": entries,
+            }
+            write_atomic(manifest_path, json.dumps(document, indent=2, sort_keys=True))
+
+        if errors:
+            details = "; ".join(f"{k}: {v}" for k, v in sorted(errors.items()))
+            raise ValueError(f"Error al convertir {len(errors)} archivos: {details}")
+
+        return DirectoryConversion(converted=converted, skipped=skipped)
+
+    def _run_conversions(
+        self,
+        pending: List[Tuple[str, Path, str, Path]],
+        output_format: str,
+        max_workers: Optional[int],
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        """
+        Convertir los archivos pendientes, en un pool de procesos si son muchos
+
+        Args:
+            pending: Tuplas (ruta relativa, entrada, formato de entrada, salida)
+            output_format: Formato de salida
+            max_workers: Número máximo de procesos
+
+        Returns:
+            Tupla (ruta relativa -> entrada del manifiesto, ruta relativa ->
+            mensaje de error de las conversiones fallidas)
+        """
+        jobs = [
+            (relative, (str(input_path), input_format, str(output_path), output_format))
+            for relative, input_path, input_format, output_path in pending
+        ]
+        workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        if len(jobs) < PARALLEL_THRESHOLD or workers <= 1:
+            return _convert_batch(jobs)
+
+        # Importación diferida: el pool solo hace falta con muchos archivos
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Lotes contiguos: menos mensajes entre procesos que un envío por archivo
+        size = -(-len(jobs) // (workers * 4))
+        batches = [jobs[i : i + size] for i in range(0, len(jobs), size)]
+        entries: Dict[str, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch_entries, batch_errors in pool.map(_convert_batch, batches):
+                entries.update(batch_entries)
+                errors.update(batch_errors)
+        return entries, errors
+
+    @staticmethod
+    def _load_manifest(manifest_path: Path) -> Dict[str, Any]:
+        """
+        Leer las entradas del manifiesto de conversiones
+
+        Args:
+            manifest_path: Ruta al manifiesto
+
+        Returns:
+            Dict: Ruta relativa de origen -> firmas de origen y salida (vacío si
+            no existe o es de otra versión)
+        """
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            not isinstance(document, dict)
+            or document.get("version") != MANIFEST_VERSION
+        ):
+            return {}
+        return document.get("files", {})
+
     def import_cdk_context(
         self,
         cdk_json_path: str,
@@ -129,20 +426,28 @@ class ConfigConverter:
 
     def export_to_cdk_context(
         self, config_file: str, cdk_json_path: str, environment: Optional[str] = None
-    ) -> str:
+    ) -> ContextExport:
         """
         Exportar configuración a la sección context de un archivo cdk.json
 
+        Las secciones se fusionan con el contexto actual y las listas se
+        reemplazan siempre, sin aplicar 'merge_strategies'. cdk.json solo se
+        reescribe si el contexto fusionado difiere del actual, de modo que su
+        mtime no cambia cuando no hay nada que exportar. La
+        lectura, fusión y escritura (atómica) se hacen bajo un bloqueo de
+        archivo, por lo que varias síntesis concurrentes no pierden cambios.
+
         Args:
             config_file: Ruta al archivo de configuración
             cdk_json_path: Ruta al archivo cdk.json
             environment: Ambiente específico (dev, prod, stage, etc.)
 
         Returns:
-            str: Ruta al archivo cdk.json actualizado
+            ContextExport: Ruta a cdk.json, si cambió y las rutas del contexto
+            añadidas y modificadas (notación de punto)
 
         Raises:
-            FileNotFoundError: Si alguno de los archivos no existe
+            FileNotFoundError: Si el archivo de configuración no existe
         """
         config_path = Path(config_file)
         cdk_path = Path(cdk_json_path)
@@ -168,25 +473,73 @@ class ConfigConverter:
                 }
                 config_data = self._deep_merge(base_data, env_data)
 
-        # Cargar o crear archivo cdk.json
-        if cdk_path.exists():
-            with open(cdk_path, "r", encoding="utf-8") as f:
-                cdk_data = json.load(f)
-        else:
-            cdk_data = {}
+        with file_lock(cdk_path.with_name(f".{cdk_path.name}.lock")):
+            # Cargar o crear archivo cdk.json
+            if cdk_path.exists():
+                with open(cdk_path, "r", encoding="utf-8") as f:
+                    cdk_data = json.load(f)
+            else:
+                cdk_data = {}
+
+            # Fusionar configuración con context existente. El contexto ya es
+            # un resultado exportado: se reemplaza sin aplicar merge_strategies,
+            # que con 'append' volvería a añadir las listas en cada exportación
+            context = cdk_data.get("context", {})
+            merged = deep_merge(context, config_data, strategies={})
+
+            added: List[str] = []
+            updated: List[str] = []
+            _context_changes(context, merged, added, updated)
+            changed = bool(added or updated) or "context" not in cdk_data
+
+            if changed:
+                cdk_data["context"] = merged
+                write_atomic(cdk_path, json.dumps(cdk_data, indent=2))
+
+        return ContextExport(str(cdk_path), changed, added, updated)
 
-        # Actualizar sección context
-        if "context" not in cdk_data:
-            cdk_data["context"] = {}
+    def context_store(
+        self,
+        store_dir: Optional[str] = None,
+        max_age: Optional[float] = None,
+    ) -> CdkContextStore:
+        """
+        Obtener el almacén de lookups de contexto de CDK
 
-        # Fusionar configuración con context existente
-        cdk_data["context"] = self._deep_merge(cdk_data["context"], config_data)
+        Args:
+            store_dir: Directorio de los shards (por defecto <config_dir>/context)
+            max_age: Segundos sin cambios tras los que una entrada caduca
+                (None: nunca); las caducadas se reproducen con un aviso
 
-        # Guardar archivo cdk.json actualizado
-        with open(cdk_path, "w", encoding="utf-8") as f:
-            json.dump(cdk_data, f, indent=2)
+        Returns:
+            CdkContextStore: Almacén con un shard por ambiente
+        """
+        return CdkContextStore(store_dir or str(self.config_dir / "context"), max_age)
 
-        return str(cdk_path)
+    def record_cdk_context(
+        self,
+        environment: str,
+        cdk_context_path: str = "cdk.context.json",
+        store_dir: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Registrar los lookups de cdk.context.json en el shard de un ambiente
+
+        Args:
+            environment: Ambiente al que pertenecen los lookups
+            cdk_context_path: Ruta al archivo de contexto de CDK
+            store_dir: Directorio de los shards (por defecto <config_dir>/context)
+
+        Returns:
+            List: Claves añadidas o cuyo valor cambió
+
+        Raises:
+            FileNotFoundError: Si el archivo de contexto no existe
+        """
+        cdk_path = Path(cdk_context_path)
+        if not cdk_path.exists():
+            raise FileNotFoundError(f"Archivo de contexto no encontrado: {cdk_path}")
+        return self.context_store(store_dir).record_file(environment, str(cdk_path))
 
     def _detect_format(self, file_path: Path) -> str:
         """
@@ -226,15 +579,11 @@ class ConfigConverter:
         Raises:
             ValueError: Si hay un error al cargar el archivo
         """
+        if format_type not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Formato no soportado: {format_type}")
+
         with open(file_path, "r", encoding="utf-8") as f:
-            if format_type == "toml":
-                return toml.load(f)
-            elif format_type == "json":
-                return json.load(f)
-            elif format_type == "yaml":
-                return yaml.safe_load(f)
-            else:
-                raise ValueError(f"Formato no soportado: {format_type}")
+            return config_backends.loads(format_type, f.read())
 
     def _save_file(self, data: Dict[str, Any], file_path: Path, format_type: str):
         """
@@ -248,20 +597,18 @@ class ConfigConverter:
         Raises:
             ValueError: Si hay un error al guardar el archivo
         """
-        with open(file_path, "w", encoding="utf-8") as f:
-            if format_type == "toml":
-                toml.dump(data, f)
-            elif format_type == "json":
-                json.dump(data, f, indent=2)
-            elif format_type == "yaml":
-                yaml.dump(data, f, default_flow_style=False)
-            else:
-                raise ValueError(f"Formato no soportado: {format_type}")
+        if format_type not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Formato no soportado: {format_type}")
+
+        write_atomic(file_path, config_backends.dumps(format_type, data))
 
     def _deep_merge(self, base: Dict, update: Dict) -> Dict:
         """
         Fusión profunda de diccionarios
 
+        Las subsecciones no modificadas se comparten con la base en lugar de
+        copiarse (ver config_merge.deep_merge).
+
         Args:
             base: Diccionario base
             update: Diccionario con actualizaciones
@@ -269,14 +616,4 @@ class ConfigConverter:
         Returns:
             Dict: Diccionario fusionado
         """
-        result = base.copy()
-        for key, value in update.items():
-            if (
-                key in result
-                and isinstance(result[key], dict)
-                and isinstance(value, dict)
-            ):
-                result[key] = self._deep_merge(result[key], value)
-            else:
-                result[key] = value
-        return result
+        return deep_merge(base, update)
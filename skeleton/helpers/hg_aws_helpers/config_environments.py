@@ -0,0 +1,332 @@
+"""
+Herencia entre ambientes
+Un ambiente puede declarar `extends = "<ambiente>"` en su archivo env.<ambiente>.*
+o en su entrada de la tabla 'environments'; la cadena se fusiona desde el
+ancestro más lejano hasta el ambiente. Después se aplican las subcapas de
+región y de cuenta (region.<región>.*, account.<cuenta>.*) que correspondan a
+aws.region y aws.account del ambiente.
+
+EnvironmentGraph fusiona cada ambiente de la jerarquía una sola vez: los
+ambientes hermanos reutilizan el resultado de sus ancestros comunes.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .config_cache import _InFlightLoad
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_cache import _InFlightLoad
+
+# Clave con la que un ambiente declara su ambiente padre
+EXTENDS_KEY = "extends"
+
+# Subcapas por región y cuenta: (prefijo del archivo, rutas del valor en orden)
+SUBLAYERS = (
+    ("region", (("aws", "region"),)),
+    ("account", (("aws", "account"), ("aws", "account_id"))),
+)
+
+# Prefijos de los archivos que intervienen en la configuración de un ambiente
+ENVIRONMENT_FILE_PREFIXES = ("env.",) + tuple(f"{name}." for name, _ in SUBLAYERS)
+
+Layer = Tuple[Path, str]
+
+
+def environment_table(shared: Dict[str, Any], environment: str) -> Dict[str, Any]:
+    """
+    Obtener la entrada de un ambiente en la tabla 'environments'
+
+    Args:
+        shared: Configuración compartida ya fusionada
+        environment: Nombre del ambiente
+
+    Returns:
+        Dict: Valores del ambiente o diccionario vacío
+    """
+    table = shared.get("environments")
+    if not isinstance(table, dict):
+        return {}
+    entry = table.get(environment, table.get(environment.lower()))
+    return entry if isinstance(entry, dict) else {}
+
+
+def declared_parent(data: Dict[str, Any], source: str) -> Optional[str]:
+    """
+    Obtener el ambiente padre declarado en una capa
+
+    Args:
+        data: Datos de la capa del ambiente
+        source: Descripción de la capa, para los mensajes de error
+
+    Returns:
+        Nombre del ambiente padre o None si no declara ninguno
+
+    Raises:
+        ValueError: Si 'extends' no es un nombre de ambiente
+    """
+    parent = data.get(EXTENDS_KEY)
+    if parent is None:
+        return None
+    if not isinstance(parent, str) or not parent:
+        raise ValueError(
+            f"'{EXTENDS_KEY}' debe ser el nombre de un ambiente en {source}: {parent!r}"
+        )
+    return parent
+
+
+def without_extends(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Quitar la clave 'extends' de una capa para no fusionarla"""
+    if EXTENDS_KEY not in data:
+        return data
+    return {key: value for key, value in data.items() if key != EXTENDS_KEY}
+
+
+def environment_chain(
+    environment: str, parent_of: Callable[[str], Optional[str]]
+) -> List[str]:
+    """
+    Calcular la cadena de herencia de un ambiente
+
+    Args:
+        environment: Nombre del ambiente
+        parent_of: Función que devuelve el padre de un ambiente (o None)
+
+    Returns:
+        List: Ambientes desde el ancestro más lejano hasta el ambiente
+
+    Raises:
+        ValueError: Si la herencia es circular
+    """
+    chain = [environment]
+    parent = parent_of(environment)
+    while parent is not None:
+        if parent in chain:
+            cycle = chain[chain.index(parent) :] + [parent]
+            raise ValueError("Herencia circular: " + " -> ".join(cycle))
+        chain.append(parent)
+        parent = parent_of(parent)
+    return chain[::-1]
+
+
+def sublayer_stems(data: Dict[str, Any]) -> List[str]:
+    """
+    Obtener los nombres de las subcapas que corresponden a una configuración
+
+    Args:
+        data: Configuración fusionada del ambiente
+
+    Returns:
+        List: Nombres de archivo sin extensión (ej: 'region.eu-west-1'), de
+        menor a mayor prioridad
+    """
+    stems = []
+    for prefix, paths in SUBLAYERS:
+        for path in paths:
+            value: Any = data
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(value, (str, int)) and not isinstance(value, bool):
+                stems.append(f"{prefix}.{value}")
+                break
+    return stems
+
+
+def environment_files(file_names: Iterable[str]) -> List[str]:
+    """
+    Filtrar los archivos que pueden intervenir en la herencia de ambientes
+
+    Args:
+        file_names: Nombres de archivo del directorio de configuración
+
+    Returns:
+        List: Nombres de archivo env.*, region.* y account.* ordenados
+    """
+    return sorted(n for n in file_names if n.startswith(ENVIRONMENT_FILE_PREFIXES))
+
+
+class EnvironmentGraph:
+    """
+    Fusión de ambientes con herencia y memoización por ambiente.
+
+    Cada ambiente de la jerarquía se fusiona una vez sobre el resultado de su
+    padre; el resultado se comparte con todos sus descendientes. Es seguro
+    usar la misma instancia desde varios hilos: los ambientes distintos se
+    fusionan en paralelo y las fusiones concurrentes de un mismo ambiente se
+    agrupan en una sola (single-flight, como ConfigCache.get_or_load).
+    """
+
+    def __init__(self, loader: Any, shared: Dict[str, Any]):
+        """
+        Inicializar EnvironmentGraph
+
+        Args:
+            loader: ConfigLoader que localiza y parsea las capas
+            shared: Configuración compartida ya fusionada (no se modifica)
+        """
+        self.loader = loader
+        self.shared = shared
+        # Número de fusiones realizadas (una por ambiente y subcapa aplicada)
+        self.merges = 0
+        self._lock = threading.Lock()
+        self._own: Dict[str, Tuple[Dict[str, Any], Optional[Layer], Any]] = {}
+        self._nodes: Dict[str, Tuple[Dict[str, Any], Tuple[Layer, ...]]] = {}
+        self._in_flight: Dict[str, _InFlightLoad] = {}
+
+    def _own_layers(
+        self, environment: str
+    ) -> Tuple[Dict[str, Any], Optional[Layer], Dict[str, Any]]:
+        """
+        Obtener las capas propias de un ambiente
+
+        Args:
+            environment: Nombre del ambiente
+
+        Returns:
+            Tupla (entrada de la tabla 'environments', capa env.<ambiente>.*,
+            datos de esa capa)
+        """
+        with self._lock:
+            own = self._own.get(environment)
+        if own is None:
+            # Dos hilos pueden leer la misma capa; el cache de fragmentos
+            # evita parsearla dos veces y se conserva el primer resultado
+            layer = self.loader._environment_layer(environment)
+            data = (self.loader._load_by_format(*layer) or {}) if layer else {}
+            own = (environment_table(self.shared, environment), layer, data)
+            with self._lock:
+                own = self._own.setdefault(environment, own)
+        return own
+
+    def exists(self, environment: str) -> bool:
+        """Indicar si un ambiente tiene archivo propio o entrada en la tabla"""
+        table, layer, _ = self._own_layers(environment)
+        return layer is not None or bool(table)
+
+    def parent(self, environment: str) -> Optional[str]:
+        """
+        Obtener el ambiente padre (el archivo del ambiente prevalece sobre la tabla)
+
+        Args:
+            environment: Nombre del ambiente
+
+        Returns:
+            Nombre del ambiente padre o None
+        """
+        table, layer, data = self._own_layers(environment)
+        if EXTENDS_KEY in data:
+            return declared_parent(data, str(layer[0]))
+        return declared_parent(table, f"environments.{environment}")
+
+    def node(self, environment: str) -> Tuple[Dict[str, Any], Tuple[Layer, ...]]:
+        """
+        Fusionar un ambiente con sus ancestros (sin subcapas)
+
+        Args:
+            environment: Nombre del ambiente
+
+        Returns:
+            Tupla (configuración fusionada, archivos de ambiente aplicados desde
+            el ancestro más lejano)
+
+        Raises:
+            ValueError: Si la herencia es circular o un ancestro no existe
+        """
+        with self._lock:
+            cached = self._nodes.get(environment)
+        if cached is not None:
+            return cached
+
+        chain = environment_chain(environment, self.parent)
+        for parent, child in zip(chain, chain[1:]):
+            if parent not in self._nodes and not self.exists(parent):
+                raise ValueError(
+                    f"Ambiente base no encontrado: {parent} "
+                    f"({EXTENDS_KEY} de {child})"
+                )
+        return self._merge_chain(chain)
+
+    def _merge_chain(
+        self, chain: List[str]
+    ) -> Tuple[Dict[str, Any], Tuple[Layer, ...]]:
+        """
+        Fusionar el último ambiente de una cadena sobre el resultado de su padre
+
+        Solo se espera a los hilos que fusionan el mismo ambiente o alguno de
+        sus ancestros; los ambientes hermanos se fusionan en paralelo.
+
+        Args:
+            chain: Ambientes desde el ancestro más lejano hasta el ambiente
+
+        Returns:
+            Tupla (configuración fusionada, archivos de ambiente aplicados)
+        """
+        name = chain[-1]
+        with self._lock:
+            cached = self._nodes.get(name)
+            if cached is not None:
+                return cached
+            flight = self._in_flight.get(name)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[name] = _InFlightLoad()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.data
+
+        try:
+            data: Dict[str, Any] = self.shared
+            layers: Tuple[Layer, ...] = ()
+            if len(chain) > 1:
+                data, layers = self._merge_chain(chain[:-1])
+            table, layer, layer_data = self._own_layers(name)
+            if table:
+                data = self.loader._deep_merge(data, without_extends(table))
+            if layer:
+                data = self.loader._deep_merge(data, without_extends(layer_data))
+                layers += (layer,)
+            flight.data = (data, layers)
+            with self._lock:
+                if table or layer:
+                    self.merges += 1
+                self._nodes[name] = flight.data
+            return flight.data
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[name]
+            flight.done.set()
+
+    def resolve(self, environment: str) -> Tuple[Dict[str, Any], List[Layer]]:
+        """
+        Obtener la configuración completa de un ambiente
+
+        Args:
+            environment: Nombre del ambiente
+
+        Returns:
+            Tupla (configuración fusionada, archivos de ambiente y subcapas
+            aplicados en orden)
+
+        Raises:
+            ValueError: Si la herencia es circular o un ancestro no existe
+        """
+        data, layers = self.node(environment)
+        applied = list(layers)
+        for stem in sublayer_stems(data):
+            layer = self.loader._find_layer(stem)
+            if layer is None:
+                continue
+            data = self.loader._deep_merge(
+                data, self.loader._load_by_format(*layer) or {}
+            )
+            applied.append(layer)
+            with self._lock:
+                self.merges += 1
+        return data, applied
@@ -0,0 +1,529 @@
+"""
+Fragmentos de configuración para ConfigLoader
+Permite dividir una configuración grande en fragmentos (directorio config.d/ e
+inclusiones con `!include` en YAML o `__include__` en TOML/JSON). Cada fragmento
+parseado se guarda en un cache por hash de contenido, de modo que un fragmento
+compartido por varios ambientes se parsea una sola vez y editar un fragmento
+solo obliga a volver a parsear ese fragmento.
+"""
+
+import importlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    from . import config_backends
+    from .config_cache import (
+        ConfigCache,
+        ConfigDirectoryIndex,
+        layer_signature,
+        read_with_signature,
+        sha256_hex,
+    )
+    from .config_merge import deep_merge
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    import config_backends
+    from config_cache import (
+        ConfigCache,
+        ConfigDirectoryIndex,
+        layer_signature,
+        read_with_signature,
+        sha256_hex,
+    )
+    from config_merge import deep_merge
+
+# Formatos soportados y sus extensiones, en orden de preferencia
+FORMAT_EXTENSIONS = {
+    "toml": [".toml"],
+    "json": [".json"],
+    "yaml": [".yaml", ".yml"],
+}
+
+# Directorio de fragmentos dentro del directorio de configuración
+FRAGMENTS_DIR = "config.d"
+
+# Clave de primer nivel con las inclusiones de un fragmento (TOML, JSON, YAML)
+INCLUDE_KEY = "__include__"
+
+# Etiqueta YAML para incluir un fragmento en cualquier posición
+INCLUDE_TAG = "!include"
+
+# Número máximo de fragmentos parseados en el cache en memoria
+DEFAULT_MAX_FRAGMENTS = 256
+
+
+class Include:
+    """Marcador de una etiqueta `!include` pendiente de resolver"""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        """
+        Inicializar Include
+
+        Args:
+            path: Ruta del fragmento incluido, relativa al archivo que lo incluye
+        """
+        self.path = path
+
+    def __repr__(self) -> str:
+        """Representación legible del marcador"""
+        return f"Include({self.path!r})"
+
+
+class Fragment(NamedTuple):
+    """Fragmento cargado con sus inclusiones ya resueltas"""
+
+    path: Path
+    format_type: str
+    digest: str
+    data: Dict[str, Any]
+    includes: Tuple[Path, ...] = ()
+
+
+class FragmentCache:
+    """
+    Cache LRU de fragmentos parseados indexado por hash de contenido.
+
+    Es seguro entre hilos. Además recuerda, por ruta, la firma de los bytes
+    parseados y los archivos incluidos en la última carga para que el cache en
+    disco y los snapshots puedan validarlos.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_FRAGMENTS):
+        """
+        Inicializar FragmentCache
+
+        Args:
+            max_entries: Número máximo de fragmentos parseados
+        """
+        self._parsed = ConfigCache(max_entries)
+        self._includes: Dict[str, Tuple[Path, ...]] = {}
+        self._signatures: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[Any]:
+        """
+        Obtener un fragmento parseado
+
+        Args:
+            key: Tupla (formato, hash del contenido)
+
+        Returns:
+            Datos parseados o None si no están en el cache
+        """
+        with self._lock:
+            return self._parsed.get(key)
+
+    def put(self, key: Tuple[str, str], data: Any):
+        """
+        Guardar un fragmento parseado
+
+        Args:
+            key: Tupla (formato, hash del contenido)
+            data: Datos parseados (sin resolver inclusiones)
+        """
+        with self._lock:
+            self._parsed.put(key, data)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        """Permite usar 'in' sin afectar estadísticas ni orden LRU"""
+        with self._lock:
+            return key in self._parsed
+
+    def record_load(
+        self,
+        file_path: Path,
+        includes: Tuple[Path, ...],
+        signature: Dict[str, Any],
+    ):
+        """
+        Registrar la última carga de un fragmento
+
+        Args:
+            file_path: Ruta del fragmento
+            includes: Archivos incluidos de forma transitiva
+            signature: Firma de los bytes que se parsearon
+        """
+        with self._lock:
+            self._includes[str(file_path)] = includes
+            self._signatures[str(file_path)] = signature
+
+    def signature(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Obtener la firma de los bytes parseados en la última carga
+
+        Args:
+            file_path: Ruta del fragmento
+
+        Returns:
+            Dict con la firma o None si el fragmento no se ha cargado
+        """
+        with self._lock:
+            signature = self._signatures.get(str(file_path))
+            return dict(signature) if signature is not None else None
+
+    def includes(self, file_path: Path) -> Tuple[Path, ...]:
+        """
+        Obtener los archivos incluidos por un fragmento en su última carga
+
+        Args:
+            file_path: Ruta del fragmento
+
+        Returns:
+            Tuple: Archivos incluidos de forma transitiva
+        """
+        with self._lock:
+            return self._includes.get(str(file_path), ())
+
+    def clear(self):
+        """Eliminar todos los fragmentos y reiniciar las estadísticas"""
+        with self._lock:
+            self._parsed.clear()
+            self._includes.clear()
+            self._signatures.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtener estadísticas del cache
+
+        Returns:
+            Dict: hits, misses, evictions, entries, max_entries y bytes estimados
+        """
+        with self._lock:
+            return self._parsed.stats()
+
+
+# Cache de fragmentos compartido por todo el proceso
+fragment_cache = FragmentCache()
+
+# Loaders YAML con soporte de `!include` por clase base
+_include_loaders: Dict[type, type] = {}
+
+
+def detect_format(file_path: Path) -> str:
+    """
+    Detectar formato basado en la extensión del archivo
+
+    Args:
+        file_path: Ruta al archivo
+
+    Returns:
+        str: Formato detectado ('toml', 'json', 'yaml')
+
+    Raises:
+        ValueError: Si el formato no es soportado
+    """
+    suffix = file_path.suffix.lower()
+    for format_name, extensions in FORMAT_EXTENSIONS.items():
+        if suffix in extensions:
+            return format_name
+    raise ValueError(f"Formato no soportado para el archivo: {file_path}")
+
+
+def fragment_files(
+    config_dir: Path, formats: Optional[Dict[str, List[str]]] = None
+) -> List[Tuple[Path, str]]:
+    """
+    Listar los fragmentos del directorio config.d/ en orden lexicográfico
+
+    Args:
+        config_dir: Directorio de configuración
+        formats: Formatos y sus extensiones (por defecto FORMAT_EXTENSIONS)
+
+    Returns:
+        List: Tuplas (ruta, formato) en orden de fusión
+    """
+    extensions = {
+        ext: format_name
+        for format_name, exts in (formats or FORMAT_EXTENSIONS).items()
+        for ext in exts
+    }
+    index = ConfigDirectoryIndex.for_directory(Path(config_dir) / FRAGMENTS_DIR)
+
+    fragments = []
+    for file_name, file_path in sorted(index.files().items()):
+        format_name = extensions.get(file_path.suffix.lower())
+        if format_name and not file_name.startswith("."):
+            fragments.append((file_path, format_name))
+    return fragments
+
+
+def _yaml_include_loader() -> type:
+    """
+    Obtener un loader YAML seguro que construye marcadores Include
+
+    Se usa la misma implementación (libyaml o PyYAML) que el backend de
+    lectura seleccionado.
+
+    Returns:
+        type: Clase de loader con la etiqueta `!include` registrada
+    """
+    yaml = importlib.import_module("yaml")
+    backend = config_backends.get_backend("yaml", config_backends.READ)
+    base = yaml.CSafeLoader if backend.name == "libyaml" else yaml.SafeLoader
+
+    loader = _include_loaders.get(base)
+    if loader is None:
+        loader = type("IncludeLoader", (base,), {})
+        loader.add_constructor(
+            INCLUDE_TAG,
+            lambda yaml_loader, node: Include(yaml_loader.construct_scalar(node)),
+        )
+        _include_loaders[base] = loader
+    return loader
+
+
+def parse_fragment(
+    content: bytes, format_type: str, digest: Optional[str] = None
+) -> Tuple[str, Any]:
+    """
+    Parsear el contenido de un fragmento usando el cache por hash
+
+    Args:
+        content: Contenido del archivo
+        format_type: Formato del fragmento
+        digest: Hash del contenido si ya se calculó
+
+    Returns:
+        Tupla (hash del contenido, datos parseados sin resolver inclusiones)
+    """
+    digest = digest or sha256_hex(content)
+    key = (format_type, digest)
+    data = fragment_cache.get(key)
+    if data is not None:
+        return digest, data
+
+    text = content.decode("utf-8")
+    if format_type == "yaml" and INCLUDE_TAG.encode() in content:
+        yaml = importlib.import_module("yaml")
+        data = yaml.load(text, Loader=_yaml_include_loader())
+    else:
+        data = config_backends.loads(format_type, text)
+
+    data = data or {}
+    fragment_cache.put(key, data)
+    return digest, data
+
+
+def _include_paths(value: Any, base_dir: Path) -> List[Path]:
+    """
+    Normalizar el valor de __include__ a una lista de rutas
+
+    Args:
+        value: Ruta o lista de rutas
+        base_dir: Directorio del archivo que incluye
+
+    Returns:
+        List: Rutas de los fragmentos incluidos
+
+    Raises:
+        ValueError: Si el valor no es una ruta ni una lista de rutas
+    """
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError(f"{INCLUDE_KEY} debe ser una ruta o una lista de rutas")
+    return [base_dir / v for v in values]
+
+
+def _resolve(
+    value: Any, base_dir: Path, stack: Tuple[Path, ...], includes: List[Path]
+) -> Any:
+    """
+    Reemplazar los marcadores Include por los datos de los fragmentos
+
+    Las subestructuras sin marcadores se devuelven sin copiar.
+
+    Args:
+        value: Valor parseado
+        base_dir: Directorio del archivo que incluye
+        stack: Fragmentos en proceso de carga (detección de ciclos)
+        includes: Lista donde acumular los archivos incluidos
+
+    Returns:
+        Valor con las inclusiones resueltas
+    """
+    if isinstance(value, Include):
+        fragment = _load(base_dir / value.path, None, stack)
+        includes.append(fragment.path)
+        includes.extend(fragment.includes)
+        return fragment.data
+
+    if isinstance(value, dict):
+        resolved = None
+        for key, item in value.items():
+            new_item = _resolve(item, base_dir, stack, includes)
+            if new_item is not item:
+                if resolved is None:
+                    resolved = value.copy()
+                resolved[key] = new_item
+        return value if resolved is None else resolved
+
+    if isinstance(value, list):
+        items = [_resolve(item, base_dir, stack, includes) for item in value]
+        if any(new is not old for new, old in zip(items, value)):
+            return items
+    return value
+
+
+def _read(file_path: Path) -> Tuple[bytes, Dict[str, Any]]:
+    """Leer el contenido de un fragmento y la firma de los bytes leídos"""
+    try:
+        return read_with_signature(file_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Fragmento no encontrado: {file_path}")
+
+
+def _load(
+    file_path: Path,
+    format_type: Optional[str],
+    stack: Tuple[Path, ...],
+    source: Optional[Tuple[bytes, Dict[str, Any]]] = None,
+) -> Fragment:
+    """
+    Cargar un fragmento resolviendo sus inclusiones
+
+    Args:
+        file_path: Ruta al fragmento
+        format_type: Formato (por defecto se detecta por la extensión)
+        stack: Fragmentos en proceso de carga (detección de ciclos)
+        source: Contenido ya leído del fragmento y su firma (opcional)
+
+    Returns:
+        Fragment: Fragmento cargado
+
+    Raises:
+        FileNotFoundError: Si el fragmento no existe
+        ValueError: Si hay una inclusión circular o el formato no es soportado
+    """
+    file_path = Path(file_path).resolve()
+    if file_path in stack:
+        chain = " -> ".join(str(p) for p in stack + (file_path,))
+        raise ValueError(f"Inclusión circular de fragmentos: {chain}")
+
+    format_type = format_type or detect_format(file_path)
+    if format_type not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Formato no soportado: {format_type}")
+
+    content, signature = source if source is not None else _read(file_path)
+    digest, data = parse_fragment(content, format_type, signature["sha256"])
+    stack = stack + (file_path,)
+    includes: List[Path] = []
+
+    if isinstance(data, dict) and INCLUDE_KEY in data:
+        merged: Dict[str, Any] = {}
+        for include_path in _include_paths(data[INCLUDE_KEY], file_path.parent):
+            fragment = _load(include_path, None, stack)
+            includes.append(fragment.path)
+            includes.extend(fragment.includes)
+            merged = deep_merge(merged, fragment.data)
+        own = {k: v for k, v in data.items() if k != INCLUDE_KEY}
+        data = deep_merge(merged, _resolve(own, file_path.parent, stack, includes))
+    else:
+        data = _resolve(data, file_path.parent, stack, includes)
+
+    includes_tuple = tuple(dict.fromkeys(includes))
+    fragment_cache.record_load(file_path, includes_tuple, signature)
+    return Fragment(file_path, format_type, digest, data, includes_tuple)
+
+
+def load_fragment(file_path: Path, format_type: Optional[str] = None) -> Fragment:
+    """
+    Cargar un fragmento de configuración resolviendo sus inclusiones
+
+    Las rutas de `__include__` y `!include` son relativas al archivo que las
+    declara. Con `__include__` los fragmentos incluidos se fusionan en orden y
+    el contenido propio del archivo se aplica encima.
+
+    Args:
+        file_path: Ruta al fragmento
+        format_type: Formato (por defecto se detecta por la extensión)
+
+    Returns:
+        Fragment: Fragmento cargado
+
+    Raises:
+        FileNotFoundError: Si el fragmento o alguna inclusión no existe
+        ValueError: Si hay una inclusión circular o el formato no es soportado
+    """
+    return _load(Path(file_path), format_type, ())
+
+
+def load_fragments(
+    layers: Iterable[Tuple[Path, Optional[str]]], max_workers: Optional[int] = None
+) -> List[Fragment]:
+    """
+    Cargar varios fragmentos conservando el orden
+
+    Los fragmentos que no están en el cache se parsean en paralelo; si solo
+    falta uno (el caso habitual al editar un fragmento) no se crea el pool.
+
+    Args:
+        layers: Tuplas (ruta, formato) de menor a mayor prioridad
+        max_workers: Número máximo de hilos
+
+    Returns:
+        List: Fragmentos cargados en el mismo orden
+    """
+    layers = [
+        (Path(path).resolve(), format_type or detect_format(Path(path)))
+        for path, format_type in layers
+    ]
+    sources = [_read(path) for path, _ in layers]
+
+    pending = {}
+    for (_, format_type), (content, signature) in zip(layers, sources):
+        key = (format_type, signature["sha256"])
+        if key not in fragment_cache:
+            pending[key] = (content, format_type, signature["sha256"])
+
+    if len(pending) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            list(pool.map(lambda item: parse_fragment(*item), pending.values()))
+
+    return [
+        _load(path, format_type, (), source)
+        for (path, format_type), source in zip(layers, sources)
+    ]
+
+
+def fragment_dependencies(paths: Iterable[Path]) -> List[Path]:
+    """
+    Obtener los archivos incluidos por los fragmentos en su última carga
+
+    Args:
+        paths: Rutas de los fragmentos
+
+    Returns:
+        List: Archivos incluidos, sin repetir y en orden de aparición
+    """
+    dependencies: Dict[Path, None] = {}
+    for file_path in paths:
+        for include in fragment_cache.includes(Path(file_path).resolve()):
+            dependencies.setdefault(include)
+    return list(dependencies)
+
+
+def fragment_signatures(paths: Iterable[Path]) -> List[Dict[str, Any]]:
+    """
+    Obtener la firma de los bytes parseados de cada archivo en su última carga
+
+    Los caches persistentes guardan estas firmas en lugar de volver a leer los
+    archivos: si un archivo cambia entre el parseo y el guardado, la firma
+    sigue describiendo los datos parseados y la entrada se invalida.
+
+    Args:
+        paths: Rutas de los fragmentos, en orden
+
+    Returns:
+        List: Firmas en el mismo orden (los archivos no cargados se firman ahora)
+    """
+    signatures = []
+    for file_path in paths:
+        file_path = Path(file_path).resolve()
+        signature = fragment_cache.signature(file_path)
+        signatures.append(signature or layer_signature(file_path))
+    return signatures
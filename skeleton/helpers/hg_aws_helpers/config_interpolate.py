@@ -0,0 +1,296 @@
+"""
+Interpolación de referencias en configuraciones fusionadas
+Resuelve ${seccion.clave} y ${env:VARIABLE} una sola vez, después de fusionar
+las capas, en un recorrido ordenado por dependencias con detección de ciclos.
+El resultado ya no contiene referencias resolubles: leer un valor no hace
+trabajo de cadenas.
+"""
+
+import json
+import os
+import re
+import warnings
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+# ${ruta}, ${env:VAR}, ${env:VAR:-defecto}; '$${' es un '${' literal. Solo son
+# referencias las rutas de claves (ej: network.subnets[0]) y env:; el resto de
+# '${...}' (pseudoparámetros de CloudFormation como ${AWS::Region}, variables de
+# políticas IAM como ${aws:username}) se conserva tal cual. Una ruta que no
+# existe en la configuración también se conserva: puede ser una variable de
+# Fn::Sub como ${BucketName} o ${MyBucket.Arn}
+REFERENCE_PATTERN = re.compile(
+    r"\$\$\{"
+    r"|\$\{(\s*(?:env:[^{}]+"
+    r"|[A-Za-z_][\w-]*(?:\s*\.\s*[A-Za-z_][\w-]*|\[\d+\])*)\s*)\}"
+)
+
+# Segmentos de una ruta: claves separadas por punto e índices entre corchetes
+_SEGMENT_PATTERN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+KeyPath = Tuple[Any, ...]
+
+# Resultado de una referencia cuya ruta no existe en la configuración
+_UNRESOLVED = object()
+
+
+@lru_cache(maxsize=4096)
+def parse_reference(reference: str) -> KeyPath:
+    """
+    Convertir una ruta con notación de punto en sus segmentos
+
+    Args:
+        reference: Ruta (ej: 'network.public_subnets[0]')
+
+    Returns:
+        Tupla de claves (str) e índices (int)
+
+    Raises:
+        ValueError: Si la ruta no es válida
+    """
+    if "[" not in reference:
+        # Caso habitual: solo claves separadas por punto
+        keys = tuple(key.strip() for key in reference.split("."))
+        if not all(keys):
+            raise ValueError(f"Referencia no válida: ${{{reference}}}")
+        return keys
+
+    segments: List[Any] = []
+    position = 0
+    for match in _SEGMENT_PATTERN.finditer(reference):
+        separator = reference[position : match.start()]
+        if separator not in ("", ".") or (separator == "." and not segments):
+            raise ValueError(f"Referencia no válida: ${{{reference}}}")
+        key, index = match.groups()
+        segments.append(int(index) if index is not None else key.strip())
+        position = match.end()
+    if not segments or position != len(reference):
+        raise ValueError(f"Referencia no válida: ${{{reference}}}")
+    return tuple(segments)
+
+
+def _format_path(path: KeyPath) -> str:
+    """Convertir segmentos en notación de punto (ej: network.subnets[0])"""
+    text = ""
+    for segment in path:
+        if isinstance(segment, int):
+            text += f"[{segment}]"
+        else:
+            text = f"{text}.{segment}" if text else segment
+    return text
+
+
+def _templates(data: Any) -> Dict[KeyPath, str]:
+    """
+    Encontrar las cadenas que contienen referencias
+
+    Args:
+        data: Configuración fusionada
+
+    Returns:
+        Dict: Ruta -> cadena con referencias, en orden de recorrido
+    """
+    templates: Dict[KeyPath, str] = {}
+    stack: List[Tuple[KeyPath, Any]] = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend((path + (k,), v) for k, v in value.items())
+        elif isinstance(value, list):
+            stack.extend((path + (i,), v) for i, v in enumerate(value))
+        elif (
+            isinstance(value, str) and "${" in value and REFERENCE_PATTERN.search(value)
+        ):
+            templates[path] = value
+    return templates
+
+
+class _Resolver:
+    """Resolución en orden de dependencias con memoización por ruta"""
+
+    def __init__(self, data: Any, templates: Dict[KeyPath, str], environ: Mapping):
+        self.data = data
+        self.templates = templates
+        self.environ = environ
+        self.resolved: Dict[KeyPath, Any] = {}
+        self.visiting: List[KeyPath] = []
+        self.visiting_set: Set[KeyPath] = set()
+        # Prefijos de las rutas con referencias, para resolver secciones enteras
+        self.prefixes: Set[KeyPath] = {p[:i] for p in templates for i in range(len(p))}
+
+    def resolve_template(self, path: KeyPath) -> Any:
+        """
+        Resolver la cadena de una ruta (y antes, sus dependencias)
+
+        Args:
+            path: Ruta de la cadena con referencias
+
+        Returns:
+            Valor resuelto
+
+        Raises:
+            ValueError: Si hay un ciclo o una variable de entorno no está definida
+        """
+        if path in self.resolved:
+            return self.resolved[path]
+        if path in self.visiting_set:
+            cycle = self.visiting[self.visiting.index(path) :] + [path]
+            raise ValueError(
+                "Referencia circular: " + " -> ".join(_format_path(p) for p in cycle)
+            )
+
+        self.visiting.append(path)
+        self.visiting_set.add(path)
+        template = self.templates[path]
+
+        match = REFERENCE_PATTERN.fullmatch(template)
+        if match and match.group(1) is not None:
+            # Referencia completa: se conserva el tipo del valor referenciado
+            value = self.reference(match.group(1), path)
+            if value is _UNRESOLVED:
+                value = template
+        else:
+            value = REFERENCE_PATTERN.sub(
+                lambda m: self.render(m.group(1), path), template
+            )
+
+        self.visiting.pop()
+        self.visiting_set.discard(path)
+        self.resolved[path] = value
+        return value
+
+    def render(self, reference: Optional[str], path: KeyPath) -> str:
+        """Convertir una referencia dentro de una cadena en texto"""
+        if reference is None:
+            return "${"
+        value = self.reference(reference, path)
+        if value is _UNRESOLVED:
+            return f"${{{reference}}}"
+        return value if isinstance(value, str) else json.dumps(value)
+
+    def reference(self, reference: str, path: KeyPath) -> Any:
+        """
+        Obtener el valor de una referencia
+
+        Si la ruta no existe se conserva el texto de la referencia; si además
+        su primera clave es una sección de la configuración (probable errata)
+        se emite un RuntimeWarning.
+
+        Args:
+            reference: Contenido de ${...}
+            path: Ruta de la cadena que contiene la referencia
+
+        Returns:
+            Valor resuelto de la referencia o _UNRESOLVED si la ruta no existe
+
+        Raises:
+            ValueError: Si la variable de entorno no está definida
+        """
+        reference = reference.strip()
+        if reference.startswith("env:"):
+            name, sep, default = reference[4:].partition(":-")
+            value = self.environ.get(name.strip())
+            if value is None:
+                if not sep:
+                    raise ValueError(
+                        f"Variable de entorno no definida: {name.strip()} "
+                        f"(en {_format_path(path)})"
+                    )
+                value = default
+            return value
+
+        target = parse_reference(reference)
+        value: Any = self.data
+        for segment in target:
+            try:
+                value = value[segment]
+            except (KeyError, IndexError, TypeError):
+                if isinstance(self.data, dict) and target[0] in self.data:
+                    warnings.warn(
+                        f"Referencia no encontrada, se conserva el texto: "
+                        f"${{{reference}}} (en {_format_path(path)})",
+                        RuntimeWarning,
+                        stacklevel=2,
+                    )
+                return _UNRESOLVED
+        return self.value(target, value)
+
+    def value(self, path: KeyPath, value: Any) -> Any:
+        """
+        Obtener el valor resuelto de una ruta
+
+        Args:
+            path: Ruta del valor
+            value: Valor sin resolver
+
+        Returns:
+            Valor con sus referencias resueltas (copia si es una sección que
+            contiene referencias)
+        """
+        if path in self.templates:
+            return self.resolve_template(path)
+        if path not in self.prefixes:
+            return value
+        if isinstance(value, dict):
+            return {k: self.value(path + (k,), v) for k, v in value.items()}
+        return [self.value(path + (i,), v) for i, v in enumerate(value)]
+
+
+def _assign(data: Any, path: KeyPath, value: Any, copied: Set[KeyPath]) -> Any:
+    """
+    Asignar un valor en una ruta copiando solo los contenedores del camino
+
+    Args:
+        data: Raíz (ya copiada)
+        path: Ruta del valor
+        value: Valor resuelto
+        copied: Rutas de los contenedores ya copiados
+
+    Returns:
+        Raíz con el valor asignado
+    """
+    node = data
+    for depth, segment in enumerate(path[:-1]):
+        prefix = path[: depth + 1]
+        child = node[segment]
+        if prefix not in copied:
+            child = child.copy()
+            node[segment] = child
+            copied.add(prefix)
+        node = child
+    node[path[-1]] = value
+    return data
+
+
+def resolve_references(
+    data: Dict[str, Any], environ: Optional[Mapping[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Resolver las referencias de una configuración fusionada
+
+    Cada cadena con referencias se resuelve una sola vez; el coste es lineal
+    en el número de referencias. No se modifica la entrada: solo se copian los
+    contenedores que contienen referencias y el resto se comparte. Las
+    referencias a rutas que no existen se conservan como texto.
+
+    Args:
+        data: Configuración fusionada
+        environ: Variables de entorno (por defecto os.environ)
+
+    Returns:
+        Dict: Configuración sin referencias (la misma si no tenía ninguna)
+
+    Raises:
+        ValueError: Si hay referencias circulares o variables de entorno sin
+            definir
+    """
+    templates = _templates(data)
+    if not templates:
+        return data
+
+    resolver = _Resolver(data, templates, os.environ if environ is None else environ)
+    result = data.copy()
+    copied: Set[KeyPath] = set()
+    for path in templates:
+        _assign(result, path, resolver.resolve_template(path), copied)
+    return result
@@ -4,33 +4,172 @@ Maneja la carga y validación de archivos de configuración en múltiples format
 (TOML, JSON, YAML) con soporte para configuraciones multi-ambiente.
 """
 
-import json
 import os
-from dataclasses import dataclass
+import re
+import warnings
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    KeysView,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+try:
+    from .config_cache import (
+        DEFAULT_CACHE_DIR,
+        ConfigCache,
+        ConfigDirectoryIndex,
+        DiskConfigCache,
+    )
+    from .config_environments import EnvironmentGraph, environment_files
+    from .config_fragments import (
+        FRAGMENTS_DIR,
+        fragment_cache,
+        fragment_dependencies,
+        fragment_files,
+        fragment_signatures,
+        load_fragment,
+        load_fragments,
+    )
+    from .config_interpolate import resolve_references
+    from .config_merge import MISSING, deep_merge
+    from .config_merkle import MerkleTree, diff_trees
+    from .config_schema import validate_config, validate_environments
+    from .config_snapshot import (
+        DEFAULT_SNAPSHOT_DIR,
+        SnapshotEncodingError,
+        directories_changed,
+        read_snapshot,
+        snapshot_layers,
+        snapshot_path,
+        write_snapshot,
+    )
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_cache import (
+        DEFAULT_CACHE_DIR,
+        ConfigCache,
+        ConfigDirectoryIndex,
+        DiskConfigCache,
+    )
+    from config_environments import EnvironmentGraph, environment_files
+    from config_fragments import (
+        FRAGMENTS_DIR,
+        fragment_cache,
+        fragment_dependencies,
+        fragment_files,
+        fragment_signatures,
+        load_fragment,
+        load_fragments,
+    )
+    from config_interpolate import resolve_references
+    from config_merge import MISSING, deep_merge
+    from config_merkle import MerkleTree, diff_trees
+    from config_schema import validate_config, validate_environments
+    from config_snapshot import (
+        DEFAULT_SNAPSHOT_DIR,
+        SnapshotEncodingError,
+        directories_changed,
+        read_snapshot,
+        snapshot_layers,
+        snapshot_path,
+        write_snapshot,
+    )
+
+
+def flatten_paths(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construir un índice plano de todas las rutas con notación de punto
+
+    Incluye secciones intermedias y elementos de listas con índice entre
+    corchetes (ej: 'network.public_subnets[0]'). Las claves que contienen
+    '.' o '[' no se indexan porque no son direccionables con esta notación.
+
+    Args:
+        data: Configuración anidada
 
-import toml
-import yaml
+    Returns:
+        Dict: Ruta con notación de punto -> valor
+    """
+    index: Dict[str, Any] = {}
+    stack: List[Tuple[str, Any]] = [("", data)]
+
+    while stack:
+        prefix, value = stack.pop()
+        if isinstance(value, dict):
+            for key, child in value.items():
+                key = str(key)
+                if "." in key or "[" in key:
+                    continue
+                path = f"{prefix}.{key}" if prefix else key
+                index[path] = child
+                if isinstance(child, (dict, list)):
+                    stack.append((path, child))
+        elif isinstance(value, list):
+            for position, child in enumerate(value):
+                path = f"{prefix}[{position}]"
+                index[path] = child
+                if isinstance(child, (dict, list)):
+                    stack.append((path, child))
+
+    return index
 
 
 class ConfigSection:
     """
     Clase para acceder a secciones de configuración con notación de atributos
     y soporte para valores por defecto.
+
+    Las subsecciones se crean una sola vez por clave y se reutilizan en accesos
+    posteriores; las claves inexistentes devuelven una sección vacía compartida.
     """
 
+    __slots__ = ("_data", "_children")
+
     def __init__(self, data: Dict[str, Any]):
-        self._data = data or {}
+        self._data = data if data is not None else {}
+        self._children: Dict[str, "ConfigSection"] = {}
 
     def __getattr__(self, name: str) -> Union["ConfigSection", Any]:
         """Permite acceso a secciones como atributos: config.project.name"""
+        if name in ConfigSection.__slots__ or (
+            name.startswith("__") and name.endswith("__")
+        ):
+            raise AttributeError(name)
+
+        child = self._children.get(name)
+        if child is not None:
+            return child
+
         if name in self._data:
-            value = self._data[name]
-            if isinstance(value, dict):
-                return ConfigSection(value)
+            return self._wrap(name, self._data[name])
+        return EMPTY_SECTION
+
+    def _wrap(self, key: str, value: Any) -> Any:
+        """
+        Envolver valores de tipo diccionario en una subsección cacheada
+
+        Args:
+            key: Clave del valor dentro de la sección
+            value: Valor almacenado
+
+        Returns:
+            ConfigSection para diccionarios, el valor original en otro caso
+        """
+        if not isinstance(value, dict):
             return value
-        return ConfigSection({})
+        child = self._children.get(key)
+        if child is None:
+            child = ConfigSection(value)
+            self._children[key] = child
+        return child
 
     def get(self, key: str, default: Any = None) -> Any:
         """
@@ -45,10 +184,42 @@ class ConfigSection:
         """
         return self._data.get(key, default)
 
+    def keys(self) -> KeysView:
+        """Claves de la sección"""
+        return self._data.keys()
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Pares (clave, valor); los diccionarios se devuelven como ConfigSection"""
+        for key, value in self._data.items():
+            yield key, self._wrap(key, value)
+
+    def values(self) -> Iterator[Any]:
+        """Valores de la sección; los diccionarios se devuelven como ConfigSection"""
+        for key, value in self._data.items():
+            yield self._wrap(key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterar sobre las claves de la sección"""
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        """Número de claves de la sección"""
+        return len(self._data)
+
     def __contains__(self, key: str) -> bool:
         """Permite usar 'in' para verificar si una clave existe"""
         return key in self._data
 
+    def __eq__(self, other: Any) -> bool:
+        """Comparar con otra sección o con un diccionario"""
+        if isinstance(other, ConfigSection):
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self._data == other
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
     def __repr__(self) -> str:
         """Representación legible de la sección"""
         return f"ConfigSection({self._data})"
@@ -58,6 +229,27 @@ class ConfigSection:
         return self._data
 
 
+class _EmptyConfigSection(ConfigSection):
+    """Sección vacía inmutable compartida por todas las claves inexistentes"""
+
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(MappingProxyType({}))  # type: ignore[arg-type]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convertir a diccionario (siempre uno nuevo para no compartir estado)"""
+        return {}
+
+    def __repr__(self) -> str:
+        """Representación legible de la sección"""
+        return "ConfigSection({})"
+
+
+# Sección devuelta al acceder a claves inexistentes: config.database.host
+EMPTY_SECTION = _EmptyConfigSection()
+
+
 class ConfigLoader:
     """
     Clase para cargar y manejar configuraciones desde archivos en múltiples formatos
@@ -71,8 +263,8 @@ class ConfigLoader:
         "yaml": [".yaml", ".yml"],
     }
 
-    # Cache de configuraciones cargadas
-    _cache: Dict[str, Dict[str, Any]] = {}
+    # Cache LRU de configuraciones cargadas, compartido por todas las instancias
+    _cache = ConfigCache()
 
     def __init__(
         self,
@@ -80,6 +272,10 @@ class ConfigLoader:
         config_dir: str = "config",
         environment: Optional[str] = None,
         format_type: Optional[str] = None,
+        disk_cache: bool = False,
+        cache_dir: Optional[str] = None,
+        remote_layers: Optional[List[str]] = None,
+        resolve_secrets: bool = False,
     ):
         """
         Inicializar ConfigLoader
@@ -89,12 +285,29 @@ class ConfigLoader:
             config_dir: Directorio donde buscar archivos de configuración
             environment: Ambiente específico (dev, prod, stage, etc.)
             format_type: Formato explícito ('toml', 'json', 'yaml')
+            disk_cache: Habilitar el cache persistente en disco del resultado fusionado
+            cache_dir: Directorio del cache en disco (por defecto .cache/hg_aws_helpers)
+            remote_layers: URIs de capas remotas ('s3://bucket/capa.toml',
+                'ssm:/ruta/') que se fusionan después del archivo de configuración
+            resolve_secrets: Reemplazar los valores 'ssm:/parametro' y
+                'secretsmanager:secreto#campo' por su valor en AWS al cargar
         """
         self.config_dir = Path(config_dir)
         self.config_file = config_file
         self.environment = environment
         self.format_type = format_type
         self.config_data: Dict[str, Any] = {}
+        self._index: Optional[Dict[str, Any]] = None
+        self._merkle: Optional[MerkleTree] = None
+        self._disk_cache: Optional[DiskConfigCache] = None
+        self._watcher = None
+        self.snapshot_fingerprint: Optional[str] = None
+        self.remote_layers = list(remote_layers or [])
+        self.resolve_secrets = resolve_secrets
+        self._remote_cache = None
+        self._cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        if disk_cache or cache_dir:
+            self._disk_cache = DiskConfigCache(self._cache_dir)
 
         # Si se proporciona un archivo, cargarlo inmediatamente
         if config_file:
@@ -122,12 +335,28 @@ class ConfigLoader:
 
         config_path = self._resolve_config_path()
 
-        # Verificar cache
-        cache_key = str(config_path.absolute())
-        if cache_key in self._cache:
-            self.config_data = self._cache[cache_key]
-            return ConfigSection(self.config_data)
+        # Verificar cache; las cargas concurrentes de la misma clave se agrupan
+        cache_key = self._cache_key(config_path)
+        data = self._cache.get_or_load(
+            cache_key, lambda: self._load_uncached(config_path)
+        )
+        self._set_config_data(self._with_secrets(data))
+        return ConfigSection(self.config_data)
+
+    def _load_uncached(self, config_path: Path) -> Dict[str, Any]:
+        """
+        Cargar y fusionar las capas sin consultar el cache en memoria
+
+        Args:
+            config_path: Ruta al archivo de configuración principal
+
+        Returns:
+            Dict: Configuración fusionada
 
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            ValueError: Si el formato no es soportado o hay errores de carga
+        """
         if not config_path.exists():
             raise FileNotFoundError(
                 f"Archivo de configuración no encontrado: {config_path}"
@@ -139,25 +368,622 @@ class ConfigLoader:
 
         # Cargar configuración según formato
         try:
-            self.config_data = self._load_by_format(config_path)
+            shared_layers = self._shared_layers(config_path)
+            shared_paths = [path.resolve() for path, _ in shared_layers]
+            # Las capas del ambiente dependen de 'extends' y de aws.region, por
+            # lo que la clave incluye los archivos que podrían intervenir
+            disk_key = (
+                [str(p) for p in shared_paths],
+                self.environment,
+                self.format_type,
+                self._environment_files() if self.environment else [],
+            )
 
-            # Cargar configuración base si existe
-            self._merge_base_config()
+            data = None
+            if self._disk_cache:
+                data = self._disk_cache.load(disk_key, shared_paths)
+
+            if data is None:
+                data = self._merge_layers(shared_layers)
+                env_layers: List[Tuple[Path, str]] = []
+                if self.environment:
+                    data, env_layers = self._merge_environment(data, self.environment)
+                if self._disk_cache:
+                    env_paths = [path.resolve() for path, _ in env_layers]
+                    dependencies = env_paths + fragment_dependencies(
+                        shared_paths + env_paths
+                    )
+                    # Firmas de los bytes parseados, no de los archivos actuales
+                    signatures = fragment_signatures(shared_paths + dependencies)
+                    self._disk_cache.store(
+                        disk_key, shared_paths, data, dependencies, signatures
+                    )
+
+            # Las referencias se resuelven después del cache en disco para que
+            # ${env:...} refleje siempre el entorno del proceso actual
+            return resolve_references(data)
 
-            # Cargar configuración específica de ambiente si se especificó
-            if self.environment:
-                self._merge_environment_config()
+        except Exception as e:
+            raise ValueError(
+                f"Error al cargar configuración desde {config_path}: {str(e)}"
+            )
 
-            # Guardar en cache
-            self._cache[cache_key] = self.config_data
+    def _with_secrets(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Resolver las referencias a parámetros y secretos si está habilitado
+
+        Se resuelven después de los caches (en memoria, en disco y snapshots)
+        para que los secretos no se guarden en ellos; los valores se reutilizan
+        desde el cache con caducidad del resolvedor compartido por el proceso.
 
-            return ConfigSection(self.config_data)
+        Args:
+            data: Configuración fusionada con las referencias ${...} resueltas
+
+        Returns:
+            Dict: Configuración con los parámetros y secretos resueltos
+
+        Raises:
+            ValueError: Si una referencia no es válida o no se puede resolver
+        """
+        if not self.resolve_secrets:
+            return data
+
+        # Importación diferida: solo se carga si se resuelven secretos
+        try:
+            from .config_secrets import resolve_secrets
+        except ImportError:  # Ejecución directa desde el directorio del paquete
+            from config_secrets import resolve_secrets
+
+        return resolve_secrets(data)
+
+    def _set_config_data(self, data: Dict[str, Any]):
+        """
+        Reemplazar la configuración cargada e invalidar el índice de rutas
+
+        Args:
+            data: Configuración fusionada
+        """
+        self.config_data = data
+        self._index = None
+        self._merkle = None
+
+    @property
+    def index(self) -> Dict[str, Any]:
+        """
+        Índice plano de rutas con notación de punto, construido bajo demanda
+
+        Returns:
+            Dict: Ruta con notación de punto -> valor
+        """
+        if self._index is None:
+            self._index = flatten_paths(self.config_data)
+        return self._index
+
+    @property
+    def merkle(self) -> MerkleTree:
+        """
+        Hashes Merkle de la configuración cargada, calculados una vez por carga
+
+        Returns:
+            MerkleTree: Hash de contenido de cada sección
+        """
+        if self._merkle is None or self._merkle.data is not self.config_data:
+            self._merkle = MerkleTree(self.config_data)
+        return self._merkle
+
+    def fingerprint(self, section: Optional[str] = None) -> str:
+        """
+        Obtener una huella estable de la configuración o de una sección
+
+        La huella depende solo del contenido (no del orden de las claves ni de
+        las capas de origen), por lo que sirve como clave de cache.
+
+        Args:
+            section: Ruta con notación de punto (por defecto toda la configuración)
+
+        Returns:
+            str: Hash hexadecimal
+
+        Raises:
+            KeyError: Si la sección no existe
+        """
+        if section is None:
+            return self.merkle.fingerprint()
+        value = self.index.get(section, MISSING)
+        if value is MISSING:
+            raise KeyError(f"Sección no encontrada: {section}")
+        return self.merkle.fingerprint(value)
+
+    def diff(
+        self, other: Union["ConfigLoader", ConfigSection, Mapping[str, Any]]
+    ) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Comparar esta configuración con otra (ej: dev frente a prod)
+
+        Las secciones con el mismo hash Merkle se saltan sin recorrerlas, por
+        lo que el coste es proporcional a las rutas que cambian.
+
+        Args:
+            other: ConfigLoader, ConfigSection o diccionario a comparar
+
+        Returns:
+            Dict: Ruta con notación de punto -> (valor propio, valor de other);
+            las claves ausentes en uno de los lados se indican con MISSING
+        """
+        if isinstance(other, ConfigLoader):
+            other_tree = other.merkle
+        else:
+            if isinstance(other, ConfigSection):
+                other = other.to_dict()
+            other_tree = MerkleTree(dict(other))
+        return diff_trees(self.config_data, other_tree.data, self.merkle, other_tree)
+
+    def load_all_environments(
+        self, config_file: Optional[str] = None, max_workers: Optional[int] = None
+    ) -> Dict[str, ConfigSection]:
+        """
+        Cargar la configuración de todos los ambientes en una sola llamada
+
+        Las capas compartidas (configuración base y archivo de configuración)
+        se parsean una sola vez; luego cada ambiente se fusiona en un pool de
+        hilos. Se descubren los ambientes con archivo env.<ambiente>.* y los
+        definidos en una tabla 'environments' del archivo de configuración.
+
+        Args:
+            config_file: Ruta al archivo de configuración (opcional)
+            max_workers: Número máximo de hilos para fusionar ambientes
+
+        Returns:
+            Dict: Nombre de ambiente -> ConfigSection
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            ValueError: Si el formato no es soportado o hay errores de carga
+        """
+        if config_file:
+            self.config_file = config_file
+
+        if not self.config_file:
+            raise ValueError("No se ha especificado un archivo de configuración")
+
+        config_path = self._resolve_config_path()
+
+        if not config_path.exists():
+            raise FileNotFoundError(
+                f"Archivo de configuración no encontrado: {config_path}"
+            )
+
+        if not self.format_type:
+            self.format_type = self._detect_format(config_path)
+
+        try:
+            shared = self._merge_layers(self._shared_layers(config_path))
+            environments = self._discover_environments(shared)
+            # Los ambientes que comparten ancestros reutilizan su fusión
+            graph = EnvironmentGraph(self, shared)
+
+            def render(environment: str) -> Tuple[str, Dict[str, Any]]:
+                data, _ = graph.resolve(environment)
+                return environment, resolve_references(data)
+
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                rendered = dict(pool.map(render, environments))
 
         except Exception as e:
             raise ValueError(
                 f"Error al cargar configuración desde {config_path}: {str(e)}"
             )
 
+        for environment, data in rendered.items():
+            self._cache.put(self._cache_key(config_path, environment), data)
+
+        if self.resolve_secrets:
+            # Una sola consulta para las referencias de todos los ambientes
+            try:
+                from .config_secrets import resolve_all_secrets
+            except ImportError:  # Ejecución directa desde el directorio del paquete
+                from config_secrets import resolve_all_secrets
+
+            rendered = resolve_all_secrets(rendered)
+        return {env: ConfigSection(data) for env, data in rendered.items()}
+
+    def _discover_environments(self, shared: Dict[str, Any]) -> List[str]:
+        """
+        Descubrir los ambientes disponibles
+
+        Args:
+            shared: Configuración compartida ya fusionada
+
+        Returns:
+            List: Nombres de ambiente ordenados
+        """
+        extensions = "|".join(
+            re.escape(ext.lstrip("."))
+            for exts in self.SUPPORTED_FORMATS.values()
+            for ext in exts
+        )
+        pattern = re.compile(rf"^env\.(.+)\.({extensions})$", re.IGNORECASE)
+
+        environments = set()
+        index = ConfigDirectoryIndex.for_directory(self.config_dir)
+        for file_name in index.files():
+            match = pattern.match(file_name)
+            if match:
+                environments.add(match.group(1))
+
+        table = shared.get("environments")
+        if isinstance(table, dict):
+            environments.update(
+                name for name, value in table.items() if isinstance(value, dict)
+            )
+
+        return sorted(environments)
+
+    def compile(
+        self,
+        out_dir: str = DEFAULT_SNAPSHOT_DIR,
+        config_file: Optional[str] = None,
+        environments: Optional[List[Optional[str]]] = None,
+        required_keys: Optional[List[str]] = None,
+    ) -> Dict[Optional[str], Path]:
+        """
+        Compilar un snapshot pre-fusionado por ambiente
+
+        Las capas compartidas se parsean una sola vez. Cada snapshot es un JSON
+        con una cabecera (versión, huella y firmas de las capas de origen) que
+        ConfigLoader.from_snapshot() carga sin parsear TOML ni YAML.
+
+        Args:
+            out_dir: Directorio donde escribir los snapshots
+            config_file: Ruta al archivo de configuración (opcional)
+            environments: Ambientes a compilar (por defecto los descubiertos y
+                el ambiente del loader; None compila la configuración sin ambiente)
+            required_keys: Claves que deben existir en cada ambiente
+
+        Returns:
+            Dict: Ambiente -> ruta del snapshot
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            KeyError: Si falta alguna clave requerida en algún ambiente
+            ValueError: Si hay errores de carga o la configuración no es
+                representable en JSON
+        """
+        if config_file:
+            self.config_file = config_file
+
+        if not self.config_file:
+            raise ValueError("No se ha especificado un archivo de configuración")
+
+        config_path = self._resolve_config_path()
+
+        if not config_path.exists():
+            raise FileNotFoundError(
+                f"Archivo de configuración no encontrado: {config_path}"
+            )
+
+        if not self.format_type:
+            self.format_type = self._detect_format(config_path)
+
+        shared_layers = self._shared_layers(config_path)
+        shared = self._merge_layers(shared_layers)
+
+        if environments is None:
+            environments = self._discover_environments(shared)
+            if self.environment not in environments:
+                environments.append(self.environment)
+
+        graph = EnvironmentGraph(self, shared)
+        snapshots = {}
+        for environment in environments:
+            file_path, _, _ = self._compile_environment(
+                out_dir,
+                config_path,
+                environment,
+                shared_layers,
+                shared,
+                required_keys,
+                graph,
+            )
+            snapshots[environment] = file_path
+        return snapshots
+
+    def _compile_environment(
+        self,
+        out_dir: str,
+        config_path: Path,
+        environment: Optional[str],
+        shared_layers: List[Tuple[Path, str]],
+        shared: Dict[str, Any],
+        required_keys: Optional[List[str]] = None,
+        graph: Optional[EnvironmentGraph] = None,
+    ) -> Tuple[Path, Dict[str, Any], Dict[str, Any]]:
+        """
+        Fusionar un ambiente y escribir su snapshot
+
+        Args:
+            out_dir: Directorio de snapshots
+            config_path: Ruta al archivo de configuración principal
+            environment: Ambiente a compilar (None para la configuración sin ambiente)
+            shared_layers: Capas compartidas encontradas con _shared_layers()
+            shared: Configuración compartida ya fusionada
+            required_keys: Claves que deben existir en el ambiente
+            graph: Herencia de ambientes compartida entre varias compilaciones
+
+        Returns:
+            Tupla (ruta del snapshot, configuración fusionada, cabecera)
+
+        Raises:
+            KeyError: Si falta alguna clave requerida
+        """
+        data = shared
+        env_layers: List[Tuple[Path, str]] = []
+        if environment:
+            graph = graph or EnvironmentGraph(self, shared)
+            data, env_layers = graph.resolve(environment)
+
+        # El snapshot guarda las referencias sin resolver (ver from_snapshot);
+        # se resuelven aquí para detectar ciclos y referencias rotas al compilar
+        resolved = resolve_references(data)
+
+        if required_keys:
+            index = flatten_paths(resolved)
+            missing_keys = [key for key in required_keys if index.get(key) is None]
+            if missing_keys:
+                raise KeyError(
+                    f"Parámetros requeridos faltantes en {environment}: "
+                    f"{', '.join(missing_keys)}"
+                )
+
+        layer_paths = [path.resolve() for path, _ in shared_layers + env_layers]
+        dependencies = fragment_dependencies(layer_paths)
+        file_path = snapshot_path(
+            Path(out_dir), config_path, environment, self.config_dir
+        )
+        header = write_snapshot(
+            file_path,
+            data,
+            layer_paths,
+            self._layer_directories(),
+            environment,
+            dependencies,
+            self._environment_files() if environment else [],
+            # Firmas de los bytes parseados, no de los archivos actuales
+            fragment_signatures(layer_paths + dependencies),
+        )
+        return file_path, data, header
+
+    def _layer_directories(self) -> List[Path]:
+        """Directorios donde se descubren capas (configuración y config.d/)"""
+        config_dir = self.config_dir.resolve()
+        return [config_dir, config_dir / FRAGMENTS_DIR]
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        config_file: str,
+        config_dir: str = "config",
+        environment: Optional[str] = None,
+        snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+        rebuild: bool = True,
+        remote_layers: Optional[List[str]] = None,
+        resolve_secrets: bool = False,
+    ) -> "ConfigLoader":
+        """
+        Crear ConfigLoader desde un snapshot compilado
+
+        Si el snapshot no existe o alguna capa de origen cambió (contenido,
+        capas nuevas o eliminadas) se vuelve a compilar automáticamente. En el
+        caso habitual solo se lee el snapshot y se hace un stat por capa, sin
+        importar toml ni yaml. Las capas remotas no se descargan mientras el
+        snapshot sea válido: se usan sus copias locales y se descargan de
+        nuevo al recompilar.
+
+        Si el snapshot no se puede escribir (directorio sin permisos) o la
+        configuración no vuelve idéntica de JSON (fechas, claves que no son
+        cadenas), se emite un RuntimeWarning y se carga con load_config() sin
+        snapshot; snapshot_fingerprint queda en None.
+
+        Args:
+            config_file: Ruta al archivo de configuración
+            config_dir: Directorio donde buscar archivos de configuración
+            environment: Ambiente específico (dev, prod, stage, etc.)
+            snapshot_dir: Directorio de snapshots
+            rebuild: Recompilar el snapshot si falta o está desactualizado
+            remote_layers: URIs de capas remotas (ver ConfigLoader)
+            resolve_secrets: Resolver parámetros y secretos (ver ConfigLoader);
+                el snapshot guarda las referencias, nunca los valores
+
+        Returns:
+            ConfigLoader: Instancia con la configuración cargada
+
+        Raises:
+            FileNotFoundError: Si el snapshot falta o está desactualizado y
+                rebuild es False, o si el archivo de configuración no existe
+            ValueError: Si hay errores al recompilar el snapshot
+        """
+        loader = cls(
+            config_dir=config_dir,
+            environment=environment,
+            remote_layers=remote_layers,
+            resolve_secrets=resolve_secrets,
+        )
+        loader.config_file = config_file
+        config_path = loader._resolve_config_path()
+        file_path = snapshot_path(
+            Path(snapshot_dir), config_path, environment, loader.config_dir
+        )
+
+        entry = read_snapshot(file_path)
+        remote = [str(p.resolve()) for p, _ in loader._remote_layers(fetch=False)]
+        if entry is not None and (
+            directories_changed(entry) or not set(remote) <= set(snapshot_layers(entry))
+        ):
+            # Comprobar que no aparecieron ni desaparecieron capas
+            loader.format_type = loader._detect_format(config_path)
+            shared = [
+                str(p.resolve())
+                for p, _ in loader._shared_layers(config_path, fetch_remote=False)
+            ]
+            layers = snapshot_layers(entry)
+            # Las capas del ambiente solo cambian si cambia una capa (firmas) o
+            # aparece o desaparece un archivo env.*, region.* o account.*
+            if (
+                layers[: len(shared)] != shared
+                or (not environment and len(layers) != len(shared))
+                or (
+                    environment
+                    and loader._environment_files() != entry["environment_files"]
+                )
+            ):
+                entry = None
+
+        if entry is None:
+            if not rebuild:
+                raise FileNotFoundError(
+                    f"Snapshot no encontrado o desactualizado: {file_path}"
+                )
+            if not config_path.exists():
+                raise FileNotFoundError(
+                    f"Archivo de configuración no encontrado: {config_path}"
+                )
+            try:
+                loader.format_type = loader._detect_format(config_path)
+                shared_layers = loader._shared_layers(config_path)
+                _, data, entry = loader._compile_environment(
+                    snapshot_dir,
+                    config_path,
+                    environment,
+                    shared_layers,
+                    loader._merge_layers(shared_layers),
+                )
+            except (SnapshotEncodingError, OSError) as e:
+                warnings.warn(
+                    f"No se puede guardar el snapshot de {config_path}, se carga "
+                    f"sin snapshot: {e}",
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+                loader.load_config()
+                return loader
+            except Exception as e:
+                raise ValueError(
+                    f"Error al compilar snapshot de {config_path}: {str(e)}"
+                )
+        else:
+            data = entry["data"]
+
+        loader.snapshot_fingerprint = entry["fingerprint"]
+        try:
+            data = resolve_references(data)
+        except ValueError as e:
+            raise ValueError(f"Error al cargar snapshot de {config_path}: {str(e)}")
+        loader._set_config_data(loader._with_secrets(data))
+        loader._cache.put(loader._cache_key(config_path), data)
+        return loader
+
+    def _cache_key(
+        self, config_path: Path, environment: Optional[str] = None
+    ) -> Tuple[str, Optional[str], Optional[str], str, Tuple[str, ...]]:
+        """
+        Construir la clave del cache en memoria
+
+        Args:
+            config_path: Ruta al archivo de configuración
+            environment: Ambiente (por defecto el ambiente del loader)
+
+        Returns:
+            Tupla (ruta, ambiente, formato, directorio de configuración, capas
+            remotas)
+        """
+        format_type = self.format_type
+        if not format_type:
+            try:
+                format_type = self._detect_format(config_path)
+            except ValueError:
+                format_type = None
+
+        return (
+            str(config_path.absolute()),
+            environment if environment is not None else self.environment,
+            format_type,
+            str(self.config_dir.absolute()),
+            tuple(self.remote_layers),
+        )
+
+    def invalidate(self) -> bool:
+        """
+        Eliminar del cache la configuración de esta instancia
+
+        La próxima llamada a load_config() vuelve a leer los archivos.
+
+        Returns:
+            bool: True si había una entrada en el cache
+        """
+        if not self.config_file:
+            return False
+        cache_key = self._cache_key(self._resolve_config_path())
+        return self._cache.invalidate(cache_key) > 0
+
+    @classmethod
+    def clear_cache(cls):
+        """Vaciar el cache en memoria y el cache de fragmentos parseados"""
+        cls._cache.clear()
+        fragment_cache.clear()
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, int]:
+        """
+        Obtener estadísticas del cache en memoria
+
+        Returns:
+            Dict: hits, misses, coalesced, evictions, entries, max_entries y
+            bytes estimados
+        """
+        return cls._cache.stats()
+
+    def watch(
+        self,
+        callback: Callable[[Any], Any],
+        interval: float = 1.0,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+    ):
+        """
+        Observar las capas de configuración y notificar los cambios
+
+        Las capas se sondean por stat cada `interval` segundos; solo se vuelve
+        a parsear la capa modificada y solo se recalculan las secciones de
+        primer nivel afectadas. config_data se actualiza antes de notificar.
+
+        Args:
+            callback: Función que recibe un ConfigChangeEvent con las rutas
+                modificadas (notación de punto) y la nueva configuración
+            interval: Segundos entre sondeos
+            on_error: Función que recibe los errores de sondeo (ej: un archivo
+                guardado a medias); el sondeo continúa con la última
+                configuración válida. Por defecto se registran con logging
+
+        Returns:
+            ConfigWatcher: Observador en ejecución (usar stop() para detenerlo)
+
+        Raises:
+            ValueError: Si no se ha especificado un archivo de configuración
+        """
+        try:
+            from .config_watch import ConfigWatcher
+        except ImportError:  # Ejecución directa desde el directorio del paquete
+            from config_watch import ConfigWatcher
+
+        if self._watcher is None:
+            self._watcher = ConfigWatcher(self, interval=interval)
+        self._watcher.interval = interval
+        if on_error is not None:
+            self._watcher.on_error = on_error
+        self._watcher.subscribe(callback)
+        return self._watcher.start()
+
     def _resolve_config_path(self) -> Path:
         """
         Resolver ruta completa al archivo de configuración
@@ -190,12 +1016,15 @@ class ConfigLoader:
 
         raise ValueError(f"Formato no soportado para el archivo: {file_path}")
 
-    def _load_by_format(self, file_path: Path) -> Dict[str, Any]:
+    def _load_by_format(
+        self, file_path: Path, format_type: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Cargar archivo según su formato
 
         Args:
             file_path: Ruta al archivo
+            format_type: Formato del archivo (por defecto el formato del loader)
 
         Returns:
             Dict: Datos de configuración cargados
@@ -203,73 +1032,158 @@ class ConfigLoader:
         Raises:
             ValueError: Si hay un error al cargar el archivo
         """
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        format_type = format_type or self.format_type
+        if format_type not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Formato no soportado: {format_type}")
 
-            if self.format_type == "toml":
-                return toml.loads(content)
-            elif self.format_type == "json":
-                return json.loads(content)
-            elif self.format_type == "yaml":
-                return yaml.safe_load(content)
-            else:
-                raise ValueError(f"Formato no soportado: {self.format_type}")
+        return load_fragment(file_path, format_type).data
 
-    def _merge_base_config(self):
+    def _find_layer(self, stem: str) -> Optional[Tuple[Path, str]]:
         """
-        Fusionar con configuración base si existe
+        Buscar una capa de configuración en cualquiera de los formatos soportados
+
+        Se busca en el siguiente orden: toml, json, yaml. La búsqueda se resuelve
+        en memoria con el índice compartido del directorio de configuración.
+
+        Args:
+            stem: Nombre del archivo sin extensión (ej: 'base', 'env.dev')
 
-        La configuración base puede estar en cualquiera de los formatos soportados.
-        Se busca en el siguiente orden: toml, json, yaml.
+        Returns:
+            Tupla (ruta, formato) o None si la capa no existe
         """
-        for format_name, extensions in self.SUPPORTED_FORMATS.items():
-            for ext in extensions:
-                base_path = self.config_dir / f"base{ext}"
-                if base_path.exists():
-                    with open(base_path, "r", encoding="utf-8") as f:
-                        if format_name == "toml":
-                            base_config = toml.load(f)
-                        elif format_name == "json":
-                            base_config = json.load(f)
-                        elif format_name == "yaml":
-                            base_config = yaml.safe_load(f)
+        index = ConfigDirectoryIndex.for_directory(self.config_dir)
+        return index.find(stem, self.SUPPORTED_FORMATS)
+
+    def _shared_layers(
+        self, config_path: Path, fetch_remote: bool = True
+    ) -> List[Tuple[Path, str]]:
+        """
+        Determinar las capas comunes a todos los ambientes
+
+        El orden es: configuración base, fragmentos de config.d/ en orden
+        lexicográfico, archivo de configuración y capas remotas en el orden
+        en que se declararon.
 
-                        # Fusionar configuraciones (config actual sobrescribe base)
-                        self.config_data = self._deep_merge(
-                            base_config, self.config_data
-                        )
-                    return
+        Args:
+            config_path: Ruta al archivo de configuración principal
+            fetch_remote: Descargar las capas remotas que cambiaron (False usa
+                las copias locales tal como están)
 
-    def _merge_environment_config(self):
+        Returns:
+            List: Tuplas (ruta, formato) en orden de fusión
         """
-        Fusionar con configuración específica de ambiente si existe
+        layers = []
+
+        base_layer = self._find_layer("base")
+        if base_layer:
+            layers.append(base_layer)
+
+        layers.extend(fragment_files(self.config_dir, self.SUPPORTED_FORMATS))
+        layers.append((config_path, self.format_type))
+        layers.extend(self._remote_layers(fetch_remote))
+        return layers
 
-        La configuración de ambiente puede estar en cualquiera de los formatos soportados.
+    def _remote_layers(self, fetch: bool = True) -> List[Tuple[Path, str]]:
         """
-        env = self.environment.lower()
+        Obtener las copias locales de las capas remotas
 
-        for format_name, extensions in self.SUPPORTED_FORMATS.items():
-            for ext in extensions:
-                env_path = self.config_dir / f"env.{env}{ext}"
-                if env_path.exists():
-                    with open(env_path, "r", encoding="utf-8") as f:
-                        if format_name == "toml":
-                            env_config = toml.load(f)
-                        elif format_name == "json":
-                            env_config = json.load(f)
-                        elif format_name == "yaml":
-                            env_config = yaml.safe_load(f)
-
-                        # Fusionar configuraciones (ambiente sobrescribe config actual)
-                        self.config_data = self._deep_merge(
-                            self.config_data, env_config
-                        )
-                    return
+        Args:
+            fetch: Descargar en paralelo las capas que cambiaron en AWS
+
+        Returns:
+            List: Tuplas (ruta, formato) en el orden de remote_layers
+
+        Raises:
+            ValueError: Si una capa no se puede descargar ni usar desde el cache
+        """
+        if not self.remote_layers:
+            return []
+
+        if self._remote_cache is None:
+            # Importación diferida: solo se carga si hay capas remotas
+            try:
+                from .config_remote import RemoteLayerCache
+            except ImportError:  # Ejecución directa desde el directorio del paquete
+                from config_remote import RemoteLayerCache
+
+            self._remote_cache = RemoteLayerCache(self._cache_dir)
+
+        if not fetch:
+            return self._remote_cache.cached_layers(self.remote_layers)
+        return [
+            (result.path, result.format_type)
+            for result in self._remote_cache.fetch_all(self.remote_layers)
+        ]
+
+    def _environment_layer(self, environment: str) -> Optional[Tuple[Path, str]]:
+        """
+        Buscar la capa específica de un ambiente (env.<ambiente>.*)
+
+        Args:
+            environment: Nombre del ambiente
+
+        Returns:
+            Tupla (ruta, formato) o None si el ambiente no tiene archivo propio
+        """
+        return self._find_layer(f"env.{environment.lower()}")
+
+    def _environment_files(self) -> List[str]:
+        """Archivos env.*, region.* y account.* del directorio de configuración"""
+        index = ConfigDirectoryIndex.for_directory(self.config_dir)
+        return environment_files(index.files())
+
+    def _merge_environment(
+        self, shared: Dict[str, Any], environment: str
+    ) -> Tuple[Dict[str, Any], List[Tuple[Path, str]]]:
+        """
+        Fusionar la configuración de un ambiente sobre la configuración compartida
+
+        Se aplica la cadena de herencia ('extends') desde el ancestro más
+        lejano; para cada ambiente, primero su entrada en la tabla
+        'environments' (si existe) y luego su archivo env.<ambiente>.*. Al
+        final se aplican las subcapas region.<región>.* y account.<cuenta>.*.
+
+        Args:
+            shared: Configuración compartida ya fusionada (no se modifica)
+            environment: Nombre del ambiente
+
+        Returns:
+            Tupla (configuración fusionada del ambiente, archivos de ambiente y
+            subcapas aplicados en orden)
+
+        Raises:
+            ValueError: Si la herencia es circular o un ancestro no existe
+        """
+        return EnvironmentGraph(self, shared).resolve(environment)
+
+    def _merge_layers(self, layers: List[Tuple[Path, str]]) -> Dict[str, Any]:
+        """
+        Cargar y fusionar capas de configuración en orden
+
+        Las capas que no están en el cache de fragmentos se parsean en paralelo.
+
+        Args:
+            layers: Tuplas (ruta, formato) de menor a mayor prioridad
+
+        Returns:
+            Dict: Configuración fusionada
+        """
+        for layer_path, format_name in layers:
+            if format_name not in self.SUPPORTED_FORMATS:
+                raise ValueError(f"Formato no soportado: {format_name}")
+
+        merged: Dict[str, Any] = {}
+        for fragment in load_fragments(layers):
+            merged = self._deep_merge(merged, fragment.data)
+        return merged
 
     def _deep_merge(self, base: Dict, update: Dict) -> Dict:
         """
         Fusión profunda de diccionarios
 
+        Las subsecciones no modificadas se comparten con la base en lugar de
+        copiarse (ver config_merge.deep_merge).
+
         Args:
             base: Diccionario base
             update: Diccionario con actualizaciones
@@ -277,38 +1191,21 @@ class ConfigLoader:
         Returns:
             Dict: Diccionario fusionado
         """
-        result = base.copy()
-        for key, value in update.items():
-            if (
-                key in result
-                and isinstance(result[key], dict)
-                and isinstance(value, dict)
-            ):
-                result[key] = self._deep_merge(result[key], value)
-            else:
-                result[key] = value
-        return result
+        return deep_merge(base, update)
 
     def get(self, key_path: str, default: Any = None) -> Any:
         """
         Obtener valor usando notación de punto
 
         Args:
-            key_path: Ruta a la clave usando notación de punto (ej: 'project.name')
+            key_path: Ruta a la clave usando notación de punto
+                (ej: 'project.name', 'network.public_subnets[0]')
             default: Valor por defecto si la clave no existe
 
         Returns:
             Valor encontrado o valor por defecto
         """
-        keys = key_path.split(".")
-        value = self.config_data
-
-        try:
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return default
+        return self.index.get(key_path, default)
 
     def get_section(self, section: str) -> ConfigSection:
         """
@@ -335,7 +1232,7 @@ class ConfigLoader:
         Raises:
             KeyError: Si la clave no existe
         """
-        value = self.get(key_path)
+        value = self.index.get(key_path)
         if value is None:
             raise KeyError(f"Parámetro requerido no encontrado: {key_path}")
         return value
@@ -353,11 +1250,8 @@ class ConfigLoader:
         Raises:
             KeyError: Si alguna clave no existe
         """
-        missing_keys = []
-
-        for key in required_keys:
-            if self.get(key) is None:
-                missing_keys.append(key)
+        index = self.index
+        missing_keys = [key for key in required_keys if index.get(key) is None]
 
         if missing_keys:
             raise KeyError(
@@ -366,6 +1260,66 @@ class ConfigLoader:
 
         return True
 
+    def validate_schema(self, model: Any, strict: bool = False) -> Any:
+        """
+        Validar la configuración cargada contra un modelo pydantic
+
+        Args:
+            model: Modelo pydantic que describe la configuración
+            strict: Rechazar conversiones implícitas (ej: '3' para un int)
+
+        Returns:
+            Instancia validada del modelo
+
+        Raises:
+            ConfigValidationError: Si la configuración no cumple el modelo
+        """
+        return validate_config(self.config_data, model, self.environment, strict)
+
+    def validate_all_environments(
+        self, model: Any, config_file: Optional[str] = None, strict: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Validar todos los ambientes contra un modelo pydantic en una sola llamada
+
+        Los errores de todos los ambientes se acumulan en una sola excepción.
+
+        Args:
+            model: Modelo pydantic que describe la configuración
+            config_file: Ruta al archivo de configuración (opcional)
+            strict: Rechazar conversiones implícitas (ej: '3' para un int)
+
+        Returns:
+            Dict: Ambiente -> instancia validada del modelo
+
+        Raises:
+            ConfigValidationError: Si algún ambiente no cumple el modelo
+        """
+        return validate_environments(
+            self.load_all_environments(config_file), model, strict
+        )
+
+    def materialize(self, cls: Any) -> Any:
+        """
+        Convertir la configuración cargada en las clases generadas por config_codegen
+
+        Args:
+            cls: Clase raíz generada (ej: Config de config_types.py)
+
+        Returns:
+            Instancia congelada de cls con la configuración fusionada
+
+        Raises:
+            KeyError: Si falta una clave declarada en las clases
+            ValueError: Si una sección no es un diccionario
+        """
+        try:
+            from .config_codegen import materialize
+        except ImportError:  # Ejecución directa desde el directorio del paquete
+            from config_codegen import materialize
+
+        return materialize(self.config_data, cls)
+
     def get_aws_config(self) -> Dict[str, Any]:
         """
         Obtener configuración de AWS
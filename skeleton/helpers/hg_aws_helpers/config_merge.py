@@ -0,0 +1,321 @@
+"""
+Fusión de configuraciones con estructura compartida
+Las subestructuras que una capa no modifica se comparten entre el resultado y
+la configuración base en lugar de copiarse, de modo que N ambientes fusionados
+sobre la misma base cuestan aproximadamente la base más la suma de sus deltas.
+
+Las listas se reemplazan completas salvo que la tabla 'merge_strategies'
+indique otra estrategia para su ruta: 'append' (concatenar) o fusión por clave
+({ strategy = "merge", key = "id" }), que usa un índice hash y es lineal.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Marcador de clave ausente (None es un valor válido de configuración)
+MISSING = object()
+
+# Tabla de estrategias de fusión de listas: ruta con notación de punto -> estrategia
+MERGE_STRATEGIES_KEY = "merge_strategies"
+
+REPLACE = "replace"
+APPEND = "append"
+MERGE = "merge"
+
+# Árbol de estrategias: clave -> subárbol; la estrategia de una ruta se guarda
+# en su nodo bajo la clave None como (estrategia, campo clave)
+StrategyTree = Dict[Any, Any]
+
+# Árboles compilados por identidad de la tabla (se guarda la tabla para que la
+# identidad siga siendo válida)
+_compiled: Dict[int, Tuple[Dict[str, Any], StrategyTree]] = {}
+_compiled_lock = threading.Lock()
+_COMPILED_MAX_ENTRIES = 64
+
+
+def _same_value(current: Any, value: Any) -> bool:
+    """
+    Indicar si un valor de actualización no cambia el valor actual
+
+    Se exige el mismo tipo para no confundir, por ejemplo, 1 con True o 1.0.
+
+    Args:
+        current: Valor existente en la base
+        value: Valor de la actualización
+
+    Returns:
+        bool: True si ambos valores son equivalentes
+    """
+    if current is value:
+        return True
+    return type(current) is type(value) and current == value
+
+
+def _parse_strategy(path: str, spec: Any) -> Tuple[str, Optional[str]]:
+    """
+    Validar la estrategia declarada para una ruta
+
+    Args:
+        path: Ruta con notación de punto
+        spec: 'replace', 'append' o { strategy = "merge", key = "<campo>" }
+
+    Returns:
+        Tupla (estrategia, campo clave o None)
+
+    Raises:
+        ValueError: Si la estrategia no es válida
+    """
+    kind, key = spec, None
+    if isinstance(spec, dict):
+        kind, key = spec.get("strategy", MERGE), spec.get("key")
+    if kind in (REPLACE, APPEND):
+        return kind, None
+    if kind == MERGE and isinstance(key, str) and key:
+        return MERGE, key
+    raise ValueError(
+        f"Estrategia de fusión no válida en {MERGE_STRATEGIES_KEY}.{path}: {spec!r}"
+    )
+
+
+def compile_strategies(table: Optional[Dict[str, Any]]) -> Optional[StrategyTree]:
+    """
+    Convertir la tabla 'merge_strategies' en un árbol por segmentos de ruta
+
+    El árbol se guarda por identidad de la tabla: como las tablas sin cambios
+    se comparten entre fusiones, se compila una vez por configuración.
+
+    Args:
+        table: Ruta con notación de punto -> estrategia (o None)
+
+    Returns:
+        Árbol de estrategias o None si la tabla está vacía
+
+    Raises:
+        ValueError: Si alguna estrategia no es válida
+    """
+    if not table:
+        return None
+    if not isinstance(table, dict):
+        raise ValueError(f"'{MERGE_STRATEGIES_KEY}' debe ser una tabla: {table!r}")
+
+    cached = _compiled.get(id(table))
+    if cached is not None and cached[0] is table:
+        return cached[1]
+
+    tree: StrategyTree = {}
+    for path, spec in table.items():
+        node = tree
+        for segment in str(path).split("."):
+            node = node.setdefault(segment, {})
+        node[None] = _parse_strategy(path, spec)
+
+    with _compiled_lock:
+        if len(_compiled) >= _COMPILED_MAX_ENTRIES:
+            _compiled.clear()
+        _compiled[id(table)] = (table, tree)
+    return tree
+
+
+def _root_strategies(
+    base: Dict[str, Any], update: Dict[str, Any]
+) -> Optional[StrategyTree]:
+    """Estrategias vigentes al fusionar: las de la base más las de la actualización"""
+    base_table = base.get(MERGE_STRATEGIES_KEY)
+    update_table = update.get(MERGE_STRATEGIES_KEY)
+    if update_table is None:
+        return compile_strategies(base_table)
+    if not base_table:
+        return compile_strategies(update_table)
+    return compile_strategies({**base_table, **update_table})
+
+
+def _merge_list(
+    current: List[Any],
+    value: List[Any],
+    strategy: Tuple[str, Optional[str]],
+    node: StrategyTree,
+) -> List[Any]:
+    """
+    Fusionar una lista según su estrategia
+
+    Args:
+        current: Lista base (no se modifica)
+        value: Lista de la actualización
+        strategy: Tupla (estrategia, campo clave)
+        node: Subárbol de estrategias de la ruta (para los elementos)
+
+    Returns:
+        List: La lista fusionada (la base si no cambia nada)
+    """
+    kind, key = strategy
+    if kind == REPLACE:
+        return value
+    if kind == APPEND:
+        return current + value if value else current
+
+    # Fusión por clave: índice clave -> posición en el resultado
+    result: Optional[List[Any]] = None
+    positions: Dict[Any, int] = {}
+    for position, item in enumerate(current):
+        if isinstance(item, dict):
+            try:
+                positions.setdefault(item.get(key, MISSING), position)
+            except TypeError:
+                pass
+    positions.pop(MISSING, None)
+
+    for item in value:
+        position = None
+        if isinstance(item, dict) and key in item:
+            try:
+                position = positions.get(item[key])
+            except TypeError:
+                position = None
+
+        if position is None:
+            if result is None:
+                result = list(current)
+            if isinstance(item, dict) and key in item:
+                try:
+                    positions[item[key]] = len(result)
+                except TypeError:
+                    pass
+            result.append(item)
+            continue
+
+        existing = (result if result is not None else current)[position]
+        merged = _merge_shared(existing, item, node)
+        if merged is not existing:
+            if result is None:
+                result = list(current)
+            result[position] = merged
+
+    return current if result is None else result
+
+
+def _merge_shared(
+    base: Dict[str, Any], update: Dict[str, Any], strategies: Optional[StrategyTree]
+) -> Dict[str, Any]:
+    """
+    Fusionar una subsección devolviendo la base intacta si no hay cambios
+
+    Args:
+        base: Subsección base (no se modifica)
+        update: Subsección con actualizaciones
+        strategies: Subárbol de estrategias de listas de esta subsección
+
+    Returns:
+        Dict: La misma base si la actualización no cambia nada, o un diccionario
+        nuevo que comparte con la base todas las subsecciones no modificadas
+    """
+    changes = None
+
+    for key, value in update.items():
+        current = base.get(key, MISSING)
+        node = strategies.get(key) if strategies else None
+        if isinstance(current, dict) and isinstance(value, dict):
+            merged = _merge_shared(current, value, node)
+        elif node and None in node and isinstance(current, list):
+            merged = (
+                _merge_list(current, value, node[None], node)
+                if isinstance(value, list)
+                else value
+            )
+        else:
+            merged = value
+
+        if current is not MISSING and _same_value(current, merged):
+            continue
+
+        if changes is None:
+            changes = {}
+        changes[key] = merged
+
+    if not changes:
+        return base
+
+    result = base.copy()
+    result.update(changes)
+    return result
+
+
+def deep_merge(
+    base: Dict[str, Any],
+    update: Dict[str, Any],
+    strategies: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Fusión profunda de diccionarios con estructura compartida
+
+    El diccionario de primer nivel siempre es nuevo. Por debajo, solo se copian
+    los niveles que la actualización modifica; el resto de subsecciones (y
+    las listas y escalares) se comparten con la base o con la actualización,
+    por lo que el resultado debe tratarse como de solo lectura.
+
+    Las listas se reemplazan salvo que la tabla 'merge_strategies' (de la base
+    o de la actualización) declare otra estrategia para su ruta.
+
+    Args:
+        base: Diccionario base (no se modifica)
+        update: Diccionario con actualizaciones (tiene prioridad)
+        strategies: Tabla 'merge_strategies' a aplicar en lugar de la de base
+            y update (ej: al fusionar una sola sección de primer nivel)
+
+    Returns:
+        Dict: Diccionario fusionado
+
+    Raises:
+        ValueError: Si alguna estrategia de 'merge_strategies' no es válida
+    """
+    if strategies is None:
+        tree = _root_strategies(base, update)
+    else:
+        tree = compile_strategies(strategies)
+
+    result = base.copy()
+    for key, value in update.items():
+        current = result.get(key, MISSING)
+        node = tree.get(key) if tree else None
+        if isinstance(current, dict) and isinstance(value, dict):
+            result[key] = _merge_shared(current, value, node)
+        elif node and None in node and isinstance(current, list):
+            if isinstance(value, list):
+                value = _merge_list(current, value, node[None], node)
+            if not _same_value(current, value):
+                result[key] = value
+        elif current is MISSING or not _same_value(current, value):
+            result[key] = value
+    return result
+
+
+def changed_paths(old: Any, new: Any, prefix: str = "") -> List[str]:
+    """
+    Listar las rutas con notación de punto cuyo valor difiere entre dos árboles
+
+    Las subsecciones idénticas (mismo objeto) se omiten sin recorrerlas, lo que
+    aprovecha la estructura compartida de deep_merge. Las listas y escalares se
+    comparan completos.
+
+    Args:
+        old: Valor anterior (MISSING si no existía)
+        new: Valor nuevo (MISSING si ya no existe)
+        prefix: Ruta del valor comparado
+
+    Returns:
+        List: Rutas modificadas, añadidas o eliminadas en orden
+    """
+    if old is new:
+        return []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths: List[str] = []
+        for key in list(old) + [k for k in new if k not in old]:
+            path = f"{prefix}.{key}" if prefix else str(key)
+            paths.extend(
+                changed_paths(old.get(key, MISSING), new.get(key, MISSING), path)
+            )
+        return paths
+
+    if old is MISSING or new is MISSING or not _same_value(old, new):
+        return [prefix]
+    return []
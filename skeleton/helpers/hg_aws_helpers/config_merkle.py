@@ -0,0 +1,201 @@
+"""
+Hashes Merkle de configuraciones fusionadas
+Cada sección (diccionario o lista) tiene un hash de su contenido calculado a
+partir de los hashes de sus hijos. Dos secciones con el mismo hash son iguales,
+por lo que la comparación entre ambientes salta las secciones idénticas y su
+coste es proporcional a las rutas que cambian.
+"""
+
+import json
+from typing import Any, Dict, Optional
+
+try:
+    from .config_merge import MISSING, _same_value
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_merge import MISSING, _same_value
+
+# Versión del formato de los hashes; forma parte de cada huella
+MERKLE_VERSION = b"hg-merkle-1"
+
+# Tamaño de los hashes en bytes (blake2b)
+DIGEST_SIZE = 16
+
+# Prefijo de cada tipo escalar en la codificación de las hojas
+_SCALAR_TAGS = {bool: b"b", int: b"i", float: b"f", type(None): b"n"}
+
+
+def _encode_leaf(value: Any) -> bytes:
+    """
+    Codificar un valor escalar de forma canónica
+
+    El tipo forma parte de la codificación: 1, 1.0 y True son distintos,
+    igual que en la fusión (ver _same_value).
+
+    Args:
+        value: Valor escalar
+
+    Returns:
+        bytes: Representación canónica
+    """
+    scalar_type = type(value)
+    if scalar_type is str:
+        return b"s" + value.encode("utf-8", "surrogatepass")
+    if scalar_type in _SCALAR_TAGS:
+        return _SCALAR_TAGS[scalar_type] + repr(value).encode("ascii")
+    return b"j" + json.dumps(value, sort_keys=True, default=repr).encode("utf-8")
+
+
+def _framed(encoded: bytes) -> bytes:
+    """Prefijar la longitud para que dos secuencias de hijos no se confundan"""
+    return b"%d:" % len(encoded) + encoded
+
+
+class MerkleTree:
+    """
+    Hashes de todas las secciones de una configuración.
+
+    Los hashes se calculan una vez y se guardan por identidad de objeto; la
+    instancia mantiene una referencia a los datos para que esas identidades
+    sigan siendo válidas. Las secciones compartidas por deep_merge dentro de la
+    misma configuración se recorren una sola vez.
+    """
+
+    __slots__ = ("data", "_hashes", "_blake2b")
+
+    def __init__(self, data: Dict[str, Any]):
+        """
+        Inicializar MerkleTree calculando los hashes de todas las secciones
+
+        Args:
+            data: Configuración (de solo lectura mientras se use el árbol)
+        """
+        # Importación diferida: hashlib solo hace falta al calcular hashes
+        from hashlib import blake2b
+
+        self.data = data
+        self._hashes: Dict[int, bytes] = {}
+        self._blake2b = blake2b
+        self.digest(data)
+
+    def digest(self, value: Any) -> bytes:
+        """
+        Obtener el hash de un valor
+
+        Args:
+            value: Sección, lista o escalar de la configuración
+
+        Returns:
+            bytes: Hash del contenido
+        """
+        if not isinstance(value, (dict, list)):
+            return self._blake2b(
+                MERKLE_VERSION + b"v" + _encode_leaf(value), digest_size=DIGEST_SIZE
+            ).digest()
+
+        cached = self._hashes.get(id(value))
+        if cached is not None:
+            return cached
+
+        hasher = self._blake2b(MERKLE_VERSION, digest_size=DIGEST_SIZE)
+        if isinstance(value, dict):
+            hasher.update(b"d")
+            # El orden de las claves no afecta a la igualdad de diccionarios
+            for key in sorted(value, key=str):
+                hasher.update(_framed(_encode_leaf(key)))
+                self._update(hasher, value[key])
+        else:
+            hasher.update(b"l")
+            for item in value:
+                self._update(hasher, item)
+
+        digest = hasher.digest()
+        self._hashes[id(value)] = digest
+        return digest
+
+    def _update(self, hasher: Any, value: Any):
+        """Añadir un hijo al hash de su sección"""
+        if isinstance(value, (dict, list)):
+            hasher.update(b"c" + self.digest(value))
+        else:
+            hasher.update(b"v" + _framed(_encode_leaf(value)))
+
+    def fingerprint(self, value: Any = MISSING) -> str:
+        """
+        Obtener la huella hexadecimal de la configuración o de una sección
+
+        Args:
+            value: Sección o valor de esta configuración (por defecto la raíz)
+
+        Returns:
+            str: Hash hexadecimal estable entre procesos
+        """
+        return self.digest(self.data if value is MISSING else value).hex()
+
+
+def diff_trees(
+    old: Any,
+    new: Any,
+    old_tree: MerkleTree,
+    new_tree: MerkleTree,
+    prefix: str = "",
+    changes: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Comparar dos configuraciones saltando las secciones con el mismo hash
+
+    Las listas y escalares se comparan completos, igual que changed_paths().
+
+    Args:
+        old: Valor de la primera configuración (MISSING si no existe)
+        new: Valor de la segunda configuración (MISSING si no existe)
+        old_tree: Hashes de la primera configuración
+        new_tree: Hashes de la segunda configuración
+        prefix: Ruta del valor comparado
+        changes: Diccionario donde acumular las diferencias
+
+    Returns:
+        Dict: Ruta con notación de punto -> (valor en old, valor en new), con
+        MISSING para los valores ausentes
+    """
+    if changes is None:
+        changes = {}
+    if old is new:
+        return changes
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        if old_tree.digest(old) == new_tree.digest(new):
+            return changes
+        for key in list(old) + [k for k in new if k not in old]:
+            path = f"{prefix}.{key}" if prefix else str(key)
+            diff_trees(
+                old.get(key, MISSING),
+                new.get(key, MISSING),
+                old_tree,
+                new_tree,
+                path,
+                changes,
+            )
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list):
+        if old_tree.digest(old) != new_tree.digest(new):
+            changes[prefix] = (old, new)
+        return changes
+
+    if old is MISSING or new is MISSING or not _same_value(old, new):
+        changes[prefix] = (old, new)
+    return changes
+
+
+def diff_configs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Comparar dos configuraciones calculando sus hashes
+
+    Args:
+        old: Primera configuración
+        new: Segunda configuración
+
+    Returns:
+        Dict: Ruta con notación de punto -> (valor en old, valor en new)
+    """
+    return diff_trees(old, new, MerkleTree(old), MerkleTree(new))
@@ -0,0 +1,472 @@
+"""
+Capas de configuración remotas (S3 y SSM Parameter Store)
+Las URIs s3://bucket/clave.toml y ssm:/ruta/ se descargan a un cache local y
+se fusionan como cualquier otra capa. Cada descarga es condicional: S3 usa el
+ETag (If-None-Match) y SSM compara las versiones de los parámetros, de modo que
+la copia local solo se reescribe cuando el contenido cambia y los caches que
+validan capas por firma (disco, fragmentos, snapshots) siguen siendo válidos.
+Si AWS no es accesible se usa la última copia descargada.
+
+boto3 se importa en la primera descarga.
+"""
+
+import json
+import threading
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from .config_cache import DEFAULT_CACHE_DIR, file_lock, sha256_hex, write_atomic
+    from .config_fragments import FORMAT_EXTENSIONS
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_cache import DEFAULT_CACHE_DIR, file_lock, sha256_hex, write_atomic
+    from config_fragments import FORMAT_EXTENSIONS
+
+# Prefijos de las URIs de capas remotas
+S3_SCHEME = "s3://"
+SSM_SCHEME = "ssm:"
+
+# Subdirectorio del cache donde se guardan las copias de las capas remotas
+REMOTE_CACHE_SUBDIR = "remote"
+
+# Número máximo de capas remotas descargadas en paralelo
+DEFAULT_MAX_WORKERS = 8
+
+# Códigos de error de AWS transitorios: se usa la última copia descargada
+TRANSIENT_ERROR_CODES = {
+    "InternalError",
+    "RequestLimitExceeded",
+    "RequestTimeout",
+    "ServiceUnavailable",
+    "SlowDown",
+    "Throttling",
+    "ThrottlingException",
+}
+
+# Versión del formato de los metadatos de cada copia local
+REMOTE_METADATA_VERSION = 1
+
+
+class RemoteLayer(NamedTuple):
+    """URI de una capa remota ya interpretada"""
+
+    uri: str
+    service: str
+    bucket: str
+    key: str
+    format_type: str
+
+
+class FetchResult(NamedTuple):
+    """Resultado de la descarga de una capa remota"""
+
+    uri: str
+    path: Path
+    format_type: str
+    # 'fetched' (copia nueva), 'not_modified' (copia vigente) u 'offline'
+    status: str
+
+
+def is_remote_uri(value: Any) -> bool:
+    """Indicar si un valor es la URI de una capa remota"""
+    return isinstance(value, str) and value.startswith((S3_SCHEME, SSM_SCHEME))
+
+
+def parse_remote_uri(uri: str) -> RemoteLayer:
+    """
+    Interpretar la URI de una capa remota
+
+    Args:
+        uri: 's3://bucket/ruta/capa.toml' o 'ssm:/ruta/de/parametros/'
+
+    Returns:
+        RemoteLayer: Servicio, ubicación y formato de la capa
+
+    Raises:
+        ValueError: Si la URI no es válida o el formato no es soportado
+    """
+    if uri.startswith(S3_SCHEME):
+        bucket, _, key = uri[len(S3_SCHEME) :].partition("/")
+        if not bucket or not key or key.endswith("/"):
+            raise ValueError(f"URI de S3 no válida (s3://bucket/clave): {uri}")
+        suffix = Path(key).suffix.lower()
+        for format_name, extensions in FORMAT_EXTENSIONS.items():
+            if suffix in extensions:
+                return RemoteLayer(uri, "s3", bucket, key, format_name)
+        raise ValueError(f"Formato no soportado para la capa remota: {uri}")
+
+    if uri.startswith(SSM_SCHEME):
+        path = uri[len(SSM_SCHEME) :]
+        if not path.startswith("/"):
+            raise ValueError(f"URI de SSM no válida (ssm:/ruta/): {uri}")
+        path = "/" + path.strip("/")
+        return RemoteLayer(uri, "ssm", "", path, "json")
+
+    raise ValueError(f"URI de capa remota no soportada: {uri}")
+
+
+def parameters_to_dict(parameters: Sequence[Dict[str, Any]], path: str) -> Dict:
+    """
+    Convertir parámetros de SSM en una configuración anidada
+
+    '/app/dev/db/host' bajo la ruta '/app/dev' se convierte en
+    {'db': {'host': valor}}. Los StringList se convierten en listas.
+
+    Args:
+        parameters: Parámetros devueltos por GetParametersByPath
+        path: Ruta consultada
+
+    Returns:
+        Dict: Configuración anidada
+
+    Raises:
+        ValueError: Si un parámetro es a la vez valor y prefijo de otro
+    """
+    prefix = path.rstrip("/") + "/"
+    data: Dict[str, Any] = {}
+    for parameter in sorted(parameters, key=lambda p: p["Name"]):
+        name = parameter["Name"]
+        keys = [key for key in name[len(prefix) :].split("/") if key]
+        value: Any = parameter["Value"]
+        if parameter.get("Type") == "StringList":
+            value = value.split(",")
+
+        node = data
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+            if not isinstance(node, dict):
+                raise ValueError(f"Parámetro en conflicto con otro parámetro: {name}")
+        if not keys or keys[-1] in node:
+            raise ValueError(f"Parámetro en conflicto con otro parámetro: {name}")
+        node[keys[-1]] = value
+    return data
+
+
+def _default_client(service: str) -> Any:
+    """Crear un cliente de boto3 con la configuración del entorno"""
+    import boto3
+
+    return boto3.client(service)
+
+
+class RemoteLayerCache:
+    """
+    Cache local de capas remotas con descargas condicionales.
+
+    Cada capa se guarda como un archivo del formato de la capa junto a sus
+    metadatos (ETag, versión o versiones de los parámetros y hash del
+    contenido). Es seguro usar la misma instancia desde varios hilos y el
+    mismo directorio desde varios procesos.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        client_factory: Callable[[str], Any] = _default_client,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        """
+        Inicializar RemoteLayerCache
+
+        Args:
+            cache_dir: Directorio del cache (las copias van en cache_dir/remote)
+            client_factory: Función que crea el cliente de un servicio ('s3', 'ssm')
+            max_workers: Número máximo de descargas en paralelo
+        """
+        self.cache_dir = Path(cache_dir) / REMOTE_CACHE_SUBDIR
+        self.max_workers = max_workers
+        self._client_factory = client_factory
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "fetched": 0, "not_modified": 0, "offline": 0}
+
+    def cache_path(self, layer: RemoteLayer) -> Path:
+        """
+        Obtener la ruta de la copia local de una capa
+
+        Args:
+            layer: Capa remota
+
+        Returns:
+            Path: Ruta de la copia (puede no existir todavía)
+        """
+        extension = FORMAT_EXTENSIONS[layer.format_type][0]
+        # Ubicación normalizada: 'ssm:/app/dev' y 'ssm:/app/dev/' comparten copia
+        location = f"{layer.service}:{layer.bucket}/{layer.key}"
+        name = sha256_hex(location.encode("utf-8"))[:32]
+        return self.cache_dir / f"{layer.service}-{name}{extension}"
+
+    def cached_layers(self, uris: Sequence[str]) -> List[Tuple[Path, str]]:
+        """
+        Obtener las copias locales de varias capas sin acceder a AWS
+
+        Args:
+            uris: URIs de las capas remotas
+
+        Returns:
+            List: Tuplas (ruta, formato) en el mismo orden
+        """
+        layers = [parse_remote_uri(uri) for uri in uris]
+        return [(self.cache_path(layer), layer.format_type) for layer in layers]
+
+    def _client(self, service: str) -> Any:
+        """Obtener el cliente de un servicio (compartido entre hilos)"""
+        with self._lock:
+            client = self._clients.get(service)
+            if client is None:
+                client = self._client_factory(service)
+                self._clients[service] = client
+            return client
+
+    def _count(self, name: str):
+        """Incrementar un contador de estadísticas"""
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _metadata_path(file_path: Path) -> Path:
+        """Ruta de los metadatos de una copia local"""
+        return file_path.with_name(f"{file_path.name}.meta.json")
+
+    def _read_metadata(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Leer los metadatos de una copia local
+
+        Args:
+            file_path: Ruta de la copia
+
+        Returns:
+            Dict: Metadatos o None si no hay una copia válida (falta el archivo
+            o su contenido no coincide con el hash registrado)
+        """
+        try:
+            with open(self._metadata_path(file_path), "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+            with open(file_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        if metadata.get("version") != REMOTE_METADATA_VERSION:
+            return None
+        if metadata.get("sha256") != sha256_hex(content):
+            return None
+        return metadata
+
+    def _fetch_s3(
+        self, layer: RemoteLayer, metadata: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Descargar un objeto de S3 si cambió desde la última copia
+
+        Args:
+            layer: Capa remota de S3
+            metadata: Metadatos de la copia local (None si no hay copia)
+
+        Returns:
+            Tupla (contenido o None si no cambió, metadatos de la descarga)
+        """
+        from botocore.exceptions import ClientError
+
+        params = {"Bucket": layer.bucket, "Key": layer.key}
+        if metadata and metadata.get("etag"):
+            params["IfNoneMatch"] = metadata["etag"]
+        try:
+            response = self._client("s3").get_object(**params)
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if metadata and (status == 304 or e.response["Error"]["Code"] == "304"):
+                return None, metadata
+            raise
+
+        content = response["Body"].read().decode("utf-8")
+        return content, {
+            "etag": response.get("ETag"),
+            "version_id": response.get("VersionId"),
+        }
+
+    def _fetch_ssm(
+        self, layer: RemoteLayer, metadata: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Leer los parámetros de una ruta de SSM por páginas
+
+        GetParametersByPath devuelve la versión de cada parámetro; si coinciden
+        con las de la copia local no se reescribe. Los SecureString no se
+        guardan en disco: al escribir la copia se omiten con un RuntimeWarning
+        que los nombra y se
+        pueden referenciar con un valor "ssm:<nombre>" (ver config_secrets).
+
+        Args:
+            layer: Capa remota de SSM
+            metadata: Metadatos de la copia local (None si no hay copia)
+
+        Returns:
+            Tupla (contenido JSON o None si no cambió, metadatos de la lectura)
+        """
+        paginator = self._client("ssm").get_paginator("get_parameters_by_path")
+        parameters = []
+        secure = []
+        for page in paginator.paginate(
+            Path=layer.key, Recursive=True, WithDecryption=False
+        ):
+            for parameter in page["Parameters"]:
+                if parameter.get("Type") == "SecureString":
+                    secure.append(parameter["Name"])
+                else:
+                    parameters.append(parameter)
+
+        versions = {p["Name"]: p["Version"] for p in parameters}
+        if metadata and metadata.get("versions") == versions:
+            return None, metadata
+
+        # Solo al escribir una copia nueva, no en cada comprobación
+        if secure:
+            example = secure[0]
+            warnings.warn(
+                f"Parámetros SecureString omitidos en la capa remota "
+                f"{layer.uri}: {', '.join(sorted(secure))}. No se guardan en "
+                f'disco; referéncielos con un valor "ssm:{example}" y '
+                "resolve_secrets=True",
+                RuntimeWarning,
+                stacklevel=3,
+            )
+
+        data = parameters_to_dict(parameters, layer.key)
+        content = json.dumps(data, indent=2, sort_keys=True) + "\n"
+        return content, {"versions": versions}
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """
+        Indicar si un error permite usar la última copia descargada
+
+        Los errores de red, de credenciales y de limitación de AWS son
+        transitorios, igual que la falta de boto3; un objeto inexistente o un
+        acceso denegado no lo son.
+
+        Args:
+            error: Excepción de la descarga
+
+        Returns:
+            bool: True si se puede continuar con la copia local
+        """
+        if isinstance(error, ImportError):
+            return True
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        if isinstance(error, BotoCoreError):
+            return True
+        if isinstance(error, ClientError):
+            code = error.response.get("Error", {}).get("Code")
+            status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            return code in TRANSIENT_ERROR_CODES or (status or 0) >= 500
+        return False
+
+    def fetch(self, uri: str) -> FetchResult:
+        """
+        Descargar una capa remota si cambió desde la última copia
+
+        Args:
+            uri: URI de la capa remota
+
+        Returns:
+            FetchResult: Ruta de la copia local y resultado de la descarga
+
+        Raises:
+            ValueError: Si la URI no es válida, la descarga falla por un error
+                no transitorio o AWS no es accesible y no hay copia local
+        """
+        layer = parse_remote_uri(uri)
+        file_path = self.cache_path(layer)
+        fetcher = self._fetch_s3 if layer.service == "s3" else self._fetch_ssm
+
+        with file_lock(file_path.with_name(f".{file_path.name}.lock")):
+            metadata = self._read_metadata(file_path)
+            self._count("requests")
+            try:
+                content, fetched = fetcher(layer, metadata)
+            except ValueError:
+                raise
+            except Exception as e:
+                if not self._is_transient(e):
+                    raise ValueError(f"Error al descargar la capa remota {uri}: {e}")
+                if metadata is None:
+                    raise ValueError(
+                        f"Capa remota no accesible y sin copia local: {uri}: {e}"
+                    )
+                warnings.warn(
+                    f"Capa remota no accesible, se usa la última copia: {uri} ({e})",
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+                self._count("offline")
+                return FetchResult(uri, file_path, layer.format_type, "offline")
+
+            if content is None:
+                self._count("not_modified")
+                return FetchResult(uri, file_path, layer.format_type, "not_modified")
+
+            # Primero el contenido y después los metadatos: si el proceso se
+            # interrumpe entre ambos, el hash no coincide y se descarga de nuevo
+            write_atomic(file_path, content)
+            fetched.update(
+                version=REMOTE_METADATA_VERSION,
+                uri=uri,
+                sha256=sha256_hex(content.encode("utf-8")),
+            )
+            write_atomic(
+                self._metadata_path(file_path),
+                json.dumps(fetched, indent=2, sort_keys=True) + "\n",
+            )
+            self._count("fetched")
+            return FetchResult(uri, file_path, layer.format_type, "fetched")
+
+    def fetch_all(self, uris: Sequence[str]) -> List[FetchResult]:
+        """
+        Descargar varias capas remotas en paralelo
+
+        Las capas son independientes entre sí: cada una se descarga en su
+        propio hilo y el resultado conserva el orden de las URIs.
+
+        Args:
+            uris: URIs de las capas remotas
+
+        Returns:
+            List: FetchResult por URI, en el mismo orden
+
+        Raises:
+            ValueError: Si alguna capa no se puede descargar ni usar desde el cache
+        """
+        unique = list(dict.fromkeys(uris))
+        # Los clientes se crean en este hilo: crear clientes de boto3 desde
+        # varios hilos a la vez con la sesión por defecto no es seguro. Si no
+        # se pueden crear (sin región, sin credenciales o sin boto3), fetch lo
+        # vuelve a intentar dentro del bloque que usa la última copia
+        for service in {parse_remote_uri(uri).service for uri in unique}:
+            try:
+                self._client(service)
+            except Exception:
+                pass
+
+        if len(unique) <= 1:
+            results = [self.fetch(uri) for uri in unique]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = min(self.max_workers, len(unique))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self.fetch, unique))
+
+        by_uri = dict(zip(unique, results))
+        return [by_uri[uri] for uri in uris]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtener estadísticas de las descargas
+
+        Returns:
+            Dict: requests, fetched, not_modified y offline
+        """
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,174 @@
+"""
+Validación de configuraciones con esquemas pydantic
+El proyecto declara sus modelos una vez; el validador compilado de cada modelo
+se guarda en cache y valida todos los ambientes en una sola llamada,
+acumulando los errores de todos ellos.
+"""
+
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Validadores compilados por modelo: (un ambiente, lote de ambientes)
+_adapters: Dict[Any, Tuple[Any, Any]] = {}
+_adapters_lock = threading.Lock()
+
+
+class ConfigValidationError(ValueError):
+    """
+    Error de validación de una o varias configuraciones.
+
+    `errors` agrupa por ambiente los errores de pydantic (loc, msg, type,
+    input) y `paths` usa la misma notación de punto que ConfigLoader.get().
+    """
+
+    def __init__(self, errors: Dict[Optional[str], List[Dict[str, Any]]]):
+        """
+        Inicializar ConfigValidationError
+
+        Args:
+            errors: Ambiente (None si no aplica) -> errores de pydantic
+        """
+        self.errors = errors
+        super().__init__(self._format())
+
+    @property
+    def paths(self) -> Dict[Optional[str], List[str]]:
+        """Rutas con error por ambiente"""
+        return {
+            env: [format_location(e["loc"]) for e in env_errors]
+            for env, env_errors in self.errors.items()
+        }
+
+    def _format(self) -> str:
+        """Construir el mensaje con un error por línea"""
+        count = sum(len(e) for e in self.errors.values())
+        lines = [f"Configuración inválida ({count} errores):"]
+        for env, env_errors in self.errors.items():
+            prefix = f"[{env}] " if env is not None else ""
+            for error in env_errors:
+                lines.append(
+                    f"  {prefix}{format_location(error['loc'])}: {error['msg']}"
+                )
+        return "\n".join(lines)
+
+
+def format_location(loc: Tuple[Any, ...]) -> str:
+    """
+    Convertir la ubicación de un error de pydantic a notación de punto
+
+    Args:
+        loc: Ubicación del error (ej: ('network', 'subnets', 0))
+
+    Returns:
+        str: Ruta del error (ej: 'network.subnets[0]')
+    """
+    path = ""
+    for part in loc:
+        if isinstance(part, int):
+            path += f"[{part}]"
+        else:
+            path = f"{path}.{part}" if path else str(part)
+    return path
+
+
+def compile_schema(model: Any) -> Tuple[Any, Any]:
+    """
+    Obtener los validadores compilados de un modelo
+
+    pydantic se importa en el primer uso. Los validadores se compilan una
+    sola vez por modelo y se reutilizan en cada validación.
+
+    Args:
+        model: Modelo pydantic (BaseModel, dataclass o tipo anotado)
+
+    Returns:
+        Tupla (TypeAdapter del modelo, TypeAdapter de Dict[str, modelo])
+
+    Raises:
+        ImportError: Si pydantic no está instalado
+    """
+    adapters = _adapters.get(model)
+    if adapters is None:
+        from pydantic import TypeAdapter
+
+        with _adapters_lock:
+            adapters = _adapters.get(model)
+            if adapters is None:
+                adapters = (TypeAdapter(model), TypeAdapter(Dict[str, model]))
+                _adapters[model] = adapters
+    return adapters
+
+
+def _as_dict(config: Any) -> Any:
+    """Obtener el diccionario de una ConfigSection o devolver el valor tal cual"""
+    to_dict = getattr(config, "to_dict", None)
+    return to_dict() if callable(to_dict) else config
+
+
+def validate_config(
+    config: Any,
+    model: Any,
+    environment: Optional[str] = None,
+    strict: bool = False,
+) -> Any:
+    """
+    Validar una configuración contra un modelo
+
+    Args:
+        config: Configuración (dict o ConfigSection)
+        model: Modelo pydantic
+        environment: Ambiente, solo para los mensajes de error
+        strict: Rechazar conversiones implícitas (ej: '3' para un int)
+
+    Returns:
+        Instancia validada del modelo
+
+    Raises:
+        ConfigValidationError: Si la configuración no cumple el modelo
+    """
+    from pydantic import ValidationError
+
+    adapter, _ = compile_schema(model)
+    try:
+        return adapter.validate_python(_as_dict(config), strict=strict)
+    except ValidationError as e:
+        raise ConfigValidationError({environment: _errors(e)})
+
+
+def validate_environments(
+    configs: Mapping[str, Any], model: Any, strict: bool = False
+) -> Dict[str, Any]:
+    """
+    Validar todos los ambientes en una sola llamada
+
+    Args:
+        configs: Ambiente -> configuración (dict o ConfigSection)
+        model: Modelo pydantic
+        strict: Rechazar conversiones implícitas (ej: '3' para un int)
+
+    Returns:
+        Dict: Ambiente -> instancia validada del modelo
+
+    Raises:
+        ConfigValidationError: Con los errores de todos los ambientes
+    """
+    from pydantic import ValidationError
+
+    _, batch_adapter = compile_schema(model)
+    data = {env: _as_dict(config) for env, config in configs.items()}
+    try:
+        return batch_adapter.validate_python(data, strict=strict)
+    except ValidationError as e:
+        errors: Dict[Optional[str], List[Dict[str, Any]]] = {}
+        for error in _errors(e):
+            env, loc = error["loc"][0], error["loc"][1:]
+            errors.setdefault(env, []).append({**error, "loc": loc})
+        raise ConfigValidationError(errors)
+
+
+def _errors(error: Any) -> List[Dict[str, Any]]:
+    """Extraer los errores de una ValidationError sin URLs de documentación"""
+    return [
+        {key: value for key, value in e.items() if key != "url"}
+        for e in error.errors(include_url=False)
+    ]
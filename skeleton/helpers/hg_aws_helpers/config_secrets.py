@@ -0,0 +1,567 @@
+"""
+Resolución de referencias a parámetros y secretos en valores de configuración
+Un valor 'ssm:/prod/db/host' se reemplaza por el parámetro de SSM Parameter
+Store y 'secretsmanager:prod/api-key#campo' por el secreto de Secrets Manager
+(o por un campo de su JSON). La resolución ocurre al cargar la configuración,
+en la síntesis o en el arranque de una Lambda, y nunca se escribe en disco.
+
+Las referencias de toda la configuración se agrupan antes de consultar AWS:
+cada parámetro y cada secreto se pide una sola vez, los parámetros en lotes de
+GetParameters y los secretos en paralelo. Los valores se guardan en un cache
+con caducidad (TTL) y un número máximo de entradas (LRU).
+
+boto3 se importa en la primera consulta.
+"""
+
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
+
+try:
+    from .config_interpolate import KeyPath, _assign
+    from .config_remote import _default_client
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_interpolate import KeyPath, _assign
+    from config_remote import _default_client
+
+# Valores que son referencias: ssm:/nombre y secretsmanager:id[#campo], con los
+# caracteres que admiten los nombres de parámetros y los nombres o ARN de secretos
+SECRET_REFERENCE_PATTERN = re.compile(
+    r"ssm:(/[A-Za-z0-9_.\-/]+)|secretsmanager:([A-Za-z0-9/_+=.@:\-]+)(?:#(\S+))?"
+)
+
+# Número máximo de nombres por llamada a GetParameters (límite de la API)
+SSM_BATCH_SIZE = 10
+
+# Segundos que un valor resuelto se considera vigente
+DEFAULT_SECRET_TTL = 300.0
+
+# Número máximo de parámetros y secretos en el cache
+DEFAULT_MAX_SECRETS = 256
+
+# Número máximo de consultas a AWS en paralelo
+DEFAULT_MAX_WORKERS = 8
+
+
+class SecretReference(NamedTuple):
+    """Referencia a un parámetro de SSM o a un secreto de Secrets Manager"""
+
+    service: str
+    name: str
+    field: Optional[str] = None
+
+    @property
+    def cache_key(self) -> Hashable:
+        """Clave del valor en el cache (los campos de un secreto la comparten)"""
+        return (self.service, self.name)
+
+
+def parse_secret_reference(value: Any) -> Optional[SecretReference]:
+    """
+    Interpretar un valor como referencia a un parámetro o secreto
+
+    Args:
+        value: Valor de la configuración
+
+    Returns:
+        SecretReference o None si el valor no es una referencia
+
+    Raises:
+        ValueError: Si el valor tiene el prefijo ssm: o secretsmanager: pero
+            no es una referencia válida
+    """
+    if not isinstance(value, str) or not value.startswith(("ssm:", "secretsmanager:")):
+        return None
+    match = SECRET_REFERENCE_PATTERN.fullmatch(value)
+    if match is None:
+        raise ValueError(f"Referencia a parámetro o secreto no válida: {value}")
+    parameter, secret, field = match.groups()
+    if parameter is not None:
+        if parameter.endswith("/"):
+            raise ValueError(f"Referencia a parámetro o secreto no válida: {value}")
+        return SecretReference("ssm", parameter)
+    return SecretReference("secretsmanager", secret, field)
+
+
+def find_secret_references(data: Any) -> Dict[KeyPath, SecretReference]:
+    """
+    Encontrar los valores que son referencias a parámetros o secretos
+
+    Args:
+        data: Configuración fusionada
+
+    Returns:
+        Dict: Ruta -> referencia
+
+    Raises:
+        ValueError: Si un valor con prefijo ssm: o secretsmanager: no es válido
+    """
+    references: Dict[KeyPath, SecretReference] = {}
+    stack: List[Any] = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend((path + (k,), v) for k, v in value.items())
+        elif isinstance(value, list):
+            stack.extend((path + (i,), v) for i, v in enumerate(value))
+        else:
+            reference = parse_secret_reference(value)
+            if reference is not None:
+                references[path] = reference
+    return references
+
+
+class SecretCache:
+    """
+    Cache LRU de valores resueltos con caducidad por entrada.
+
+    Es seguro entre hilos. Las entradas caducadas se descartan al leerlas y
+    las menos usadas se desalojan al superar el límite.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_SECRET_TTL,
+        max_entries: int = DEFAULT_MAX_SECRETS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Inicializar SecretCache
+
+        Args:
+            ttl: Segundos que un valor se considera vigente (None: sin caducidad)
+            max_entries: Número máximo de entradas antes de desalojar la menos usada
+            clock: Función que devuelve la hora actual en segundos
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._expires: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Obtener un valor vigente
+
+        Args:
+            key: Clave de la entrada
+
+        Returns:
+            Valor o None si no está en el cache o caducó
+        """
+        with self._lock:
+            if key not in self._entries:
+                self._misses += 1
+                return None
+            if self._expires[key] <= self._clock():
+                del self._entries[key]
+                del self._expires[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Guardar un valor
+
+        Args:
+            key: Clave de la entrada
+            value: Valor resuelto
+        """
+        ttl = float("inf") if self.ttl is None else self.ttl
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._expires[key] = self._clock() + ttl
+            while len(self._entries) > max(self.max_entries, 0):
+                evicted, _ = self._entries.popitem(last=False)
+                del self._expires[evicted]
+                self._evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> int:
+        """
+        Eliminar una entrada o todas
+
+        Args:
+            key: Clave a eliminar (None para vaciar el cache)
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._lock:
+            if key is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._expires.clear()
+                return removed
+            if key not in self._entries:
+                return 0
+            del self._entries[key]
+            del self._expires[key]
+            return 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtener estadísticas del cache
+
+        Returns:
+            Dict: hits, misses, expired, evictions, entries y max_entries
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def __len__(self) -> int:
+        """Número de entradas en el cache (incluidas las caducadas)"""
+        return len(self._entries)
+
+
+class SecretResolver:
+    """
+    Resolución agrupada de referencias a parámetros de SSM y secretos.
+
+    Una resolución consulta AWS una vez por lote de hasta 10 parámetros y una
+    vez por secreto, con todas las consultas en paralelo; los valores vigentes
+    en el cache no se consultan. Es seguro usar la misma instancia desde
+    varios hilos.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = DEFAULT_SECRET_TTL,
+        max_entries: int = DEFAULT_MAX_SECRETS,
+        client_factory: Callable[[str], Any] = _default_client,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Inicializar SecretResolver
+
+        Args:
+            ttl: Segundos que un valor resuelto se considera vigente
+            max_entries: Número máximo de parámetros y secretos en el cache
+            client_factory: Función que crea el cliente de un servicio
+                ('ssm', 'secretsmanager')
+            max_workers: Número máximo de consultas en paralelo
+            clock: Función que devuelve la hora actual en segundos
+        """
+        self.cache = SecretCache(ttl, max_entries, clock)
+        self.max_workers = max_workers
+        self._client_factory = client_factory
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._calls = {"GetParameters": 0, "GetSecretValue": 0}
+
+    def _client(self, service: str) -> Any:
+        """Obtener el cliente de un servicio (compartido entre hilos)"""
+        with self._lock:
+            client = self._clients.get(service)
+            if client is None:
+                client = self._client_factory(service)
+                self._clients[service] = client
+            return client
+
+    def _count(self, operation: str):
+        """Incrementar el contador de llamadas a una operación"""
+        with self._lock:
+            self._calls[operation] += 1
+
+    def _get_parameters(self, names: List[str]) -> Dict[Hashable, Any]:
+        """
+        Leer un lote de parámetros de SSM con una sola llamada
+
+        Args:
+            names: Hasta SSM_BATCH_SIZE nombres de parámetros
+
+        Returns:
+            Dict: Clave del cache -> valor (los StringList como listas)
+
+        Raises:
+            ValueError: Si algún parámetro no existe
+        """
+        self._count("GetParameters")
+        response = self._client("ssm").get_parameters(Names=names, WithDecryption=True)
+        if response.get("InvalidParameters"):
+            raise ValueError(
+                "Parámetros de SSM no encontrados: "
+                + ", ".join(sorted(response["InvalidParameters"]))
+            )
+
+        values: Dict[Hashable, Any] = {}
+        for parameter in response["Parameters"]:
+            value = parameter["Value"]
+            if parameter.get("Type") == "StringList":
+                value = value.split(",")
+            values[("ssm", parameter["Name"])] = value
+        return values
+
+    def _get_secret(self, secret_id: str) -> Dict[Hashable, Any]:
+        """
+        Leer un secreto de Secrets Manager
+
+        Args:
+            secret_id: Nombre o ARN del secreto
+
+        Returns:
+            Dict: Clave del cache -> SecretString (o SecretBinary)
+        """
+        self._count("GetSecretValue")
+        response = self._client("secretsmanager").get_secret_value(SecretId=secret_id)
+        value = response.get("SecretString", response.get("SecretBinary"))
+        return {("secretsmanager", secret_id): value}
+
+    def fetch(self, references: Iterable[SecretReference]) -> Dict[Hashable, Any]:
+        """
+        Obtener los valores de varias referencias con el mínimo de llamadas
+
+        Las referencias repetidas (o varios campos del mismo secreto) se
+        consultan una sola vez; las vigentes en el cache no se consultan.
+
+        Args:
+            references: Referencias a resolver
+
+        Returns:
+            Dict: Clave del cache de cada referencia -> valor sin extraer campos
+
+        Raises:
+            ValueError: Si un parámetro o secreto no existe o no se puede leer
+        """
+        values: Dict[Hashable, Any] = {}
+        parameters: List[str] = []
+        secrets: List[str] = []
+        for reference in {r.cache_key: r for r in references}.values():
+            value = self.cache.get(reference.cache_key)
+            if value is not None:
+                values[reference.cache_key] = value
+            elif reference.service == "ssm":
+                parameters.append(reference.name)
+            else:
+                secrets.append(reference.name)
+
+        calls: List[Callable[[], Dict[Hashable, Any]]] = [
+            lambda batch=parameters[i : i + SSM_BATCH_SIZE]: self._get_parameters(batch)
+            for i in range(0, len(parameters), SSM_BATCH_SIZE)
+        ]
+        calls.extend(lambda secret=s: self._get_secret(secret) for s in secrets)
+        if not calls:
+            return values
+
+        # Los clientes se crean en este hilo (ver RemoteLayerCache.fetch_all)
+        if parameters:
+            self._client("ssm")
+        if secrets:
+            self._client("secretsmanager")
+
+        try:
+            if len(calls) == 1:
+                results = [calls[0]()]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+
+                workers = min(self.max_workers, len(calls))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(lambda call: call(), calls))
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error al resolver parámetros y secretos: {e}")
+
+        for result in results:
+            for key, value in result.items():
+                self.cache.put(key, value)
+                values[key] = value
+        return values
+
+    @staticmethod
+    def _field(reference: SecretReference, value: Any, parsed: Dict[str, Any]) -> Any:
+        """
+        Extraer el campo de un secreto JSON
+
+        Args:
+            reference: Referencia con campo
+            value: SecretString del secreto
+            parsed: JSON ya parseado por nombre de secreto (se completa aquí)
+
+        Returns:
+            Valor del campo
+
+        Raises:
+            ValueError: Si el secreto no es un objeto JSON o no tiene el campo
+        """
+        document = parsed.get(reference.name)
+        if document is None:
+            try:
+                document = json.loads(value)
+            except (TypeError, ValueError):
+                document = None
+            if not isinstance(document, dict):
+                raise ValueError(f"El secreto no es un objeto JSON: {reference.name}")
+            parsed[reference.name] = document
+        if reference.field not in document:
+            raise ValueError(
+                f"Campo no encontrado en el secreto {reference.name}: {reference.field}"
+            )
+        return document[reference.field]
+
+    def resolve(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Reemplazar las referencias de una configuración por sus valores
+
+        No se modifica la entrada: solo se copian los contenedores que
+        contienen referencias y el resto se comparte.
+
+        Args:
+            data: Configuración fusionada
+
+        Returns:
+            Dict: Configuración con los valores resueltos (la misma si no tenía
+            referencias)
+
+        Raises:
+            ValueError: Si una referencia no es válida o no se puede resolver
+        """
+        return self.resolve_all({None: data})[None]
+
+    def resolve_all(self, configs: Dict[Any, Dict[str, Any]]) -> Dict[Any, Dict]:
+        """
+        Resolver varias configuraciones (ej: todos los ambientes) a la vez
+
+        Las referencias de todas las configuraciones se agrupan en una sola
+        consulta: un parámetro usado por varios ambientes se pide una vez.
+
+        Args:
+            configs: Nombre -> configuración fusionada
+
+        Returns:
+            Dict: Nombre -> configuración con los valores resueltos
+
+        Raises:
+            ValueError: Si una referencia no es válida o no se puede resolver
+        """
+        found = {name: find_secret_references(data) for name, data in configs.items()}
+        values = self.fetch(r for refs in found.values() for r in refs.values())
+
+        parsed: Dict[str, Dict[str, Any]] = {}
+        resolved = {}
+        for name, data in configs.items():
+            references = found[name]
+            if not references:
+                resolved[name] = data
+                continue
+            result = data.copy()
+            copied: Set[KeyPath] = set()
+            for path, reference in references.items():
+                value = values[reference.cache_key]
+                if reference.field is not None:
+                    value = self._field(reference, value, parsed)
+                _assign(result, path, value, copied)
+            resolved[name] = result
+        return resolved
+
+    def invalidate(self) -> int:
+        """
+        Vaciar el cache para que la próxima resolución consulte AWS
+
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        return self.cache.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Obtener estadísticas del cache y de las llamadas a AWS
+
+        Returns:
+            Dict: Estadísticas de SecretCache más las llamadas a GetParameters
+            y GetSecretValue
+        """
+        with self._lock:
+            calls = dict(self._calls)
+        return {**self.cache.stats(), **calls}
+
+
+_default_resolver: Optional[SecretResolver] = None
+_default_resolver_lock = threading.Lock()
+
+
+def default_resolver() -> SecretResolver:
+    """
+    Obtener el resolvedor compartido por el proceso
+
+    En una Lambda, las invocaciones que reutilizan el contenedor reutilizan
+    también los valores vigentes del cache.
+
+    Returns:
+        SecretResolver: Instancia compartida
+    """
+    global _default_resolver
+    if _default_resolver is None:
+        with _default_resolver_lock:
+            if _default_resolver is None:
+                _default_resolver = SecretResolver()
+    return _default_resolver
+
+
+def resolve_secrets(
+    data: Dict[str, Any], resolver: Optional[SecretResolver] = None
+) -> Dict[str, Any]:
+    """
+    Reemplazar las referencias a parámetros y secretos de una configuración
+
+    Args:
+        data: Configuración fusionada
+        resolver: Resolvedor a usar (por defecto el compartido por el proceso)
+
+    Returns:
+        Dict: Configuración con los valores resueltos
+
+    Raises:
+        ValueError: Si una referencia no es válida o no se puede resolver
+    """
+    return (resolver or default_resolver()).resolve(data)
+
+
+def resolve_all_secrets(
+    configs: Dict[Any, Dict[str, Any]], resolver: Optional[SecretResolver] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Reemplazar las referencias de varias configuraciones con una sola consulta
+
+    Args:
+        configs: Nombre -> configuración fusionada
+        resolver: Resolvedor a usar (por defecto el compartido por el proceso)
+
+    Returns:
+        Dict: Nombre -> configuración con los valores resueltos
+
+    Raises:
+        ValueError: Si una referencia no es válida o no se puede resolver
+    """
+    return (resolver or default_resolver()).resolve_all(configs)
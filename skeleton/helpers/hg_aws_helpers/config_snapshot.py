@@ -0,0 +1,256 @@
+"""
+Snapshots compilados de configuración para ConfigLoader
+Cada snapshot contiene la configuración ya fusionada de un ambiente en JSON,
+precedida de una cabecera con versión, huella y firmas de las capas de origen.
+Cargarlo no requiere parsear TOML ni YAML: basta una lectura y un stat por capa.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    from . import config_backends
+    from .config_cache import (
+        RACY_WINDOW_NS,
+        json_round_trips,
+        layer_signature,
+        sha256_hex,
+        signature_matches,
+        write_atomic,
+    )
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    import config_backends
+    from config_cache import (
+        RACY_WINDOW_NS,
+        json_round_trips,
+        layer_signature,
+        sha256_hex,
+        signature_matches,
+        write_atomic,
+    )
+
+# Directorio por defecto de los snapshots (relativo al directorio de trabajo)
+DEFAULT_SNAPSHOT_DIR = ".cache/hg_aws_helpers/snapshots"
+
+# Versión del formato de los snapshots; cambiarla obliga a recompilarlos
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+class SnapshotEncodingError(ValueError):
+    """
+    La configuración no se puede guardar como snapshot sin cambiarla.
+
+    JSON no representa fechas ni conserva las claves que no son cadenas; en
+    ese caso la configuración se carga sin snapshot.
+    """
+
+
+def snapshot_path(
+    out_dir: Path,
+    config_path: Path,
+    environment: Optional[str] = None,
+    config_dir: Optional[Path] = None,
+) -> Path:
+    """
+    Obtener la ruta del snapshot de un archivo de configuración y ambiente
+
+    El nombre incluye un hash de la ruta del archivo y del directorio de
+    configuración, de modo que archivos con el mismo nombre en directorios
+    distintos no comparten snapshot.
+
+    Args:
+        out_dir: Directorio de snapshots
+        config_path: Ruta al archivo de configuración principal
+        environment: Ambiente (None para la configuración sin ambiente)
+        config_dir: Directorio de configuración donde se descubren las capas
+
+    Returns:
+        Path: Ruta al archivo del snapshot
+    """
+    location = [str(Path(config_path).resolve())]
+    if config_dir is not None:
+        location.append(str(Path(config_dir).resolve()))
+    digest = sha256_hex("\0".join(location).encode("utf-8"))[:16]
+    name = f"{config_path.stem}-{digest}"
+    if environment:
+        name = f"{name}.{environment.lower()}"
+    return Path(out_dir) / f"{name}.snapshot.json"
+
+
+def snapshot_fingerprint(
+    signatures: List[Dict[str, Any]], environment: Optional[str] = None
+) -> str:
+    """
+    Calcular la huella de un snapshot a partir del contenido de sus capas
+
+    Args:
+        signatures: Firmas de las capas calculadas con layer_signature()
+        environment: Ambiente del snapshot
+
+    Returns:
+        str: Hash hexadecimal que identifica la combinación de capas
+    """
+    payload = json.dumps(
+        [SNAPSHOT_FORMAT_VERSION, environment, [s["sha256"] for s in signatures]]
+    )
+    return sha256_hex(payload.encode("utf-8"))
+
+
+def _directory_mtime(directory: Path) -> Optional[int]:
+    """
+    Obtener el mtime de un directorio si ya es fiable
+
+    Un directorio modificado dentro de la ventana de RACY_WINDOW_NS podría
+    cambiar sin que su mtime lo refleje, por lo que se registra como None.
+
+    Args:
+        directory: Directorio a consultar
+
+    Returns:
+        int: mtime en nanosegundos (0 si no existe), o None si es reciente
+    """
+    try:
+        mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        return 0
+    if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+        return None
+    return mtime_ns
+
+
+def write_snapshot(
+    file_path: Path,
+    data: Dict[str, Any],
+    layers: Sequence[Path],
+    directories: Sequence[Path] = (),
+    environment: Optional[str] = None,
+    dependencies: Sequence[Path] = (),
+    environment_files: Sequence[str] = (),
+    signatures: Optional[Sequence[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Escribir un snapshot de forma atómica
+
+    Args:
+        file_path: Ruta al archivo del snapshot
+        data: Configuración fusionada del ambiente
+        layers: Capas que intervienen en la fusión, en orden
+        directories: Directorios donde se descubren las capas
+        environment: Ambiente del snapshot
+        dependencies: Archivos adicionales (ej: fragmentos incluidos)
+        environment_files: Archivos que pueden intervenir en la herencia del
+            ambiente (env.*, region.*, account.*) al compilar
+        signatures: Firmas de las capas y dependencias (en ese orden) de los
+            bytes que produjeron data. Sin ellas se firman los archivos
+            actuales, que podrían haber cambiado después de parsearlos
+
+    Returns:
+        Dict: Cabecera del snapshot (sin los datos)
+
+    Raises:
+        SnapshotEncodingError: Si la configuración no vuelve idéntica de JSON
+        OSError: Si el snapshot no se puede escribir
+    """
+    if not json_round_trips(data):
+        raise SnapshotEncodingError(
+            "La configuración no se puede guardar como snapshot: contiene "
+            "valores que JSON no conserva (ej: fechas o claves que no son cadenas)"
+        )
+    if signatures is None:
+        signatures = [
+            layer_signature(Path(p)) for p in list(layers) + list(dependencies)
+        ]
+    signatures = list(signatures)
+    entry = {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": snapshot_fingerprint(signatures, environment),
+        "environment": environment,
+        "layer_count": len(layers),
+        "layers": signatures,
+        "directories": {str(d): _directory_mtime(Path(d)) for d in directories},
+        "environment_files": list(environment_files),
+        "data": data,
+    }
+
+    try:
+        content = json.dumps(entry, separators=(",", ":"))
+    except (TypeError, ValueError) as e:
+        raise SnapshotEncodingError(
+            f"La configuración no se puede guardar como snapshot: {e}"
+        )
+
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(Path(file_path), content)
+    return {k: v for k, v in entry.items() if k != "data"}
+
+
+def read_snapshot(file_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Leer un snapshot y comprobar que sus capas no han cambiado
+
+    Args:
+        file_path: Ruta al archivo del snapshot
+
+    Returns:
+        Dict con la cabecera y los datos, o None si no existe, es de otra
+        versión o alguna capa cambió
+    """
+    try:
+        with open(file_path, "rb") as f:
+            entry = config_backends.loads("json", f.read().decode("utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(entry, dict) or entry.get("version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+
+    refreshed = False
+    for signature in entry["layers"]:
+        previous_mtime = signature["mtime_ns"]
+        if not signature_matches(signature):
+            return None
+        refreshed = refreshed or signature["mtime_ns"] != previous_mtime
+
+    # Actualizar mtime para no volver a calcular hashes en el próximo arranque
+    if refreshed:
+        try:
+            write_atomic(Path(file_path), json.dumps(entry, separators=(",", ":")))
+        except OSError:
+            pass
+
+    return entry
+
+
+def directories_changed(entry: Dict[str, Any]) -> bool:
+    """
+    Indicar si algún directorio de capas cambió desde que se escribió el snapshot
+
+    Un cambio no invalida el snapshot por sí mismo: obliga a comprobar que el
+    conjunto de capas descubiertas sigue siendo el mismo.
+
+    Args:
+        entry: Snapshot leído con read_snapshot()
+
+    Returns:
+        bool: True si hay que volver a descubrir las capas
+    """
+    for directory, mtime_ns in entry.get("directories", {}).items():
+        if mtime_ns is None or _directory_mtime(Path(directory)) != mtime_ns:
+            return True
+    return False
+
+
+def snapshot_layers(entry: Dict[str, Any]) -> List[str]:
+    """
+    Obtener las rutas de las capas (sin dependencias) de un snapshot
+
+    Args:
+        entry: Snapshot leído con read_snapshot()
+
+    Returns:
+        List: Rutas de las capas en orden de fusión
+    """
+    return [s["path"] for s in entry["layers"][: entry["layer_count"]]]
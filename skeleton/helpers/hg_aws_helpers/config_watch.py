@@ -0,0 +1,587 @@
+"""
+Modo watch para ConfigLoader
+Sondea las capas de configuración por stat (sin depender de inotify) y, cuando
+una capa cambia, vuelve a parsear solo esa capa y recalcula solo las secciones
+de primer nivel afectadas del resultado fusionado.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from .config_environments import (
+        EXTENDS_KEY,
+        SUBLAYERS,
+        declared_parent,
+        environment_chain,
+        environment_table,
+        sublayer_stems,
+        without_extends,
+    )
+    from .config_fragments import FRAGMENTS_DIR, fragment_cache, fragment_files
+    from .config_interpolate import resolve_references
+    from .config_loader import ConfigLoader, ConfigSection
+    from .config_merge import (
+        MERGE_STRATEGIES_KEY,
+        MISSING,
+        changed_paths,
+        deep_merge,
+    )
+except ImportError:  # Ejecución directa desde el directorio del paquete
+    from config_environments import (
+        EXTENDS_KEY,
+        SUBLAYERS,
+        declared_parent,
+        environment_chain,
+        environment_table,
+        sublayer_stems,
+        without_extends,
+    )
+    from config_fragments import FRAGMENTS_DIR, fragment_cache, fragment_files
+    from config_interpolate import resolve_references
+    from config_loader import ConfigLoader, ConfigSection
+    from config_merge import (
+        MERGE_STRATEGIES_KEY,
+        MISSING,
+        changed_paths,
+        deep_merge,
+    )
+
+logger = logging.getLogger(__name__)
+
+# Estado por capa que un sondeo fallido restaura (ver ConfigWatcher.poll)
+_POLL_STATE = (
+    "_order",
+    "_paths",
+    "_signatures",
+    "_layer_data",
+    "_chain",
+    "_env_tables",
+    "_sublayers",
+    "_merged",
+    "_resolved",
+)
+
+
+@dataclass
+class ConfigChangeEvent:
+    """Notificación de cambio enviada a los suscriptores de ConfigWatcher"""
+
+    changed_paths: List[str]
+    changed_layers: List[str]
+    config: ConfigSection = field(repr=False)
+
+
+class ConfigWatcher:
+    """
+    Observador de capas de configuración con re-fusión incremental.
+
+    Cada sondeo hace un stat por capa (y por fragmento incluido); solo las
+    capas cuyo mtime o tamaño cambió se vuelven a parsear, por lo que la
+    latencia no crece con el número de capas sin cambios.
+    """
+
+    def __init__(
+        self,
+        loader: ConfigLoader,
+        interval: float = 1.0,
+        on_error: Optional[Callable[[Exception], Any]] = None,
+    ):
+        """
+        Inicializar ConfigWatcher
+
+        Args:
+            loader: ConfigLoader a observar (con archivo de configuración)
+            interval: Segundos entre sondeos del hilo de fondo
+            on_error: Función que recibe los errores del hilo de fondo y de
+                los suscriptores (por defecto se registran con logging)
+        """
+        if not loader.config_file:
+            raise ValueError("No se ha especificado un archivo de configuración")
+
+        self.loader = loader
+        self.interval = interval
+        self.on_error = on_error
+        self._subscribers: List[Callable[[ConfigChangeEvent], Any]] = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Estado por capa: ruta, firma (mtime, tamaño) y datos parseados
+        self._order: List[str] = []
+        self._paths: Dict[str, Optional[Path]] = {}
+        self._signatures: Dict[str, Any] = {}
+        self._layer_data: Dict[str, Dict[str, Any]] = {}
+        # Herencia del ambiente: cadena de 'extends', entradas de la tabla
+        # 'environments' de cada eslabón y subcapas de región y cuenta
+        self._chain: List[str] = [loader.environment] if loader.environment else []
+        self._env_tables: Dict[str, Dict[str, Any]] = {}
+        self._sublayers: List[str] = []
+        self._merged: Dict[str, Any] = {}
+        # Configuración fusionada con las referencias ${...} resueltas
+        self._resolved: Dict[str, Any] = {}
+
+        self._initialize()
+
+    def _initialize(self):
+        """Parsear todas las capas una vez y calcular la configuración fusionada"""
+        loader = self.loader
+        config_path = loader._resolve_config_path()
+        if not loader.format_type:
+            loader.format_type = loader._detect_format(config_path)
+
+        layers = self._discover()
+        self._order = list(layers)
+        for name, layer in layers.items():
+            self._track(name, layer, [], set())
+        if loader.environment:
+            self._refresh_environment([], set())
+
+        self._merged = self._fold(self._ordered_layers())
+        self._resolved = resolve_references(self._merged)
+        self._publish()
+
+    def _discover(self) -> Dict[str, Optional[Tuple[Path, str]]]:
+        """
+        Resolver la ruta actual de cada capa observada
+
+        Returns:
+            Dict: Nombre de capa -> (ruta, formato) o None si no existe, en
+            orden de fusión
+        """
+        loader = self.loader
+        layers: Dict[str, Optional[Tuple[Path, str]]] = {
+            "base": loader._find_layer("base")
+        }
+        for file_path, format_type in fragment_files(
+            loader.config_dir, loader.SUPPORTED_FORMATS
+        ):
+            layers[f"{FRAGMENTS_DIR}/{file_path.name}"] = (file_path, format_type)
+        layers["config"] = (loader._resolve_config_path(), loader.format_type)
+        # Las capas remotas se observan en su copia local: el sondeo no accede
+        # a AWS y detecta las copias que renueva cualquier carga
+        for uri, layer in zip(loader.remote_layers, loader._remote_layers(fetch=False)):
+            layers[f"remote:{uri}"] = layer if layer[0].exists() else None
+
+        for environment in self._chain:
+            layers[self._layer_name(environment)] = loader._environment_layer(
+                environment
+            )
+        for stem in self._sublayers:
+            layers[stem] = loader._find_layer(stem)
+        return layers
+
+    def _layer_name(self, environment: str) -> str:
+        """Nombre de la capa de un ambiente de la cadena de herencia"""
+        if environment == self.loader.environment:
+            return "environment"
+        return f"environment:{environment}"
+
+    @staticmethod
+    def _is_environment_layer(name: str) -> bool:
+        """Indicar si una capa pertenece al ambiente (y no a las compartidas)"""
+        prefixes = ("environment:",) + tuple(f"{p}." for p, _ in SUBLAYERS)
+        return name == "environment" or name.startswith(prefixes)
+
+    @staticmethod
+    def _stat(file_path: Path) -> Optional[Tuple[int, int]]:
+        """Obtener (mtime, tamaño) de un archivo o None si no existe"""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _signature(self, file_path: Optional[Path]) -> Any:
+        """
+        Obtener la firma de una capa y de los fragmentos que incluye
+
+        Args:
+            file_path: Ruta de la capa (None si no existe)
+
+        Returns:
+            Tupla de (mtime, tamaño) por archivo o None si la capa no existe
+        """
+        if file_path is None:
+            return None
+        includes = fragment_cache.includes(file_path.resolve())
+        return tuple(self._stat(p) for p in (file_path,) + includes)
+
+    def _parse(self, layer: Optional[Tuple[Path, str]]) -> Dict[str, Any]:
+        """Parsear una capa; las capas inexistentes equivalen a un diccionario vacío"""
+        if not layer:
+            return {}
+        return self.loader._load_by_format(*layer) or {}
+
+    def _shared_layers(self) -> List[Dict[str, Any]]:
+        """Datos de las capas comunes a todos los ambientes, en orden"""
+        return [
+            self._layer_data[n]
+            for n in self._order
+            if not self._is_environment_layer(n)
+        ]
+
+    def _environment_layers(self) -> List[Dict[str, Any]]:
+        """
+        Obtener los datos de las capas del ambiente en orden de fusión
+
+        Para cada eslabón de la cadena de herencia se aplica su entrada en la
+        tabla 'environments' y luego su archivo, igual que en
+        ConfigLoader.load_config(); al final, las subcapas de región y cuenta.
+
+        Returns:
+            List: Datos de cada capa, de menor a mayor prioridad
+        """
+        layers = []
+        for environment in self._chain:
+            layers.append(self._env_tables.get(environment, {}))
+            layers.append(
+                without_extends(self._layer_data[self._layer_name(environment)])
+            )
+        return layers + [self._layer_data[stem] for stem in self._sublayers]
+
+    def _ordered_layers(self) -> List[Dict[str, Any]]:
+        """Datos de todas las capas, de menor a mayor prioridad"""
+        return self._shared_layers() + self._environment_layers()
+
+    def _track(
+        self,
+        name: str,
+        layer: Optional[Tuple[Path, str]],
+        changed_layers: List[str],
+        affected_keys: Set[str],
+    ):
+        """
+        Volver a parsear una capa nueva o modificada
+
+        Args:
+            name: Nombre de la capa
+            layer: Tupla (ruta, formato) actual o None si no existe
+            changed_layers: Lista donde añadir la capa si cambió
+            affected_keys: Conjunto donde añadir sus claves modificadas
+        """
+        path = layer[0] if layer else None
+        if (
+            name in self._paths
+            and path == self._paths[name]
+            and self._signature(path) == self._signatures[name]
+        ):
+            return
+
+        old_path = self._paths.get(name)
+        old_data = self._layer_data.get(name, {})
+        new_data = self._parse(layer)
+        self._paths[name] = path
+        self._signatures[name] = self._signature(path)
+        self._layer_data[name] = new_data
+        if path is not None or old_path is not None:
+            changed_layers.append(name)
+        affected_keys.update(self._changed_keys(old_data, new_data))
+
+    def _forget(self, name: str, changed_layers: List[str], affected_keys: Set[str]):
+        """Dejar de observar una capa que ya no interviene en la fusión"""
+        if self._paths[name] is not None:
+            changed_layers.append(name)
+        affected_keys.update(self._layer_data[name])
+        del self._paths[name], self._signatures[name], self._layer_data[name]
+
+    def _refresh_environment(self, changed_layers: List[str], affected_keys: Set[str]):
+        """
+        Recalcular la cadena de herencia y las subcapas del ambiente
+
+        Los ancestros y subcapas nuevos se parsean; los que dejan de aplicarse
+        se descartan y sus claves se recalculan.
+
+        Args:
+            changed_layers: Lista donde añadir las capas que cambiaron
+            affected_keys: Conjunto donde añadir las claves afectadas
+
+        Raises:
+            ValueError: Si la herencia es circular o un ancestro no existe
+        """
+        loader = self.loader
+        value = self._fold_key(self._shared_layers(), "environments")
+        shared = {} if value is MISSING else {"environments": value}
+
+        def parent_of(environment: str) -> Optional[str]:
+            name = self._layer_name(environment)
+            if name not in self._paths:
+                layer = loader._environment_layer(environment)
+                self._track(name, layer, changed_layers, affected_keys)
+            data = self._layer_data[name]
+            if EXTENDS_KEY in data:
+                return declared_parent(data, str(self._paths[name]))
+            table = environment_table(shared, environment)
+            return declared_parent(table, f"environments.{environment}")
+
+        chain = environment_chain(loader.environment, parent_of)
+        tables = {e: without_extends(environment_table(shared, e)) for e in chain}
+        for parent, child in zip(chain, chain[1:]):
+            if self._paths[self._layer_name(parent)] is None and not tables[parent]:
+                raise ValueError(
+                    f"Ambiente base no encontrado: {parent} ({EXTENDS_KEY} de {child})"
+                )
+
+        # Las entradas de la tabla 'environments' son capas derivadas
+        for environment in set(chain) | set(self._env_tables):
+            affected_keys.update(
+                self._changed_keys(
+                    self._env_tables.get(environment, {}), tables.get(environment, {})
+                )
+            )
+        self._chain, self._env_tables, self._sublayers = chain, tables, []
+
+        aws = self._fold_key(self._ordered_layers(), "aws")
+        stems = sublayer_stems({} if aws is MISSING else {"aws": aws})
+        for stem in stems:
+            if stem not in self._paths:
+                self._track(
+                    stem, loader._find_layer(stem), changed_layers, affected_keys
+                )
+        self._sublayers = stems
+
+        order = [n for n in self._order if not self._is_environment_layer(n)]
+        order += [self._layer_name(e) for e in chain] + stems
+        for name in self._order:
+            if name not in order:
+                self._forget(name, changed_layers, affected_keys)
+        self._order = order
+
+    @staticmethod
+    def _fold_key(
+        layers: List[Dict[str, Any]], key: str, strategies: Any = MISSING
+    ) -> Any:
+        """
+        Calcular el valor fusionado de una clave de primer nivel
+
+        Args:
+            layers: Datos de las capas en orden de fusión
+            key: Clave de primer nivel
+            strategies: Tabla 'merge_strategies' ya fusionada (por defecto se
+                calcula a partir de las capas)
+
+        Returns:
+            Valor fusionado o MISSING si ninguna capa define la clave
+        """
+        if strategies is MISSING and key != MERGE_STRATEGIES_KEY:
+            strategies = ConfigWatcher._fold_key(layers, MERGE_STRATEGIES_KEY)
+        table = strategies if isinstance(strategies, dict) else {}
+
+        value: Any = MISSING
+        for layer in layers:
+            if key not in layer:
+                continue
+            if value is MISSING:
+                value = layer[key]
+            else:
+                value = deep_merge({key: value}, {key: layer[key]}, table)[key]
+        return value
+
+    def _fold(self, layers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Fusionar todas las capas completas"""
+        merged: Dict[str, Any] = {}
+        for layer in layers:
+            merged = deep_merge(merged, layer)
+        return merged
+
+    def subscribe(self, callback: Callable[[ConfigChangeEvent], Any]):
+        """
+        Registrar un suscriptor de cambios
+
+        Args:
+            callback: Función que recibe un ConfigChangeEvent
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[ConfigChangeEvent], Any]):
+        """
+        Eliminar un suscriptor de cambios
+
+        Args:
+            callback: Función registrada con subscribe()
+        """
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def poll(self) -> Optional[ConfigChangeEvent]:
+        """
+        Comprobar las capas una vez y notificar si la configuración cambió
+
+        Un sondeo fallido (por ejemplo, un archivo guardado a medias) no
+        modifica el estado: se conserva la última configuración válida y el
+        siguiente sondeo vuelve a comprobar todas las capas. Los errores de
+        los suscriptores se notifican a on_error sin interrumpir a los demás.
+
+        Returns:
+            ConfigChangeEvent si hubo cambios en la configuración fusionada
+
+        Raises:
+            ValueError: Si una capa no se puede parsear o la herencia no es válida
+        """
+        with self._lock:
+            state = {name: getattr(self, name) for name in _POLL_STATE}
+            # Los contenedores se reemplazan en lugar de modificarse, por lo
+            # que basta una copia superficial para poder restaurarlos
+            for name in ("_paths", "_signatures", "_layer_data"):
+                setattr(self, name, dict(state[name]))
+            try:
+                event = self._poll_layers()
+            except BaseException:
+                for name, value in state.items():
+                    setattr(self, name, value)
+                raise
+            subscribers = list(self._subscribers)
+
+        if event is not None:
+            for callback in subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    self._report(e)
+        return event
+
+    def _poll_layers(self) -> Optional[ConfigChangeEvent]:
+        """Comprobar las capas y recalcular la configuración (con el lock tomado)"""
+        changed_layers: List[str] = []
+        affected_keys: Set[str] = set()
+
+        layers = self._discover()
+        removed = [n for n in self._order if n not in layers]
+
+        for name, layer in layers.items():
+            self._track(name, layer, changed_layers, affected_keys)
+        for name in removed:
+            self._forget(name, changed_layers, affected_keys)
+        self._order = list(layers)
+
+        if self.loader.environment:
+            self._refresh_environment(changed_layers, affected_keys)
+
+        if not changed_layers:
+            return None
+        return self._remerge(affected_keys, changed_layers)
+
+    def _report(self, error: Exception):
+        """Notificar un error a on_error o registrarlo si no hay función"""
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            logger.error("Error en el modo watch de configuración: %s", error)
+
+    @staticmethod
+    def _changed_keys(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+        """Claves de primer nivel que difieren entre dos versiones de una capa"""
+        keys = set(old) | set(new)
+        return {k for k in keys if old.get(k, MISSING) != new.get(k, MISSING)}
+
+    def _remerge(
+        self, affected_keys: Set[str], changed_layers: List[str]
+    ) -> Optional[ConfigChangeEvent]:
+        """
+        Recalcular solo las claves de primer nivel afectadas
+
+        Args:
+            affected_keys: Claves de primer nivel a recalcular
+            changed_layers: Nombres de las capas que cambiaron
+
+        Returns:
+            ConfigChangeEvent o None si el resultado fusionado no cambió
+        """
+        layers = self._ordered_layers()
+        merged = self._merged.copy()
+
+        strategies = self._fold_key(layers, MERGE_STRATEGIES_KEY)
+        if MERGE_STRATEGIES_KEY in affected_keys:
+            # Las estrategias de listas pueden cambiar cualquier sección
+            affected_keys = affected_keys.union(*layers)
+
+        for key in sorted(affected_keys):
+            new_value = self._fold_key(layers, key, strategies)
+            if new_value is MISSING:
+                merged.pop(key, None)
+            else:
+                merged[key] = new_value
+
+        # Las secciones sin cambios ni referencias se comparten con la versión
+        # anterior, por lo que la comparación no las recorre
+        resolved = resolve_references(merged)
+        paths = []
+        for key in sorted(set(self._resolved) | set(resolved)):
+            paths.extend(
+                changed_paths(
+                    self._resolved.get(key, MISSING), resolved.get(key, MISSING), key
+                )
+            )
+        self._merged = merged
+        if not paths:
+            return None
+
+        self._resolved = resolved
+        self._publish()
+        return ConfigChangeEvent(
+            changed_paths=paths,
+            changed_layers=changed_layers,
+            config=ConfigSection(self.loader.config_data),
+        )
+
+    def _publish(self):
+        """Actualizar el loader y su entrada en el cache en memoria"""
+        loader = self.loader
+        loader._set_config_data(loader._with_secrets(self._resolved))
+        loader._cache.put(
+            loader._cache_key(loader._resolve_config_path()), self._resolved
+        )
+
+    def start(self) -> "ConfigWatcher":
+        """
+        Iniciar el hilo de sondeo en segundo plano
+
+        Returns:
+            ConfigWatcher: La misma instancia
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name="ConfigWatcher", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Detener el hilo de sondeo
+
+        Args:
+            timeout: Segundos máximos de espera por el hilo
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        """Bucle del hilo de sondeo; un error no detiene el sondeo"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                try:
+                    self._report(e)
+                except Exception:
+                    logger.exception("Error en on_error del modo watch")
+
+    def __enter__(self) -> "ConfigWatcher":
+        """Permite usar el observador como context manager"""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Detener el observador al salir del bloque"""
+        self.stop()
@@ -14,6 +14,17 @@ setup(
         "toml>=0.10.2",
         "pyyaml>=6.0",
     ],
+    extras_require={
+        # Backends de parseo más rápidos, seleccionados automáticamente
+        "fast": [
+            "orjson>=3.8",
+            "tomli>=2.0; python_version < '3.11'",
+        ],
+        # Validación de configuraciones con esquemas
+        "schema": ["pydantic>=2.5"],
+        # Capas remotas (S3, SSM) y resolución de parámetros y secretos
+        "aws": ["boto3>=1.34.0"],
+    },
     python_requires=">=3.7",
     classifiers=[
         "Development Status :: 4 - Beta",
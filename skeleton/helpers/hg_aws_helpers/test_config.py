@@ -2,16 +2,51 @@
 Pruebas unitarias para ConfigLoader y ConfigConverter
 """
 
+import dataclasses
+import datetime
+import importlib.util
+import io
 import json
 import os
+import subprocess
+import sys
+import threading
+import time
 import unittest
+import warnings
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 import toml
 import yaml
+import config_backends
+import config_converter
+import config_loader
+import config_merkle
+from config_cache import ConfigDirectoryIndex
+from config_codegen import generate_source, main, write_module
+from config_context import CdkContextStore, parse_context_key
 from config_converter import ConfigConverter
+from config_environments import EnvironmentGraph
+from config_interpolate import resolve_references
+from config_merge import MISSING, deep_merge
+from config_merkle import MerkleTree, diff_configs
+from config_remote import RemoteLayerCache, parse_remote_uri
 from config_loader import ConfigLoader, ConfigSection
+from config_schema import ConfigValidationError, compile_schema
+from config_secrets import (
+    SecretReference,
+    SecretResolver,
+    default_resolver,
+    parse_secret_reference,
+)
+from config_watch import ConfigWatcher
+
+try:
+    from moto import mock_aws
+except ImportError:  # moto es una dependencia de desarrollo
+    mock_aws = None
 
 
 class TestConfigSection(unittest.TestCase):
@@ -40,6 +75,31 @@ class TestConfigSection(unittest.TestCase):
         )
         self.assertEqual(section.project.get("name"), "test-project")
 
+    def test_child_sections_are_cached(self):
+        """Probar que las subsecciones se reutilizan entre accesos"""
+        section = ConfigSection({"network": {"vpc": {"cidr": "10.0.0.0/16"}}})
+
+        self.assertIs(section.network, section.network)
+        self.assertIs(section.network.vpc, section.network.vpc)
+        self.assertIs(section.missing, section.other.missing)
+        self.assertEqual(section.missing.to_dict(), {})
+
+        with self.assertRaises(AttributeError):
+            section.missing.value = 1
+
+    def test_mapping_protocol(self):
+        """Probar iteración, longitud, keys() e items()"""
+        section = ConfigSection({"name": "test", "tags": {"Owner": "DevOps"}})
+
+        self.assertEqual(list(section), ["name", "tags"])
+        self.assertEqual(len(section), 2)
+        self.assertEqual(list(section.keys()), ["name", "tags"])
+
+        items = dict(section.items())
+        self.assertEqual(items["name"], "test")
+        self.assertIs(items["tags"], section.tags)
+        self.assertEqual(len(section.missing), 0)
+
     def test_to_dict(self):
         """Probar conversión a diccionario"""
         data = {"key": "value", "nested": {"key": "value"}}
@@ -47,6 +107,195 @@ class TestConfigSection(unittest.TestCase):
         self.assertEqual(section.to_dict(), data)
 
 
+class TestDeepMerge(unittest.TestCase):
+    """Pruebas para la fusión con estructura compartida"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.base = {
+            "network": {"vpc_cidr": "10.0.0.0/16", "nat_gateways": 1},
+            "tags": {f"Tag{i}": str(i) for i in range(100)},
+            "allowlist": ["10.0.0.1", "10.0.0.2"],
+            "flags": {"enabled": 1},
+        }
+
+    def test_untouched_subtrees_are_shared(self):
+        """Probar que las subsecciones no modificadas no se copian"""
+        merged = deep_merge(self.base, {"network": {"nat_gateways": 3}})
+
+        self.assertEqual(merged["network"]["nat_gateways"], 3)
+        self.assertEqual(self.base["network"]["nat_gateways"], 1)
+        self.assertIsNot(merged, self.base)
+        self.assertIsNot(merged["network"], self.base["network"])
+        self.assertIs(merged["tags"], self.base["tags"])
+        self.assertIs(merged["allowlist"], self.base["allowlist"])
+
+    def test_noop_delta_shares_base(self):
+        """Probar que una actualización sin cambios reutiliza la base"""
+        merged = deep_merge(
+            self.base,
+            {"tags": {"Tag1": "1"}, "allowlist": ["10.0.0.1", "10.0.0.2"]},
+        )
+
+        self.assertIs(merged["tags"], self.base["tags"])
+        self.assertIs(merged["allowlist"], self.base["allowlist"])
+
+    def test_type_changes_are_applied(self):
+        """Probar que valores iguales de distinto tipo sí se aplican"""
+        merged = deep_merge(self.base, {"flags": {"enabled": True}})
+
+        self.assertIs(merged["flags"]["enabled"], True)
+        self.assertIs(self.base["flags"]["enabled"], 1)
+
+
+class TestListMergeStrategies(unittest.TestCase):
+    """Pruebas para las estrategias de fusión de listas (merge_strategies)"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.base = {
+            "merge_strategies": {
+                "storage.lifecycle_rules": {"strategy": "merge", "key": "id"},
+                "storage.lifecycle_rules.transitions": "append",
+                "network.allowlist": "append",
+            },
+            "storage": {
+                "lifecycle_rules": [
+                    {"id": "logs", "days": 30, "transitions": ["GLACIER"]},
+                    {"id": "tmp", "days": 1},
+                ],
+                "buckets": ["a", "b"],
+            },
+            "network": {"allowlist": ["10.0.0.1"]},
+        }
+
+    def test_merge_by_key(self):
+        """Probar que se ajusta una regla por su id sin copiar la lista"""
+        merged = deep_merge(
+            self.base,
+            {
+                "storage": {
+                    "lifecycle_rules": [
+                        {"id": "logs", "days": 90, "transitions": ["DEEP_ARCHIVE"]},
+                        {"id": "audit", "days": 365},
+                    ]
+                }
+            },
+        )
+
+        rules = merged["storage"]["lifecycle_rules"]
+        self.assertEqual([r["id"] for r in rules], ["logs", "tmp", "audit"])
+        self.assertEqual(rules[0]["days"], 90)
+        self.assertEqual(rules[0]["transitions"], ["GLACIER", "DEEP_ARCHIVE"])
+        self.assertIs(rules[1], self.base["storage"]["lifecycle_rules"][1])
+        self.assertEqual(self.base["storage"]["lifecycle_rules"][0]["days"], 30)
+
+    def test_append_and_replace(self):
+        """Probar append y que las listas sin estrategia se reemplazan"""
+        merged = deep_merge(
+            self.base,
+            {"network": {"allowlist": ["10.0.0.2"]}, "storage": {"buckets": ["c"]}},
+        )
+
+        self.assertEqual(merged["network"]["allowlist"], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(merged["storage"]["buckets"], ["c"])
+
+    def test_noop_merge_shares_list(self):
+        """Probar que una fusión por clave sin cambios reutiliza la lista base"""
+        merged = deep_merge(
+            self.base, {"storage": {"lifecycle_rules": [{"id": "tmp", "days": 1}]}}
+        )
+        self.assertIs(merged["storage"], self.base["storage"])
+
+    def test_strategy_declared_in_update(self):
+        """Probar que la capa que declara la estrategia ya la usa"""
+        merged = deep_merge(
+            {"rules": [{"name": "a", "port": 1}]},
+            {
+                "merge_strategies": {"rules": {"key": "name"}},
+                "rules": [{"name": "a", "port": 2}, {"name": "b", "port": 3}],
+            },
+        )
+        self.assertEqual(
+            merged["rules"], [{"name": "a", "port": 2}, {"name": "b", "port": 3}]
+        )
+
+    def test_invalid_strategy(self):
+        """Probar el error de una estrategia desconocida o sin clave"""
+        for spec in ("prepend", {"strategy": "merge"}):
+            with self.assertRaises(ValueError):
+                deep_merge({"merge_strategies": {"rules": spec}}, {"rules": []})
+
+    def test_merge_by_key_is_linear(self):
+        """Probar que la fusión por clave no compara cada par de elementos"""
+
+        class Key(str):
+            comparisons = 0
+
+            def __eq__(self, other):
+                Key.comparisons += 1
+                return str.__eq__(self, other)
+
+            __hash__ = str.__hash__
+
+        size = 2000
+        base = {
+            "merge_strategies": {"rules": {"strategy": "merge", "key": "id"}},
+            "rules": [{"id": Key(f"r{i}"), "allow": True} for i in range(size)],
+        }
+        update = {"rules": [{"id": Key(f"r{i}"), "allow": False} for i in range(size)]}
+
+        merged = deep_merge(base, update)
+
+        self.assertTrue(all(not rule["allow"] for rule in merged["rules"]))
+        self.assertLess(Key.comparisons, 10 * size)
+
+    def test_loader_and_watcher_apply_strategies(self):
+        """Probar las estrategias entre capas con ConfigLoader y el modo watch"""
+        with TemporaryDirectory() as temp_dir:
+            config_dir = Path(temp_dir)
+            (config_dir / "base.toml").write_text(
+                "[merge_strategies]\n"
+                '"network.subnets" = { strategy = "merge", key = "name" }\n\n'
+                "[[network.subnets]]\n"
+                'name = "public"\ncidr = "10.0.1.0/24"\n\n'
+                "[[network.subnets]]\n"
+                'name = "private"\ncidr = "10.0.2.0/24"\n',
+                encoding="utf-8",
+            )
+            (config_dir / "proyecto.toml").write_text(
+                '[project]\nname = "proyecto"\n', encoding="utf-8"
+            )
+            env_file = config_dir / "env.prod.toml"
+            env_file.write_text(
+                '[[network.subnets]]\nname = "private"\ncidr = "10.9.2.0/24"\n',
+                encoding="utf-8",
+            )
+            ConfigLoader.clear_cache()
+            loader = ConfigLoader(config_dir=str(config_dir), environment="prod")
+            loader.load_config("proyecto.toml")
+
+            self.assertEqual(
+                [s["cidr"] for s in loader.get("network.subnets")],
+                ["10.0.1.0/24", "10.9.2.0/24"],
+            )
+
+            watcher = ConfigWatcher(loader)
+            env_file.write_text(
+                '[[network.subnets]]\nname = "public"\ncidr = "10.9.1.0/24"\n',
+                encoding="utf-8",
+            )
+            os.utime(env_file, ns=(10**9, 10**9))
+            event = watcher.poll()
+
+            self.assertEqual(event.changed_paths, ["network.subnets"])
+            self.assertEqual(
+                [s["cidr"] for s in loader.get("network.subnets")],
+                ["10.9.1.0/24", "10.0.2.0/24"],
+            )
+            ConfigLoader.clear_cache()
+
+
 class TestConfigLoader(unittest.TestCase):
     """Pruebas para la clase ConfigLoader"""
 
@@ -208,6 +457,48 @@ project:
         self.assertEqual(prod_config.project.environment, "prod")
         self.assertEqual(prod_config.network.nat_gateways, 3)
 
+    def test_load_all_environments(self):
+        """Probar la carga de todos los ambientes parseando una vez lo compartido"""
+        with open(self.config_dir / "env.stage.yaml", "w", encoding="utf-8") as f:
+            f.write("network:\n  nat_gateways: 2\n")
+        with open(self.config_dir / "multi.toml", "w", encoding="utf-8") as f:
+            f.write(
+                '[project]\nname = "multi"\n'
+                "[environments.qa.network]\nnat_gateways = 5\n"
+                "[environments.prod.network]\nvpc_cidr = '10.9.0.0/16'\n"
+            )
+
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        ConfigLoader.clear_cache()
+        with mock.patch.object(
+            config_backends, "loads", wraps=config_backends.loads
+        ) as loads:
+            configs = loader.load_all_environments("multi.toml")
+
+        self.assertEqual(sorted(configs), ["dev", "prod", "qa", "stage"])
+        self.assertEqual(configs["stage"].network.nat_gateways, 2)
+        self.assertEqual(configs["qa"].network.nat_gateways, 5)
+        self.assertEqual(configs["prod"].network.nat_gateways, 3)
+        self.assertEqual(configs["prod"].network.vpc_cidr, "10.9.0.0/16")
+        self.assertEqual(configs["dev"].project.name, "multi")
+
+        parsed = [call.args[1] for call in loads.call_args_list]
+        for file_name in ("base.toml", "multi.toml"):
+            content = (self.config_dir / file_name).read_text(encoding="utf-8")
+            self.assertEqual(parsed.count(content), 1)
+
+        # Los resultados coinciden con la carga individual y quedan en el cache
+        ConfigLoader.clear_cache()
+        loader.load_all_environments()
+        for environment, config in configs.items():
+            single = ConfigLoader(
+                config_file="multi.toml",
+                config_dir=str(self.config_dir),
+                environment=environment,
+            )
+            self.assertEqual(single.to_dict(), config.to_dict())
+        self.assertEqual(ConfigLoader.cache_stats()["hits"], 4)
+
     def test_get_methods(self):
         """Probar métodos get"""
         loader = ConfigLoader(
@@ -249,6 +540,33 @@ project:
         with self.assertRaises(KeyError):
             loader.get_required("database.host")
 
+    def test_flattened_index(self):
+        """Probar acceso por índice plano, incluyendo elementos de listas"""
+        with open(self.config_dir / "redes.toml", "w", encoding="utf-8") as f:
+            f.write('[network]\npublic_subnets = ["10.0.1.0/24", "10.0.2.0/24"]\n')
+
+        loader = ConfigLoader(config_file="redes.toml", config_dir=str(self.config_dir))
+
+        self.assertEqual(loader.get("network.public_subnets[1]"), "10.0.2.0/24")
+        self.assertEqual(loader.get("network.public_subnets.1", "n/a"), "n/a")
+        self.assertEqual(loader.get("network")["public_subnets"][0], "10.0.1.0/24")
+        self.assertEqual(loader.get("aws.region.name", "n/a"), "n/a")
+        self.assertTrue(loader.validate_required_keys(["network.public_subnets[0]"]))
+
+    def test_index_invalidated_on_reload(self):
+        """Probar que el índice se reconstruye al recargar"""
+        loader = ConfigLoader(
+            config_file="proyecto-test.toml", config_dir=str(self.config_dir)
+        )
+        self.assertEqual(loader.get("project.name"), "proyecto-test")
+
+        with open(self.config_dir / "proyecto-test.toml", "w", encoding="utf-8") as f:
+            f.write('[project]\nname = "renombrado"\n')
+
+        loader.invalidate()
+        loader.load_config()
+        self.assertEqual(loader.get("project.name"), "renombrado")
+
     def test_aws_config(self):
         """Probar método get_aws_config"""
         loader = ConfigLoader(
@@ -264,125 +582,2682 @@ project:
         self.assertEqual(aws_config["tags"]["Owner"], "DevOps")
 
 
-class TestConfigConverter(unittest.TestCase):
-    """Pruebas para la clase ConfigConverter"""
+class TestConfigCache(unittest.TestCase):
+    """Pruebas para el cache LRU en memoria de ConfigLoader"""
 
     def setUp(self):
         """Configuración inicial para las pruebas"""
         self.temp_dir = TemporaryDirectory()
         self.config_dir = Path(self.temp_dir.name)
 
-        # Crear archivos de prueba
-        self._create_test_files()
+        with open(self.config_dir / "proyecto.toml", "w", encoding="utf-8") as f:
+            f.write('[project]\nname = "proyecto"\n')
+        for env, nat in (("dev", 1), ("prod", 3)):
+            with open(self.config_dir / f"env.{env}.toml", "w", encoding="utf-8") as f:
+                f.write(f"[network]\nnat_gateways = {nat}\n")
+
+        ConfigLoader.clear_cache()
 
     def tearDown(self):
         """Limpieza después de las pruebas"""
+        ConfigLoader._cache.resize(64)
+        ConfigLoader.clear_cache()
         self.temp_dir.cleanup()
 
-    def _create_test_files(self):
-        """Crear archivos de prueba"""
-        # Archivo proyecto-test.toml
-        project_toml = """
-[project]
-name = "proyecto-test"
-tags = { Owner = "DevOps", Environment = "Development" }
+    def _loader(self, environment=None):
+        """Crear un loader para el archivo de prueba"""
+        return ConfigLoader(
+            config_file="proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment=environment,
+        )
 
-[aws]
-region = "us-east-1"
-account_id = "123456789012"
-"""
+    def test_cache_is_environment_aware(self):
+        """Probar que el mismo archivo con distinto ambiente no comparte entrada"""
+        self.assertEqual(self._loader("dev").get("network.nat_gateways"), 1)
+        self.assertEqual(self._loader("prod").get("network.nat_gateways"), 3)
+        self.assertEqual(self._loader("dev").get("network.nat_gateways"), 1)
 
-        with open(self.config_dir / "proyecto-test.toml", "w", encoding="utf-8") as f:
-            f.write(project_toml)
+        stats = ConfigLoader.cache_stats()
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["entries"], 2)
+        self.assertGreater(stats["bytes"], 0)
 
-        # Archivo cdk.json
-        cdk_json = """{
-  "app": "npx ts-node --prefer-ts-exts bin/my-cdk-app.ts",
-  "context": {
-    "@aws-cdk/core:enableStackNameDuplicates": "true",
-    "aws-cdk:enableDiffNoFail": "true"
-  }
-}"""
+    def test_lru_eviction(self):
+        """Probar que el cache no crece por encima del límite"""
+        ConfigLoader._cache.resize(2)
 
-        with open(self.config_dir / "cdk.json", "w", encoding="utf-8") as f:
-            f.write(cdk_json)
+        self._loader()
+        self._loader("dev")
+        self._loader("prod")
 
-    def test_convert_toml_to_json(self):
-        """Probar conversión de TOML a JSON"""
-        converter = ConfigConverter(config_dir=str(self.config_dir))
+        stats = ConfigLoader.cache_stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
 
-        json_file = converter.convert_file(
-            input_file=str(self.config_dir / "proyecto-test.toml"), output_format="json"
+    def test_invalidate(self):
+        """Probar invalidación explícita de una entrada"""
+        loader = self._loader("dev")
+
+        with open(self.config_dir / "env.dev.toml", "w", encoding="utf-8") as f:
+            f.write("[network]\nnat_gateways = 2\n")
+
+        self.assertEqual(loader.load_config().network.nat_gateways, 1)
+        self.assertTrue(loader.invalidate())
+        self.assertEqual(loader.load_config().network.nat_gateways, 2)
+
+    def _load_concurrently(self, threads, environment="dev"):
+        """
+        Cargar la misma configuración desde varios hilos a la vez
+
+        Returns:
+            Tupla (resultados, excepciones, número de fusiones ejecutadas)
+        """
+        barrier = threading.Barrier(threads)
+        merges = []
+        merge_layers = ConfigLoader._merge_layers
+
+        def slow_merge(loader, layers):
+            merges.append(1)
+            time.sleep(0.05)
+            return merge_layers(loader, layers)
+
+        results, errors = [], []
+
+        def worker():
+            loader = ConfigLoader(
+                config_dir=str(self.config_dir), environment=environment
+            )
+            barrier.wait()
+            try:
+                results.append(loader.load_config("proyecto.toml"))
+            except Exception as e:
+                errors.append(e)
+
+        with mock.patch.object(
+            ConfigLoader, "_merge_layers", autospec=True, side_effect=slow_merge
+        ):
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+
+        return results, errors, len(merges)
+
+    def test_single_flight_stress(self):
+        """Probar que cargas concurrentes de la misma clave parsean una sola vez"""
+        results, errors, merges = self._load_concurrently(32)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(merges, 1)
+        self.assertEqual(len(results), 32)
+        first = results[0].to_dict()
+        self.assertTrue(all(r.to_dict() is first for r in results))
+
+        stats = ConfigLoader.cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"] + stats["coalesced"], 31)
+
+    def test_single_flight_shares_errors(self):
+        """Probar que los hilos en espera reciben la excepción de la carga"""
+        os.remove(self.config_dir / "proyecto.toml")
+        results, errors, _ = self._load_concurrently(8)
+
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 8)
+        self.assertTrue(all(isinstance(e, FileNotFoundError) for e in errors))
+        self.assertEqual(ConfigLoader.cache_stats()["entries"], 0)
+
+    def test_invalidate_during_load(self):
+        """Probar que una carga invalidada en curso no guarda su resultado"""
+        loader = self._loader("dev")
+        loader.invalidate()
+        merge_layers = ConfigLoader._merge_layers
+
+        def merge_and_invalidate(instance, layers):
+            data = merge_layers(instance, layers)
+            loader.invalidate()
+            return data
+
+        with mock.patch.object(
+            ConfigLoader,
+            "_merge_layers",
+            autospec=True,
+            side_effect=merge_and_invalidate,
+        ):
+            loader.load_config()
+
+        self.assertEqual(loader.get("network.nat_gateways"), 1)
+        self.assertEqual(ConfigLoader.cache_stats()["entries"], 0)
+
+
+class TestConfigDirectoryIndex(unittest.TestCase):
+    """Pruebas para el índice compartido de directorios de configuración"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+
+        for name in ("base.yaml", "env.dev.json", "proyecto.json"):
+            (self.config_dir / name).write_text("{}", encoding="utf-8")
+        self._age_directory()
+
+        ConfigDirectoryIndex.clear()
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigDirectoryIndex.clear()
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _age_directory(self):
+        """Retrasar el mtime del directorio para que el índice confíe en él"""
+        os.utime(self.config_dir, ns=(10**18, 10**18))
+
+    def test_find_layers(self):
+        """Probar búsqueda de capas por nombre base y orden de formatos"""
+        index = ConfigDirectoryIndex.for_directory(self.config_dir)
+
+        self.assertIs(index, ConfigDirectoryIndex.for_directory(str(self.config_dir)))
+        self.assertEqual(index.find("base", ConfigLoader.SUPPORTED_FORMATS)[1], "yaml")
+        self.assertEqual(
+            index.find("env.dev", ConfigLoader.SUPPORTED_FORMATS)[1], "json"
         )
+        self.assertIsNone(index.find("env.prod", ConfigLoader.SUPPORTED_FORMATS))
 
-        # Verificar que el archivo existe
-        self.assertTrue(Path(json_file).exists())
+    def test_single_scan_shared_by_loaders(self):
+        """Probar que varios loaders comparten un único escaneo"""
+        with mock.patch("config_cache.os.scandir", wraps=os.scandir) as scandir:
+            for environment in ("dev", "prod", "stage"):
+                ConfigLoader(
+                    config_file="proyecto.json",
+                    config_dir=str(self.config_dir),
+                    environment=environment,
+                )
 
-        # Verificar contenido
-        with open(json_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        self.assertEqual(scandir.call_count, 1)
 
-        self.assertEqual(data["project"]["name"], "proyecto-test")
-        self.assertEqual(data["aws"]["region"], "us-east-1")
+    def test_refresh_on_directory_change(self):
+        """Probar que el índice se actualiza cuando cambia el directorio"""
+        index = ConfigDirectoryIndex.for_directory(self.config_dir)
+        self.assertIsNone(index.find("env.prod", ConfigLoader.SUPPORTED_FORMATS))
 
-    def test_convert_toml_to_yaml(self):
-        """Probar conversión de TOML a YAML"""
-        converter = ConfigConverter(config_dir=str(self.config_dir))
+        (self.config_dir / "env.prod.yml").write_text("{}", encoding="utf-8")
 
-        yaml_file = converter.convert_file(
-            input_file=str(self.config_dir / "proyecto-test.toml"), output_format="yaml"
+        self.assertEqual(
+            index.find("env.prod", ConfigLoader.SUPPORTED_FORMATS)[1], "yaml"
         )
 
-        # Verificar que el archivo existe
-        self.assertTrue(Path(yaml_file).exists())
 
-        # Verificar contenido
-        with open(yaml_file, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+class TestDiskConfigCache(unittest.TestCase):
+    """Pruebas para el cache persistente en disco de ConfigLoader"""
 
-        self.assertEqual(data["project"]["name"], "proyecto-test")
-        self.assertEqual(data["aws"]["region"], "us-east-1")
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name) / "config"
+        self.cache_dir = Path(self.temp_dir.name) / "cache"
+        self.config_dir.mkdir()
 
-    def test_import_cdk_context(self):
-        """Probar importación de CDK context"""
-        converter = ConfigConverter(config_dir=str(self.config_dir))
+        with open(self.config_dir / "base.toml", "w", encoding="utf-8") as f:
+            f.write('[aws]\nregion = "us-east-1"\n')
+        with open(self.config_dir / "proyecto.toml", "w", encoding="utf-8") as f:
+            f.write('[project]\nname = "proyecto"\n')
+        with open(self.config_dir / "env.dev.toml", "w", encoding="utf-8") as f:
+            f.write("[network]\nnat_gateways = 1\n")
 
-        toml_file = converter.import_cdk_context(
-            cdk_json_path=str(self.config_dir / "cdk.json"), output_format="toml"
+        ConfigLoader._cache.clear()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader._cache.clear()
+        self.temp_dir.cleanup()
+
+    def _load(self):
+        """Cargar configuración simulando un proceso nuevo"""
+        ConfigLoader._cache.clear()
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir),
+            environment="dev",
+            disk_cache=True,
+            cache_dir=str(self.cache_dir),
         )
+        return loader.load_config("proyecto.toml")
 
-        # Verificar que el archivo existe
-        self.assertTrue(Path(toml_file).exists())
+    def test_cache_hit_skips_parsing(self):
+        """Probar que una carga en frío reutiliza el resultado en disco"""
+        config = self._load()
+        self.assertEqual(config.project.name, "proyecto")
+        self.assertEqual(len(list(self.cache_dir.glob("*.json"))), 1)
 
-        # Verificar contenido
-        with open(toml_file, "r", encoding="utf-8") as f:
-            data = toml.load(f)
+        with mock.patch.object(
+            ConfigLoader, "_merge_layers", side_effect=AssertionError("parse")
+        ):
+            config = self._load()
 
-        self.assertEqual(data["@aws-cdk/core:enableStackNameDuplicates"], "true")
-        self.assertEqual(data["aws-cdk:enableDiffNoFail"], "true")
+        self.assertEqual(config.aws.region, "us-east-1")
+        self.assertEqual(config.network.nat_gateways, 1)
 
-    def test_export_to_cdk_context(self):
-        """Probar exportación a CDK context"""
-        converter = ConfigConverter(config_dir=str(self.config_dir))
+    def test_layer_change_invalidates(self):
+        """Probar que modificar una capa invalida la entrada"""
+        self._load()
 
-        cdk_file = converter.export_to_cdk_context(
-            config_file=str(self.config_dir / "proyecto-test.toml"),
-            cdk_json_path=str(self.config_dir / "cdk.json"),
+        with open(self.config_dir / "env.dev.toml", "w", encoding="utf-8") as f:
+            f.write("[network]\nnat_gateways = 22\n")
+
+        self.assertEqual(self._load().network.nat_gateways, 22)
+
+    def test_touch_without_changes_keeps_entry(self):
+        """Probar que un cambio de mtime sin cambio de contenido no re-parsea"""
+        self._load()
+        os.utime(self.config_dir / "base.toml", ns=(0, 0))
+
+        with mock.patch.object(
+            ConfigLoader, "_merge_layers", side_effect=AssertionError("parse")
+        ):
+            self.assertEqual(self._load().aws.region, "us-east-1")
+
+    def test_change_during_load_invalidates(self):
+        """Probar que la entrada se firma con los bytes parseados, no los actuales"""
+        env_file = self.config_dir / "env.dev.toml"
+        os.utime(env_file, ns=(10**9, 10**9))
+        merge_environment = ConfigLoader._merge_environment
+
+        def edit_after_parse(loader, data, environment):
+            result = merge_environment(loader, data, environment)
+            # Cambio con el mismo tamaño entre el parseo y el guardado
+            with open(env_file, "w", encoding="utf-8") as f:
+                f.write("[network]\nnat_gateways = 7\n")
+            return result
+
+        with mock.patch.object(
+            ConfigLoader,
+            "_merge_environment",
+            autospec=True,
+            side_effect=edit_after_parse,
+        ):
+            self.assertEqual(self._load().network.nat_gateways, 1)
+
+        self.assertEqual(self._load().network.nat_gateways, 7)
+
+    def test_non_json_types_not_cached(self):
+        """Probar que no se guardan datos que JSON no devuelve idénticos"""
+        with open(self.config_dir / "env.dev.yaml", "w", encoding="utf-8") as f:
+            f.write("ports:\n  80: http\n")
+        (self.config_dir / "env.dev.toml").unlink()
+
+        cold = self._load().to_dict()
+        warm = self._load().to_dict()
+
+        self.assertEqual(cold["ports"], {80: "http"})
+        self.assertEqual(warm, cold)
+        self.assertEqual(list(self.cache_dir.glob("*.json")), [])
+
+    def test_new_layer_invalidates(self):
+        """Probar que la aparición de una capa nueva invalida la entrada"""
+        (self.config_dir / "env.dev.toml").unlink()
+        self.assertEqual(self._load().network.get("nat_gateways"), None)
+
+        with open(self.config_dir / "env.dev.toml", "w", encoding="utf-8") as f:
+            f.write("[network]\nnat_gateways = 3\n")
+
+        self.assertEqual(self._load().network.nat_gateways, 3)
+
+
+class TestConfigFragments(unittest.TestCase):
+    """Pruebas para config.d/ e inclusiones de fragmentos"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        (self.config_dir / "config.d").mkdir()
+        (self.config_dir / "shared").mkdir()
+
+        self._write("base.toml", '[aws]\nregion = "us-east-1"\n')
+        self._write("config.d/10-network.toml", "[network]\nnat_gateways = 1\n")
+        self._write(
+            "config.d/20-network.yaml",
+            "network:\n  nat_gateways: 2\n  vpc_cidr: 10.0.0.0/16\n",
         )
+        self._write("proyecto.toml", '[project]\nname = "proyecto"\n')
 
-        # Verificar que el archivo existe
-        self.assertTrue(Path(cdk_file).exists())
+        ConfigLoader.clear_cache()
 
-        # Verificar contenido
-        with open(cdk_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
 
-        self.assertEqual(data["context"]["project"]["name"], "proyecto-test")
-        self.assertEqual(data["context"]["aws"]["region"], "us-east-1")
+    def _write(self, file_name, content):
+        """Escribir un archivo dentro del directorio de configuración"""
+        with open(self.config_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _load(self, environment=None, **kwargs):
+        """Cargar proyecto.toml desde el directorio temporal"""
+        ConfigLoader._cache.clear()
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir), environment=environment, **kwargs
+        )
+        return loader.load_config("proyecto.toml")
+
+    def test_fragments_merged_in_lexical_order(self):
+        """Probar que config.d/ se fusiona entre base y el archivo principal"""
+        self._write("config.d/30-project.json", '{"project": {"name": "frag"}}')
+        config = self._load()
+
+        self.assertEqual(config.aws.region, "us-east-1")
+        self.assertEqual(config.network.nat_gateways, 2)
+        self.assertEqual(config.network.vpc_cidr, "10.0.0.0/16")
+        self.assertEqual(config.project.name, "proyecto")
+
+    def test_edit_reparses_only_changed_fragment(self):
+        """Probar que editar un fragmento solo vuelve a parsear ese fragmento"""
+        self._load()
+        self._write("config.d/10-network.toml", "[network]\nnat_gateways = 9\n")
+        os.remove(self.config_dir / "config.d" / "20-network.yaml")
+
+        with mock.patch.object(
+            config_backends, "loads", wraps=config_backends.loads
+        ) as loads:
+            config = self._load()
+
+        self.assertEqual(config.network.nat_gateways, 9)
+        self.assertEqual(loads.call_count, 1)
+
+    def test_includes(self):
+        """Probar __include__ en TOML y !include en YAML"""
+        self._write("shared/tags.yaml", "Owner: devops\nProject: demo\n")
+        self._write(
+            "shared/defaults.toml",
+            '[compute]\ninstance_type = "t3.micro"\nmin_capacity = 1\n',
+        )
+        self._write(
+            "proyecto.toml",
+            '__include__ = ["shared/defaults.toml"]\n\n'
+            "[compute]\nmin_capacity = 2\n",
+        )
+        self._write("env.dev.yaml", "tags: !include shared/tags.yaml\n")
+        self._write("env.prod.yaml", "tags: !include shared/tags.yaml\n")
+
+        with mock.patch.object(
+            config_backends, "loads", wraps=config_backends.loads
+        ) as loads:
+            configs = ConfigLoader(
+                config_dir=str(self.config_dir)
+            ).load_all_environments("proyecto.toml")
+
+        for config in configs.values():
+            self.assertEqual(config.compute.instance_type, "t3.micro")
+            self.assertEqual(config.compute.min_capacity, 2)
+            self.assertNotIn("__include__", config)
+        self.assertEqual(configs["dev"].tags.Owner, "devops")
+        self.assertIs(
+            configs["dev"].to_dict()["tags"], configs["prod"].to_dict()["tags"]
+        )
+        # Cada fragmento compartido se parsea una sola vez
+        parsed = [call.args[1] for call in loads.call_args_list]
+        for file_name in ("shared/defaults.toml", "shared/tags.yaml"):
+            content = (self.config_dir / file_name).read_text(encoding="utf-8")
+            self.assertEqual(parsed.count(content), 1)
+
+    def test_circular_include(self):
+        """Probar que una inclusión circular produce un error"""
+        self._write("shared/a.toml", '__include__ = "b.toml"\n')
+        self._write("shared/b.toml", '__include__ = "a.toml"\n')
+        self._write("proyecto.toml", '__include__ = "shared/a.toml"\n')
+
+        with self.assertRaises(ValueError) as context:
+            self._load()
+        self.assertIn("circular", str(context.exception))
+
+    def test_disk_cache_tracks_includes(self):
+        """Probar que modificar un fragmento incluido invalida el cache en disco"""
+        cache_dir = str(self.config_dir / "cache")
+        self._write("shared/db.toml", "[database]\nport = 5432\n")
+        self._write("proyecto.toml", '__include__ = "shared/db.toml"\n')
+        self.assertEqual(self._load(cache_dir=cache_dir).database.port, 5432)
+
+        self._write("shared/db.toml", "[database]\nport = 3306\n")
+        self.assertEqual(self._load(cache_dir=cache_dir).database.port, 3306)
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    """Pruebas para los snapshots compilados de ConfigLoader"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name) / "config"
+        self.snapshot_dir = Path(self.temp_dir.name) / "snapshots"
+        self.config_dir.mkdir()
+
+        self._write("base.toml", '[aws]\nregion = "us-east-1"\n')
+        self._write("proyecto.toml", '[project]\nname = "proyecto"\n')
+        self._write("env.dev.toml", "[network]\nnat_gateways = 1\n")
+        self._write("env.prod.yaml", "network:\n  nat_gateways: 3\n")
+
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content):
+        """Escribir un archivo dentro del directorio de configuración"""
+        with open(self.config_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _compile(self, **kwargs):
+        """Compilar los snapshots de proyecto.toml"""
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        return loader.compile(str(self.snapshot_dir), "proyecto.toml", **kwargs)
+
+    def _from_snapshot(self, environment, **kwargs):
+        """Cargar un ambiente desde su snapshot"""
+        ConfigLoader.clear_cache()
+        return ConfigLoader.from_snapshot(
+            "proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment=environment,
+            snapshot_dir=str(self.snapshot_dir),
+            **kwargs,
+        )
+
+    def test_compile_and_load(self):
+        """Probar que el snapshot coincide con la carga completa sin parsear capas"""
+        snapshots = self._compile()
+        self.assertEqual(set(snapshots), {"dev", "prod", None})
+        self.assertTrue(snapshots["prod"].exists())
+
+        with mock.patch.object(
+            ConfigLoader, "_merge_layers", side_effect=AssertionError("parse")
+        ):
+            loader = self._from_snapshot("prod")
+
+        expected = ConfigLoader(
+            config_file="proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment="prod",
+        )
+        self.assertEqual(loader.config_data, expected.config_data)
+        self.assertEqual(loader.get("network.nat_gateways"), 3)
+        self.assertEqual(len(loader.snapshot_fingerprint), 64)
+
+    def test_layer_change_rebuilds(self):
+        """Probar que modificar una capa recompila el snapshot"""
+        self._compile()
+        fingerprint = self._from_snapshot("dev").snapshot_fingerprint
+
+        self._write("base.toml", '[aws]\nregion = "eu-west-1"\n')
+        loader = self._from_snapshot("dev")
+
+        self.assertEqual(loader.get("aws.region"), "eu-west-1")
+        self.assertNotEqual(loader.snapshot_fingerprint, fingerprint)
+        with mock.patch.object(
+            ConfigLoader, "_merge_layers", side_effect=AssertionError("parse")
+        ):
+            self.assertEqual(self._from_snapshot("dev").get("aws.region"), "eu-west-1")
+
+    def test_change_during_compile_rebuilds(self):
+        """Probar que el snapshot se firma con los bytes parseados, no los actuales"""
+        write_snapshot = config_loader.write_snapshot
+
+        def edit_before_write(*args, **kwargs):
+            # Cambio con el mismo tamaño entre el parseo y la escritura
+            self._write("env.dev.toml", "[network]\nnat_gateways = 7\n")
+            return write_snapshot(*args, **kwargs)
+
+        with mock.patch.object(
+            config_loader, "write_snapshot", side_effect=edit_before_write
+        ):
+            self._compile(environments=["dev"])
+
+        self.assertEqual(self._from_snapshot("dev").get("network.nat_gateways"), 7)
+
+    def test_new_layer_rebuilds(self):
+        """Probar que una capa nueva invalida el snapshot"""
+        self._compile()
+        (self.config_dir / "config.d").mkdir()
+        self._write("config.d/10-db.toml", "[database]\nport = 5432\n")
+
+        self.assertEqual(self._from_snapshot("dev").get("database.port"), 5432)
+
+    def test_missing_snapshot_without_rebuild(self):
+        """Probar que sin rebuild un snapshot ausente produce un error"""
+        with self.assertRaises(FileNotFoundError):
+            self._from_snapshot("dev", rebuild=False)
+
+    def test_required_keys(self):
+        """Probar que compile valida las claves requeridas por ambiente"""
+        with self.assertRaises(KeyError):
+            self._compile(required_keys=["network.vpc_cidr"])
+
+    def test_unrepresentable_config_loads_without_snapshot(self):
+        """Probar que fechas y claves no textuales se cargan sin snapshot"""
+        self._write("base.toml", "[aws]\nregion = 'us-east-1'\nsince = 2024-01-31\n")
+        self._write(
+            "env.prod.yaml", "network:\n  nat_gateways: 3\n  ports:\n    80: http\n"
+        )
+
+        for environment in ("dev", "prod"):
+            with self.assertWarns(RuntimeWarning):
+                loader = self._from_snapshot(environment)
+            self.assertEqual(loader.get("aws.since"), datetime.date(2024, 1, 31))
+            self.assertIsNone(loader.snapshot_fingerprint)
+        self.assertEqual(loader.config_data["network"]["ports"], {80: "http"})
+        self.assertFalse(self.snapshot_dir.exists())
+
+    def test_unwritable_snapshot_dir_loads_without_snapshot(self):
+        """Probar que un directorio de snapshots no escribible no impide cargar"""
+        self.snapshot_dir.write_text("", encoding="utf-8")
+
+        with self.assertWarns(RuntimeWarning):
+            loader = self._from_snapshot("prod")
+
+        self.assertEqual(loader.get("network.nat_gateways"), 3)
+
+    def test_same_file_name_in_other_directory(self):
+        """Probar que archivos con el mismo nombre no comparten snapshot"""
+        other_dir = Path(self.temp_dir.name) / "other"
+        other_dir.mkdir()
+        (other_dir / "proyecto.toml").write_text(
+            '[project]\nname = "otro"\n', encoding="utf-8"
+        )
+        self.assertEqual(self._from_snapshot("dev").get("project.name"), "proyecto")
+
+        ConfigLoader.clear_cache()
+        other = ConfigLoader.from_snapshot(
+            "proyecto.toml",
+            config_dir=str(other_dir),
+            environment="dev",
+            snapshot_dir=str(self.snapshot_dir),
+        )
+
+        self.assertEqual(other.get("project.name"), "otro")
+        self.assertEqual(self._from_snapshot("dev").get("project.name"), "proyecto")
+        self.assertEqual(len(list(self.snapshot_dir.glob("*.snapshot.json"))), 2)
+
+    def test_snapshot_does_not_import_parsers(self):
+        """Probar que cargar un snapshot no importa toml ni yaml"""
+        self._compile()
+        script = (
+            "import sys\n"
+            "from config_loader import ConfigLoader\n"
+            "loader = ConfigLoader.from_snapshot(\n"
+            f"    'proyecto.toml', config_dir={str(self.config_dir)!r},\n"
+            f"    environment='prod', snapshot_dir={str(self.snapshot_dir)!r})\n"
+            "assert loader.get('network.nat_gateways') == 3\n"
+            "parsers = ('toml', 'yaml', 'tomllib')\n"
+            "print(sorted(m for m in parsers if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+class TestEnvironmentInheritance(unittest.TestCase):
+    """Pruebas para la herencia entre ambientes y las subcapas de región y cuenta"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        self._write(
+            "base.toml",
+            '[aws]\nregion = "us-east-1"\naccount = "111111111111"\n\n'
+            "[network]\nnat_gateways = 1\n",
+        )
+        self._write("proyecto.toml", '[project]\nname = "proyecto"\n')
+        self._write(
+            "env.staging.toml",
+            '[network]\nnat_gateways = 2\n\n[compute]\ninstance_type = "m5.large"\n',
+        )
+        self._write(
+            "env.prod.toml", 'extends = "staging"\n\n[network]\nnat_gateways = 3\n'
+        )
+        self._write(
+            "env.prod-eu.toml", 'extends = "prod"\n\n[aws]\nregion = "eu-west-1"\n'
+        )
+        self._write("region.eu-west-1.toml", '[network]\nazs = ["eu-west-1a"]\n')
+        self._write("account.111111111111.toml", '[tags]\nCostCenter = "plataforma"\n')
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content, mtime_ns=None):
+        """Escribir un archivo dentro del directorio de configuración"""
+        file_path = self.config_dir / file_name
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+    def _load(self, environment, **kwargs):
+        """Cargar proyecto.toml para un ambiente"""
+        ConfigLoader.clear_cache()
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir), environment=environment, **kwargs
+        )
+        loader.load_config("proyecto.toml")
+        return loader
+
+    def test_extends_chain(self):
+        """Probar que prod-eu hereda de prod, que hereda de staging"""
+        loader = self._load("prod-eu")
+
+        self.assertEqual(loader.get("compute.instance_type"), "m5.large")
+        self.assertEqual(loader.get("network.nat_gateways"), 3)
+        self.assertEqual(loader.get("aws.region"), "eu-west-1")
+        self.assertNotIn("extends", loader.config_data)
+
+    def test_region_and_account_sublayers(self):
+        """Probar que las subcapas se eligen con aws.region y aws.account"""
+        prod_eu, prod = self._load("prod-eu"), self._load("prod")
+
+        self.assertEqual(prod_eu.get("network.azs"), ["eu-west-1a"])
+        self.assertIsNone(prod.get("network.azs"))
+        self.assertEqual(prod.get("tags.CostCenter"), "plataforma")
+
+    def test_table_extends(self):
+        """Probar 'extends' en la tabla 'environments'"""
+        self._write(
+            "proyecto.toml",
+            '[project]\nname = "proyecto"\n\n'
+            '[environments.qa]\nextends = "staging"\n\n'
+            "[environments.qa.network]\nnat_gateways = 5\n",
+        )
+        loader = self._load("qa")
+
+        self.assertEqual(loader.get("network.nat_gateways"), 5)
+        self.assertEqual(loader.get("compute.instance_type"), "m5.large")
+
+        configs = ConfigLoader(config_dir=str(self.config_dir)).load_all_environments(
+            "proyecto.toml"
+        )
+        self.assertEqual(configs["qa"].to_dict(), loader.config_data)
+
+    def test_invalid_inheritance(self):
+        """Probar los errores de herencia circular y de ancestro inexistente"""
+        self._write("env.staging.toml", 'extends = "prod-eu"\n')
+        with self.assertRaises(ValueError) as ctx:
+            self._load("prod")
+        self.assertIn(
+            "Herencia circular: prod -> staging -> prod-eu -> prod", str(ctx.exception)
+        )
+
+        self._write("env.staging.toml", 'extends = "no-existe"\n')
+        with self.assertRaises(ValueError) as ctx:
+            self._load("prod")
+        self.assertIn("Ambiente base no encontrado: no-existe", str(ctx.exception))
+
+    def test_shared_ancestors_merged_once(self):
+        """Probar que 40 ambientes hermanos fusionan sus ancestros una sola vez"""
+        for index in range(40):
+            self._write(
+                f"env.prod-{index:02d}.toml",
+                f'extends = "prod-eu"\n\n[network]\nnat_gateways = {index}\n',
+            )
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        loader.config_file = "proyecto.toml"
+        loader.format_type = "toml"
+        shared = loader._merge_layers(
+            loader._shared_layers(loader._resolve_config_path())
+        )
+        graph = EnvironmentGraph(loader, shared)
+
+        configs = {
+            f"prod-{i:02d}": graph.resolve(f"prod-{i:02d}")[0] for i in range(40)
+        }
+
+        # staging, prod y prod-eu una vez; cada hoja una vez y su subcapa de
+        # región y de cuenta
+        self.assertEqual(graph.merges, 3 + 40 * 3)
+        self.assertEqual(configs["prod-07"]["network"]["nat_gateways"], 7)
+        self.assertEqual(configs["prod-07"]["compute"]["instance_type"], "m5.large")
+        self.assertIs(configs["prod-07"]["compute"], configs["prod-08"]["compute"])
+
+    def test_sibling_environments_merge_in_parallel(self):
+        """Probar que los hermanos se fusionan en paralelo y cada ambiente una vez"""
+        for name in ("a", "b"):
+            self._write(f"env.prod-{name}.toml", 'extends = "prod-eu"\n')
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        loader.format_type = "toml"
+        graph = EnvironmentGraph(loader, {})
+        graph.node("prod-eu")
+
+        # Con un lock global la segunda fusión esperaría a la primera y la
+        # barrera expiraría
+        barrier = threading.Barrier(2, timeout=5)
+        deep_merge_layers = loader._deep_merge
+
+        def merge_together(base, update):
+            barrier.wait()
+            return deep_merge_layers(base, update)
+
+        loader._deep_merge = merge_together
+        errors = []
+
+        def node(environment):
+            try:
+                graph.node(environment)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [
+            threading.Thread(target=node, args=(environment,))
+            for environment in ("prod-a", "prod-b", "prod-a", "prod-b")
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(graph.merges, 3 + 2)
+
+    def test_ancestor_change_invalidates_caches(self):
+        """Probar que el cache en disco y los snapshots ven cambios de ancestros"""
+        cache_dir = str(self.config_dir / ".cache")
         self.assertEqual(
-            data["context"]["@aws-cdk/core:enableStackNameDuplicates"], "true"
+            self._load("prod-eu", cache_dir=cache_dir).get("compute.instance_type"),
+            "m5.large",
         )
 
+        self._write(
+            "env.staging.toml",
+            '[network]\nnat_gateways = 2\n\n[compute]\ninstance_type = "m5.xlarge"\n',
+        )
+        self.assertEqual(
+            self._load("prod-eu", cache_dir=cache_dir).get("compute.instance_type"),
+            "m5.xlarge",
+        )
+
+        snapshot_dir = str(self.config_dir / "snapshots")
+        ConfigLoader(config_dir=str(self.config_dir)).compile(
+            snapshot_dir, "proyecto.toml", environments=["prod"]
+        )
+        self._write("region.us-east-1.toml", "[network]\nnat_gateways = 9\n")
+        ConfigLoader.clear_cache()
+        loaded = ConfigLoader.from_snapshot(
+            "proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment="prod",
+            snapshot_dir=snapshot_dir,
+        )
+        self.assertEqual(loaded.get("network.nat_gateways"), 9)
+
+    def test_watcher_follows_extends(self):
+        """Probar que el modo watch sigue los cambios de 'extends' y de región"""
+        loader = self._load("prod-eu")
+        watcher = ConfigWatcher(loader)
+
+        self._write(
+            "env.prod-eu.toml",
+            'extends = "staging"\n\n[aws]\nregion = "us-east-1"\n',
+            mtime_ns=10**9,
+        )
+        event = watcher.poll()
+
+        self.assertIn("aws.region", event.changed_paths)
+        self.assertIn("network.azs", event.changed_paths)
+        self.assertIn("environment:prod", event.changed_layers)
+        self.assertIn("region.eu-west-1", event.changed_layers)
+        self.assertEqual(loader.config_data, self._load("prod-eu").config_data)
+        self.assertEqual(loader.get("network.nat_gateways"), 2)
+
+
+class TestConfigInterpolation(unittest.TestCase):
+    """Pruebas para la interpolación de referencias ${...}"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        self._write(
+            "base.toml",
+            '[aws]\nregion = "us-east-1"\n\n'
+            '[project]\nname = "proyecto"\n\n'
+            '[network]\nvpc_cidr = "10.0.0.0/16"\nnat_gateways = 1\n'
+            'public_subnets = ["10.0.1.0/24"]\n',
+        )
+        self._write(
+            "proyecto.toml",
+            '[stack]\nname = "${project.name}-${aws.region}"\n'
+            'cidr = "${network.vpc_cidr}"\n'
+            'nat_gateways = "${network.nat_gateways}"\n'
+            'subnet = "${network.public_subnets[0]}"\n'
+            'owner = "${env:HG_TEST_OWNER:-devops}"\n'
+            'literal = "$${no.es.referencia}"\n',
+        )
+        self._write("env.prod.toml", '[aws]\nregion = "eu-west-1"\n')
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content):
+        """Escribir un archivo dentro del directorio de configuración"""
+        with open(self.config_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _load(self, environment=None):
+        """Cargar proyecto.toml"""
+        loader = ConfigLoader(config_dir=str(self.config_dir), environment=environment)
+        return loader.load_config("proyecto.toml")
+
+    def test_references_across_layers(self):
+        """Probar referencias a valores de otras capas y del ambiente"""
+        stack = self._load("prod").stack
+
+        self.assertEqual(stack.name, "proyecto-eu-west-1")
+        self.assertEqual(stack.cidr, "10.0.0.0/16")
+        self.assertEqual(stack.nat_gateways, 1)
+        self.assertEqual(stack.subnet, "10.0.1.0/24")
+        self.assertEqual(stack.owner, "devops")
+        self.assertEqual(stack.literal, "${no.es.referencia}")
+
+    def test_environment_variables(self):
+        """Probar ${env:VAR} con y sin valor por defecto"""
+        with mock.patch.dict(os.environ, {"HG_TEST_OWNER": "plataforma"}):
+            self.assertEqual(self._load().stack.owner, "plataforma")
+
+        self.assertEqual(
+            resolve_references({"a": "${env:HG_TEST_OWNER:-}"}, environ={}), {"a": ""}
+        )
+        with self.assertRaises(ValueError):
+            resolve_references({"a": "${env:HG_TEST_MISSING}"}, environ={})
+
+    def test_all_environments_resolved(self):
+        """Probar que load_all_environments resuelve cada ambiente por separado"""
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        configs = loader.load_all_environments("proyecto.toml")
+        self.assertEqual(configs["prod"].stack.name, "proyecto-eu-west-1")
+
+    def test_cycle_detection(self):
+        """Probar que las referencias circulares se detectan"""
+        with self.assertRaises(ValueError) as ctx:
+            resolve_references({"a": {"x": "${b.y}"}, "b": {"y": "${a}"}})
+        self.assertIn("Referencia circular", str(ctx.exception))
+        self.assertIn("a.x", str(ctx.exception))
+
+        self._write("env.dev.toml", '[aws]\nregion = "${stack.name}"\n')
+        with self.assertRaises(ValueError):
+            self._load("dev")
+
+    def test_cloudformation_and_iam_variables_untouched(self):
+        """Probar que ${AWS::Region} y ${aws:username} no se interpretan"""
+        self._write(
+            "iam.toml",
+            "[iam]\n"
+            'sub = "arn:aws:sns:${AWS::Region}:${AWS::AccountId}:topic"\n'
+            'resource = "arn:aws:s3:::bucket/home/${aws:username}/*"\n'
+            'mixed = "${project.name}-${AWS::StackName}"\n',
+        )
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        iam = loader.load_config("iam.toml").iam
+
+        self.assertEqual(iam.sub, "arn:aws:sns:${AWS::Region}:${AWS::AccountId}:topic")
+        self.assertEqual(iam.resource, "arn:aws:s3:::bucket/home/${aws:username}/*")
+        self.assertEqual(iam.mixed, "proyecto-${AWS::StackName}")
+
+    def test_missing_reference(self):
+        """Probar que una referencia inexistente se conserva con un aviso"""
+        with self.assertWarns(RuntimeWarning) as ctx:
+            resolved = resolve_references({"a": "${b.c}-x", "b": {}})
+        self.assertEqual(resolved["a"], "${b.c}-x")
+        self.assertIn("${b.c}", str(ctx.warning))
+
+    def test_fn_sub_variables_untouched(self):
+        """Probar que las variables de Fn::Sub se conservan sin aviso"""
+        self._write(
+            "sub.toml",
+            "[outputs]\n"
+            'bucket = "${BucketName}"\n'
+            'arn = "${MyBucket.Arn}/*"\n'
+            'mixed = "${project.name}-${ MyBucket.Arn }"\n',
+        )
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            outputs = loader.load_config("sub.toml").outputs
+
+        self.assertEqual(outputs.bucket, "${BucketName}")
+        self.assertEqual(outputs.arn, "${MyBucket.Arn}/*")
+        self.assertEqual(outputs.mixed, "proyecto-${ MyBucket.Arn }")
+
+    def test_structural_sharing(self):
+        """Probar que la entrada no se modifica y se comparte lo que no cambia"""
+        data = {"a": {"x": "${b.y}"}, "b": {"y": [1, 2]}, "c": {"z": 1}}
+
+        resolved = resolve_references(data)
+
+        self.assertEqual(resolved["a"], {"x": [1, 2]})
+        self.assertEqual(data["a"], {"x": "${b.y}"})
+        self.assertIs(resolved["c"], data["c"])
+        self.assertIs(resolve_references(data["c"]), data["c"])
+
+    def test_snapshot_keeps_environment_references(self):
+        """Probar que el snapshot resuelve ${env:...} al cargarse, no al compilar"""
+        snapshot_dir = str(self.config_dir / "snapshots")
+        loader = ConfigLoader(config_dir=str(self.config_dir))
+        loader.compile(snapshot_dir, "proyecto.toml", environments=["prod"])
+
+        with mock.patch.dict(os.environ, {"HG_TEST_OWNER": "snapshot"}):
+            ConfigLoader.clear_cache()
+            loaded = ConfigLoader.from_snapshot(
+                "proyecto.toml",
+                config_dir=str(self.config_dir),
+                environment="prod",
+                snapshot_dir=snapshot_dir,
+            )
+        self.assertEqual(loaded.get("stack.owner"), "snapshot")
+        self.assertEqual(loaded.get("stack.name"), "proyecto-eu-west-1")
+
+
+class TestConfigMerkle(unittest.TestCase):
+    """Pruebas para las huellas Merkle y la comparación entre ambientes"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        self._write(
+            "base.toml",
+            '[aws]\nregion = "us-east-1"\n\n'
+            '[project]\nname = "proyecto"\n\n'
+            '[network]\nvpc_cidr = "10.0.0.0/16"\nnat_gateways = 1\n'
+            'public_subnets = ["10.0.1.0/24"]\n',
+        )
+        self._write("proyecto.toml", '[stack]\nname = "app"\n')
+        self._write(
+            "env.prod.toml",
+            '[aws]\nregion = "eu-west-1"\n\n[network]\nnat_gateways = 3\n',
+        )
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content):
+        """Escribir un archivo dentro del directorio de configuración"""
+        with open(self.config_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _loader(self, environment):
+        """Cargar proyecto.toml para un ambiente"""
+        loader = ConfigLoader(config_dir=str(self.config_dir), environment=environment)
+        loader.load_config("proyecto.toml")
+        return loader
+
+    def test_fingerprint_ignores_key_order(self):
+        """Probar que la huella depende del contenido y no del orden"""
+        a = MerkleTree({"x": 1, "y": {"a": [1, 2], "b": "c"}})
+        b = MerkleTree({"y": {"b": "c", "a": [1, 2]}, "x": 1})
+
+        self.assertEqual(a.fingerprint(), b.fingerprint())
+        self.assertNotEqual(
+            a.fingerprint(), MerkleTree({"x": 1, "y": {"a": [2, 1]}}).fingerprint()
+        )
+        self.assertNotEqual(
+            MerkleTree({"x": 1}).fingerprint(), MerkleTree({"x": True}).fingerprint()
+        )
+
+    def test_section_fingerprint(self):
+        """Probar la huella de una sección compartida entre ambientes"""
+        dev, prod = self._loader("dev"), self._loader("prod")
+
+        self.assertEqual(dev.fingerprint("project"), prod.fingerprint("project"))
+        self.assertNotEqual(dev.fingerprint("aws"), prod.fingerprint("aws"))
+        self.assertNotEqual(dev.fingerprint(), prod.fingerprint())
+        self.assertEqual(dev.fingerprint(), self._loader("dev").fingerprint())
+        with self.assertRaises(KeyError):
+            dev.fingerprint("no.existe")
+
+    def test_diff_between_environments(self):
+        """Probar que diff devuelve solo las rutas que cambian"""
+        dev, prod = self._loader("dev"), self._loader("prod")
+
+        changes = dev.diff(prod)
+
+        self.assertEqual(
+            changes,
+            {
+                "aws.region": ("us-east-1", "eu-west-1"),
+                "network.nat_gateways": (1, 3),
+            },
+        )
+        self.assertEqual(dev.diff(dev), {})
+        self.assertEqual(dev.diff(prod.config_data), changes)
+        self.assertEqual(dev.diff(ConfigSection(prod.config_data)), changes)
+
+    def test_diff_missing_keys(self):
+        """Probar las claves que solo existen en uno de los lados"""
+        changes = diff_configs({"a": {"x": 1}}, {"a": {"y": 1}, "b": 2})
+
+        self.assertEqual(
+            changes,
+            {"a.x": (1, MISSING), "a.y": (MISSING, 1), "b": (MISSING, 2)},
+        )
+
+    def test_identical_sections_skipped(self):
+        """Probar que las secciones con el mismo hash no se recorren"""
+        shared = {f"key_{i}": {"value": i} for i in range(100)}
+        old = {"big": shared, "small": {"value": 1}}
+        new = {"big": dict(shared), "small": {"value": 2}}
+        old_tree, new_tree = MerkleTree(old), MerkleTree(new)
+
+        with mock.patch(
+            "config_merkle._same_value", wraps=config_merkle._same_value
+        ) as same_value:
+            changes = config_merkle.diff_trees(old, new, old_tree, new_tree)
+
+        self.assertEqual(changes, {"small.value": (1, 2)})
+        self.assertEqual(same_value.call_count, 1)
+
+    def test_merkle_invalidated_on_reload(self):
+        """Probar que los hashes se recalculan cuando cambia la configuración"""
+        loader = self._loader("dev")
+        before = loader.fingerprint()
+        self.assertIs(loader.merkle, loader.merkle)
+
+        self._write("proyecto.toml", '[stack]\nname = "otra"\n')
+        ConfigLoader.clear_cache()
+        loader.load_config("proyecto.toml")
+
+        self.assertNotEqual(loader.fingerprint(), before)
+
+
+class TestConfigSchema(unittest.TestCase):
+    """Pruebas para la validación con esquemas pydantic"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        from pydantic import BaseModel
+
+        class Network(BaseModel):
+            nat_gateways: int
+            cidr: str = "10.0.0.0/16"
+
+        class Project(BaseModel):
+            name: str
+
+        class Config(BaseModel):
+            project: Project
+            network: Network
+
+        self.model = Config
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        self._write("proyecto.toml", '[project]\nname = "proyecto"\n')
+        self._write("env.dev.toml", "[network]\nnat_gateways = 1\n")
+        self._write("env.qa.toml", '[network]\nnat_gateways = "dos"\n')
+        self._write(
+            "env.prod.yaml", "project:\n  name: [a]\nnetwork:\n  nat_gateways: 3\n"
+        )
+
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content):
+        """Escribir un archivo dentro del directorio de configuración"""
+        with open(self.config_dir / file_name, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def _loader(self, environment=None):
+        """Crear un loader para proyecto.toml"""
+        return ConfigLoader(
+            config_file="proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment=environment,
+        )
+
+    def test_validate_schema(self):
+        """Probar la validación de la configuración cargada"""
+        loader = self._loader("dev")
+        loader.load_config()
+
+        config = loader.validate_schema(self.model)
+
+        self.assertIsInstance(config, self.model)
+        self.assertEqual(config.network.nat_gateways, 1)
+        self.assertEqual(config.network.cidr, "10.0.0.0/16")
+
+    def test_type_error_reports_path(self):
+        """Probar que un tipo incorrecto se reporta con su ruta y ambiente"""
+        loader = self._loader("qa")
+        loader.load_config()
+
+        with self.assertRaises(ConfigValidationError) as ctx:
+            loader.validate_schema(self.model)
+
+        self.assertEqual(ctx.exception.paths, {"qa": ["network.nat_gateways"]})
+        self.assertIn("[qa] network.nat_gateways", str(ctx.exception))
+        self.assertIsInstance(ctx.exception, ValueError)
+
+    def test_strict_rejects_coercion(self):
+        """Probar que el modo estricto rechaza conversiones implícitas"""
+        self._write("env.dev.toml", '[network]\nnat_gateways = "1"\n')
+        loader = self._loader("dev")
+        loader.load_config()
+
+        self.assertEqual(loader.validate_schema(self.model).network.nat_gateways, 1)
+        with self.assertRaises(ConfigValidationError):
+            loader.validate_schema(self.model, strict=True)
+
+    def test_validate_all_environments_aggregates_errors(self):
+        """Probar que los errores de todos los ambientes se acumulan"""
+        with self.assertRaises(ConfigValidationError) as ctx:
+            self._loader().validate_all_environments(self.model)
+
+        self.assertEqual(
+            ctx.exception.paths,
+            {"qa": ["network.nat_gateways"], "prod": ["project.name"]},
+        )
+
+    def test_validate_all_environments(self):
+        """Probar la validación por lotes cuando todos los ambientes son válidos"""
+        self._write("env.qa.toml", "[network]\nnat_gateways = 2\n")
+        self._write("env.prod.yaml", "network:\n  nat_gateways: 3\n")
+
+        configs = self._loader().validate_all_environments(self.model)
+
+        self.assertEqual(set(configs), {"dev", "qa", "prod"})
+        self.assertEqual(configs["prod"].network.nat_gateways, 3)
+
+    def test_compiled_schema_is_cached(self):
+        """Probar que el validador se compila una sola vez por modelo"""
+        self.assertIs(compile_schema(self.model), compile_schema(self.model))
+
+
+class TestConfigCodegen(unittest.TestCase):
+    """Pruebas para las clases de configuración generadas"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        (self.config_dir / "base.toml").write_text(
+            "[project]\n"
+            'name = "base"\n'
+            'tags = ["a", "b"]\n'
+            "[network]\n"
+            "nat_gateways = 1\n"
+            "[network.vpc]\n"
+            'cidr = "10.0.0.0/16"\n'
+            "[labels]\n"
+            '"cost-center" = "infra"\n',
+            encoding="utf-8",
+        )
+        (self.config_dir / "proyecto.toml").write_text(
+            '[project]\nname = "proyecto"\nextra = true\n', encoding="utf-8"
+        )
+        (self.config_dir / "env.prod.toml").write_text(
+            "[network]\nnat_gateways = 3\n", encoding="utf-8"
+        )
+        self.module_path = self.config_dir / "config_types.py"
+
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        ConfigLoader.clear_cache()
+        self.temp_dir.cleanup()
+
+    def _generated_module(self):
+        """Generar e importar el módulo de clases"""
+        write_module(str(self.module_path), str(self.config_dir))
+        spec = importlib.util.spec_from_file_location("config_types", self.module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def test_generate_source(self):
+        """Probar los tipos inferidos para cada sección"""
+        source = generate_source(
+            toml.loads((self.config_dir / "base.toml").read_text(encoding="utf-8"))
+        )
+
+        self.assertIn("class NetworkVpcConfig:", source)
+        self.assertIn('    __slots__ = ("nat_gateways", "vpc")', source)
+        self.assertIn("    tags: Tuple[str, ...]", source)
+        self.assertIn("    labels: Dict[str, Any]", source)
+        self.assertLess(
+            source.index("class NetworkVpcConfig"), source.index("class NetworkConfig")
+        )
+
+    def test_materialize(self):
+        """Probar la materialización de la configuración fusionada"""
+        module = self._generated_module()
+        loader = ConfigLoader(
+            config_file="proyecto.toml",
+            config_dir=str(self.config_dir),
+            environment="prod",
+        )
+        loader.load_config()
+
+        config = loader.materialize(module.Config)
+
+        self.assertEqual(config.project.name, "proyecto")
+        self.assertEqual(config.project.tags, ("a", "b"))
+        self.assertEqual(config.network.nat_gateways, 3)
+        self.assertEqual(config.network.vpc.cidr, "10.0.0.0/16")
+        self.assertEqual(config.labels, {"cost-center": "infra"})
+        self.assertFalse(hasattr(config.network, "__dict__"))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.network.nat_gateways = 2
+        with self.assertRaises(AttributeError):
+            config.network.nat_gateway
+
+    def test_materialize_missing_key(self):
+        """Probar el error cuando falta una clave declarada"""
+        module = self._generated_module()
+        loader = ConfigLoader()
+        loader._set_config_data({"project": {"name": "x", "tags": []}})
+
+        with self.assertRaises(KeyError) as ctx:
+            loader.materialize(module.Config)
+        self.assertIn("network", str(ctx.exception))
+
+    def test_write_module_only_on_change(self):
+        """Probar que el módulo solo se reescribe si su contenido cambia"""
+        self.assertTrue(write_module(str(self.module_path), str(self.config_dir)))
+        self.assertFalse(write_module(str(self.module_path), str(self.config_dir)))
+
+    def test_cli(self):
+        """Probar la línea de comandos"""
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            self.assertEqual(main([str(self.config_dir)]), 0)
+        self.assertIn("class Config:", stdout.getvalue())
+
+        with mock.patch("sys.stderr", new_callable=io.StringIO):
+            self.assertEqual(main([str(self.config_dir / "no-existe")]), 1)
+
+
+@unittest.skipIf(mock_aws is None, "moto no está instalado")
+class TestRemoteLayers(unittest.TestCase):
+    """Pruebas para las capas remotas de S3 y SSM (contra moto)"""
+
+    BUCKET = "org-baseline"
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name) / "config"
+        self.cache_dir = Path(self.temp_dir.name) / "cache"
+        self.config_dir.mkdir()
+        (self.config_dir / "app.toml").write_text(
+            '[project]\nname = "proyecto"\n\n[tags]\nOwner = "equipo"\n',
+            encoding="utf-8",
+        )
+
+        self.environ = mock.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "AWS_DEFAULT_REGION": "us-east-1",
+            },
+        )
+        self.environ.start()
+        self.aws = mock_aws()
+        self.aws.start()
+
+        import boto3
+
+        self.s3 = boto3.client("s3")
+        self.ssm = boto3.client("ssm")
+        self.s3.create_bucket(Bucket=self.BUCKET)
+        self._put_object(
+            "baseline.toml",
+            '[tags]\nCostCenter = "plataforma"\nOwner = "org"\n\n'
+            "[network]\nnat_gateways = 2\n",
+        )
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        self.aws.stop()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+        ConfigLoader.clear_cache()
+
+    def _put_object(self, key, content):
+        """Subir una capa al bucket"""
+        self.s3.put_object(Bucket=self.BUCKET, Key=key, Body=content.encode("utf-8"))
+
+    def _cache(self):
+        """Crear un cache de capas remotas en el directorio temporal"""
+        return RemoteLayerCache(str(self.cache_dir))
+
+    def test_parse_remote_uri(self):
+        """Probar la interpretación de URIs"""
+        layer = parse_remote_uri("s3://bucket/ruta/capa.yml")
+        self.assertEqual(
+            (layer.bucket, layer.key, layer.format_type),
+            ("bucket", "ruta/capa.yml", "yaml"),
+        )
+        self.assertEqual(parse_remote_uri("ssm:/app/dev/").key, "/app/dev")
+
+        for uri in (
+            "s3://bucket",
+            "s3://bucket/capa.ini",
+            "ssm:app",
+            "https://x/y.toml",
+        ):
+            with self.assertRaises(ValueError):
+                parse_remote_uri(uri)
+
+    def test_s3_layer_merged_after_config_file(self):
+        """Probar que la capa de S3 se fusiona después del archivo de configuración"""
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir),
+            cache_dir=str(self.cache_dir),
+            remote_layers=[f"s3://{self.BUCKET}/baseline.toml"],
+        )
+        config = loader.load_config("app.toml")
+        self.assertEqual(config.project.name, "proyecto")
+        self.assertEqual(config.tags.Owner, "org")
+        self.assertEqual(config.tags.CostCenter, "plataforma")
+        self.assertEqual(config.network.nat_gateways, 2)
+
+        # Otro conjunto de capas remotas no comparte la entrada del cache
+        local = ConfigLoader(config_dir=str(self.config_dir), config_file="app.toml")
+        self.assertEqual(local.get("tags.Owner"), "equipo")
+
+    def test_s3_conditional_fetch(self):
+        """Probar que la copia local solo se reescribe si cambia el ETag"""
+        cache = self._cache()
+        uri = f"s3://{self.BUCKET}/baseline.toml"
+        first = cache.fetch(uri)
+        self.assertEqual(first.status, "fetched")
+        mtime = first.path.stat().st_mtime_ns
+
+        second = cache.fetch(uri)
+        self.assertEqual(second.status, "not_modified")
+        self.assertEqual(second.path.stat().st_mtime_ns, mtime)
+
+        self._put_object("baseline.toml", "[network]\nnat_gateways = 3\n")
+        third = cache.fetch(uri)
+        self.assertEqual(third.status, "fetched")
+        self.assertEqual(
+            toml.loads(third.path.read_text()), {"network": {"nat_gateways": 3}}
+        )
+
+        # Una copia local alterada no se da por vigente
+        third.path.write_text("[network]\nnat_gateways = 9\n")
+        self.assertEqual(cache.fetch(uri).status, "fetched")
+        self.assertEqual(cache.stats()["requests"], 4)
+
+    def test_ssm_path_layer(self):
+        """Probar la lectura paginada de una ruta de SSM"""
+        for index in range(15):
+            self.ssm.put_parameter(
+                Name=f"/org/dev/services/svc{index:02d}/port",
+                Value=str(8000 + index),
+                Type="String",
+            )
+        self.ssm.put_parameter(
+            Name="/org/dev/network/azs", Value="a,b", Type="StringList"
+        )
+        self.ssm.put_parameter(
+            Name="/org/dev/db/password", Value="s3cr3t", Type="SecureString"
+        )
+
+        cache = self._cache()
+        with self.assertWarns(RuntimeWarning) as ctx:
+            result = cache.fetch("ssm:/org/dev/")
+        data = json.loads(result.path.read_text())
+        self.assertIn("/org/dev/db/password", str(ctx.warning))
+        self.assertIn('"ssm:/org/dev/db/password"', str(ctx.warning))
+        self.assertEqual(len(data["services"]), 15)
+        self.assertEqual(data["services"]["svc14"]["port"], "8014")
+        self.assertEqual(data["network"]["azs"], ["a", "b"])
+        # Los SecureString no se escriben en disco
+        self.assertNotIn("db", data)
+        self.assertNotIn("s3cr3t", result.path.read_text())
+
+        mtime = result.path.stat().st_mtime_ns
+        self.assertEqual(cache.fetch("ssm:/org/dev").status, "not_modified")
+        self.assertEqual(result.path.stat().st_mtime_ns, mtime)
+
+        self.ssm.put_parameter(
+            Name="/org/dev/services/svc00/port",
+            Value="9000",
+            Type="String",
+            Overwrite=True,
+        )
+        with self.assertWarns(RuntimeWarning):
+            changed = cache.fetch("ssm:/org/dev")
+        self.assertEqual(changed.status, "fetched")
+        self.assertEqual(
+            json.loads(changed.path.read_text())["services"]["svc00"]["port"], "9000"
+        )
+
+    def test_ssm_conflicting_parameters(self):
+        """Probar que un parámetro que también es prefijo de otro es un error"""
+        self.ssm.put_parameter(Name="/org/qa/db", Value="x", Type="String")
+        self.ssm.put_parameter(Name="/org/qa/db/host", Value="y", Type="String")
+        with self.assertRaises(ValueError):
+            self._cache().fetch("ssm:/org/qa")
+
+    def test_fetch_all_concurrent_in_order(self):
+        """Probar la descarga en paralelo conservando el orden de las capas"""
+        self._put_object("extra.json", '{"tags": {"Owner": "extra"}}')
+        self.ssm.put_parameter(Name="/org/prod/tags/Owner", Value="ssm", Type="String")
+        uris = [
+            "ssm:/org/prod",
+            f"s3://{self.BUCKET}/baseline.toml",
+            f"s3://{self.BUCKET}/extra.json",
+            "ssm:/org/prod",
+        ]
+        results = self._cache().fetch_all(uris)
+        self.assertEqual([r.uri for r in results], uris)
+        self.assertEqual(
+            [r.format_type for r in results], ["json", "toml", "json", "json"]
+        )
+
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir),
+            cache_dir=str(self.cache_dir),
+            remote_layers=uris[:3],
+        )
+        self.assertEqual(loader.load_config("app.toml").tags.Owner, "extra")
+
+    def test_offline_fallback(self):
+        """Probar que sin acceso a AWS se usa la última copia descargada"""
+        from botocore.exceptions import EndpointConnectionError
+
+        uri = f"s3://{self.BUCKET}/baseline.toml"
+        cache = self._cache()
+        offline = EndpointConnectionError(endpoint_url="https://s3.amazonaws.com")
+        with mock.patch.object(cache._client("s3"), "get_object", side_effect=offline):
+            with self.assertRaises(ValueError):
+                cache.fetch(uri)
+
+        cache.fetch(uri)
+        with mock.patch.object(cache._client("s3"), "get_object", side_effect=offline):
+            with self.assertWarns(RuntimeWarning):
+                result = cache.fetch(uri)
+        self.assertEqual(result.status, "offline")
+        self.assertIn("CostCenter", result.path.read_text())
+
+    def test_fetch_all_offline_without_client(self):
+        """Probar que fetch_all usa la última copia si no se puede crear el cliente"""
+        from botocore.exceptions import NoRegionError
+
+        uris = [f"s3://{self.BUCKET}/baseline.toml", "ssm:/org/prod"]
+        self.ssm.put_parameter(Name="/org/prod/tags/Owner", Value="ssm", Type="String")
+        self._cache().fetch_all(uris)
+
+        for error in (NoRegionError(), ModuleNotFoundError("No module named 'boto3'")):
+            cache = RemoteLayerCache(
+                str(self.cache_dir), client_factory=mock.Mock(side_effect=error)
+            )
+            with self.assertWarns(RuntimeWarning):
+                results = cache.fetch_all(uris)
+            self.assertEqual([r.status for r in results], ["offline", "offline"])
+
+        cache = RemoteLayerCache(
+            str(Path(self.temp_dir.name) / "empty"),
+            client_factory=mock.Mock(side_effect=NoRegionError()),
+        )
+        with self.assertRaises(ValueError):
+            cache.fetch_all(uris)
+
+    def test_missing_object_is_an_error(self):
+        """Probar que un objeto inexistente no usa la copia local"""
+        uri = f"s3://{self.BUCKET}/baseline.toml"
+        cache = self._cache()
+        cache.fetch(uri)
+        self.s3.delete_object(Bucket=self.BUCKET, Key="baseline.toml")
+        with self.assertRaises(ValueError):
+            cache.fetch(uri)
+
+    def test_disk_cache_and_snapshot_reuse_remote_copy(self):
+        """Probar que los caches por firma siguen vigentes si la capa no cambia"""
+        uri = f"s3://{self.BUCKET}/baseline.toml"
+        snapshot_dir = str(Path(self.temp_dir.name) / "snapshots")
+        kwargs = {"config_dir": str(self.config_dir), "remote_layers": [uri]}
+
+        loader = ConfigLoader.from_snapshot(
+            "app.toml", snapshot_dir=snapshot_dir, **kwargs
+        )
+        fingerprint = loader.snapshot_fingerprint
+        self.assertEqual(loader.get("tags.CostCenter"), "plataforma")
+
+        ConfigLoader.clear_cache()
+        again = ConfigLoader.from_snapshot(
+            "app.toml", snapshot_dir=snapshot_dir, **kwargs
+        )
+        self.assertEqual(again.snapshot_fingerprint, fingerprint)
+
+        # Un snapshot sin la capa remota no sirve para un loader que la declara
+        ConfigLoader.from_snapshot(
+            "app.toml", snapshot_dir=snapshot_dir, config_dir=str(self.config_dir)
+        )
+        rebuilt = ConfigLoader.from_snapshot(
+            "app.toml", snapshot_dir=snapshot_dir, **kwargs
+        )
+        self.assertEqual(rebuilt.get("tags.CostCenter"), "plataforma")
+
+
+@unittest.skipIf(mock_aws is None, "moto no está instalado")
+class TestSecretResolution(unittest.TestCase):
+    """Pruebas para la resolución de parámetros y secretos (contra moto)"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+        self.environ = mock.patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "AWS_DEFAULT_REGION": "us-east-1",
+            },
+        )
+        self.environ.start()
+        self.aws = mock_aws()
+        self.aws.start()
+
+        import boto3
+
+        self.ssm = boto3.client("ssm")
+        self.secrets = boto3.client("secretsmanager")
+        self.ssm.put_parameter(Name="/prod/db/host", Value="db.interno", Type="String")
+        self.ssm.put_parameter(
+            Name="/prod/db/pass", Value="s3cr3t", Type="SecureString"
+        )
+        self.ssm.put_parameter(Name="/prod/azs", Value="a,b", Type="StringList")
+        self.secrets.create_secret(
+            Name="prod/api-key", SecretString='{"key": "abc", "id": 7}'
+        )
+        self.secrets.create_secret(Name="prod/token", SecretString="plano")
+        default_resolver().invalidate()
+        ConfigLoader.clear_cache()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        default_resolver().invalidate()
+        self.aws.stop()
+        self.environ.stop()
+        self.temp_dir.cleanup()
+        ConfigLoader.clear_cache()
+
+    def _write(self, name, content):
+        """Escribir un archivo de configuración"""
+        (self.config_dir / name).write_text(content, encoding="utf-8")
+
+    def test_parse_secret_reference(self):
+        """Probar la interpretación de referencias"""
+        self.assertEqual(
+            parse_secret_reference("ssm:/prod/db/host"),
+            SecretReference("ssm", "/prod/db/host"),
+        )
+        self.assertEqual(
+            parse_secret_reference("secretsmanager:prod/api-key#key"),
+            SecretReference("secretsmanager", "prod/api-key", "key"),
+        )
+        self.assertIsNone(parse_secret_reference("postgres://host"))
+        self.assertIsNone(parse_secret_reference(5))
+        for value in (
+            "ssm:prod",
+            "ssm:/prod/",
+            "secretsmanager:",
+            "ssm:/a b",
+            "ssm:/prod/db/host:5432",
+        ):
+            with self.assertRaises(ValueError):
+                parse_secret_reference(value)
+
+    def test_resolve_values(self):
+        """Probar la resolución de parámetros, secretos y campos JSON"""
+        data = {
+            "db": {"host": "ssm:/prod/db/host", "password": "ssm:/prod/db/pass"},
+            "azs": "ssm:/prod/azs",
+            "api": [
+                "secretsmanager:prod/api-key#key",
+                "secretsmanager:prod/api-key#id",
+            ],
+            "token": "secretsmanager:prod/token",
+            "static": {"name": "proyecto"},
+        }
+        resolver = SecretResolver()
+        resolved = resolver.resolve(data)
+        self.assertEqual(resolved["db"], {"host": "db.interno", "password": "s3cr3t"})
+        self.assertEqual(resolved["azs"], ["a", "b"])
+        self.assertEqual(resolved["api"], ["abc", 7])
+        self.assertEqual(resolved["token"], "plano")
+        # La entrada no se modifica y las secciones sin referencias se comparten
+        self.assertEqual(data["db"]["host"], "ssm:/prod/db/host")
+        self.assertIs(resolved["static"], data["static"])
+
+        # Tres parámetros en un lote y una llamada por secreto
+        stats = resolver.stats()
+        self.assertEqual((stats["GetParameters"], stats["GetSecretValue"]), (1, 2))
+
+    def test_batches_of_ten_and_deduplication(self):
+        """Probar que los parámetros se piden una vez, en lotes de diez"""
+        for index in range(23):
+            self.ssm.put_parameter(
+                Name=f"/prod/p{index}", Value=str(index), Type="String"
+            )
+        data = {f"k{i}": f"ssm:/prod/p{i % 23}" for i in range(60)}
+
+        resolver = SecretResolver()
+        resolved = resolver.resolve(data)
+        self.assertEqual(resolved["k59"], str(59 % 23))
+        self.assertEqual(resolver.stats()["GetParameters"], 3)
+
+        # Los valores vigentes en el cache no se vuelven a pedir
+        resolver.resolve(data)
+        self.assertEqual(resolver.stats()["GetParameters"], 3)
+
+    def test_ttl_and_lru(self):
+        """Probar la caducidad y el límite de entradas del cache"""
+        now = [0.0]
+        resolver = SecretResolver(ttl=60, max_entries=2, clock=lambda: now[0])
+        data = {"host": "ssm:/prod/db/host"}
+        resolver.resolve(data)
+        self.ssm.put_parameter(
+            Name="/prod/db/host", Value="db.nuevo", Type="String", Overwrite=True
+        )
+        self.assertEqual(resolver.resolve(data)["host"], "db.interno")
+
+        now[0] = 61.0
+        self.assertEqual(resolver.resolve(data)["host"], "db.nuevo")
+        self.assertEqual(resolver.stats()["expired"], 1)
+
+        resolver.resolve({"a": "ssm:/prod/azs", "b": "secretsmanager:prod/token"})
+        stats = resolver.stats()
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 1))
+
+    def test_errors(self):
+        """Probar los errores de referencias inexistentes"""
+        resolver = SecretResolver()
+        with self.assertRaises(ValueError) as error:
+            resolver.resolve({"a": "ssm:/prod/no-existe", "b": "ssm:/prod/db/host"})
+        self.assertIn("/prod/no-existe", str(error.exception))
+        with self.assertRaises(ValueError):
+            resolver.resolve({"a": "secretsmanager:prod/no-existe"})
+        with self.assertRaises(ValueError):
+            resolver.resolve({"a": "secretsmanager:prod/api-key#falta"})
+        with self.assertRaises(ValueError):
+            resolver.resolve({"a": "secretsmanager:prod/token#campo"})
+
+    def test_loader_resolves_after_caches(self):
+        """Probar que ConfigLoader resuelve sin guardar los valores en disco"""
+        self._write(
+            "app.toml",
+            '[database]\nhost = "ssm:/prod/db/host"\npassword = "ssm:/prod/db/pass"\n'
+            'primary = "${database.host}"\n',
+        )
+        cache_dir = self.config_dir / "cache"
+        loader = ConfigLoader(
+            config_dir=str(self.config_dir),
+            cache_dir=str(cache_dir),
+            resolve_secrets=True,
+        )
+        config = loader.load_config("app.toml")
+        self.assertEqual(config.database.password, "s3cr3t")
+        self.assertEqual(config.database.host, "db.interno")
+        # Una referencia ${...} a una referencia de SSM también se resuelve
+        self.assertEqual(config.database.primary, "db.interno")
+
+        for file_path in cache_dir.rglob("*"):
+            if file_path.is_file():
+                self.assertNotIn("s3cr3t", file_path.read_text())
+
+        # Sin resolve_secrets se conservan las referencias
+        plain = ConfigLoader(config_dir=str(self.config_dir), config_file="app.toml")
+        self.assertEqual(plain.get("database.password"), "ssm:/prod/db/pass")
+
+    def test_load_all_environments_single_batch(self):
+        """Probar que los ambientes comparten una sola consulta"""
+        self._write("app.toml", '[database]\nhost = "ssm:/prod/db/host"\n')
+        self._write("env.dev.toml", '[database]\npassword = "ssm:/prod/db/pass"\n')
+        self._write("env.prod.toml", '[database]\npassword = "ssm:/prod/db/pass"\n')
+        loader = ConfigLoader(config_dir=str(self.config_dir), resolve_secrets=True)
+        configs = loader.load_all_environments("app.toml")
+        self.assertEqual(configs["dev"].database.password, "s3cr3t")
+        self.assertEqual(configs["prod"].database.host, "db.interno")
+        self.assertEqual(default_resolver().stats()["GetParameters"], 1)
+
+
+class TestImportTime(unittest.TestCase):
+    """Prueba de regresión del tiempo de importación del paquete"""
+
+    # Presupuesto de importación de hg_aws_helpers + ConfigLoader en
+    # microsegundos; el tiempo de reloj depende de la máquina, por lo que el
+    # valor por defecto es holgado y la variable solo sirve para ajustarlo
+    # (ej: en una máquina de referencia)
+    DEFAULT_BUDGET_US = 500_000
+    BUDGET_ENV_VAR = "HG_AWS_HELPERS_IMPORT_BUDGET_US"
+
+    # Módulos que no deben cargarse al importar el paquete y acceder a ConfigLoader
+    DEFERRED_MODULES = {
+        "toml",
+        "tomllib",
+        "yaml",
+        "orjson",
+        "hashlib",
+        "tempfile",
+        "dataclasses",
+        "concurrent.futures",
+        "pydantic",
+        "boto3",
+        "botocore",
+    }
+
+    # Importa el paquete y accede a ConfigLoader midiendo el tiempo total
+    CODE = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        "import hg_aws_helpers\n"
+        "hg_aws_helpers.ConfigLoader\n"
+        "print(int((time.perf_counter() - start) * 1_000_000))\n"
+    )
+
+    def _importtime(self, code, pycache_dir):
+        """
+        Ejecutar código con -X importtime
+
+        Returns:
+            Tupla (salida estándar, módulos importados después de site)
+        """
+        env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-X",
+                f"pycache_prefix={pycache_dir}",
+                "-c",
+                code,
+            ],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        modules = set()
+        after_site = False
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            name = line.rsplit("|", 1)[1]
+            if name.strip() == "site" and not name.startswith("  "):
+                after_site = True
+            elif after_site:
+                modules.add(name.strip())
+        return result.stdout, modules
+
+    def test_config_loader_defers_parsers(self):
+        """Probar que acceder a ConfigLoader no carga parsers ni módulos pesados"""
+        with TemporaryDirectory() as pycache_dir:
+            # Primera ejecución para generar los .pyc
+            self._importtime(self.CODE, pycache_dir)
+            _, modules = self._importtime(self.CODE, pycache_dir)
+
+        self.assertIn("hg_aws_helpers.config_backends", modules)
+        self.assertFalse(modules & self.DEFERRED_MODULES, modules)
+
+    def test_import_time_budget(self):
+        """Probar que importar el paquete y ConfigLoader cabe en el presupuesto"""
+        budget = self.DEFAULT_BUDGET_US
+        if os.environ.get(self.BUDGET_ENV_VAR):
+            budget = min(budget, int(os.environ[self.BUDGET_ENV_VAR]))
+
+        with TemporaryDirectory() as pycache_dir:
+            # Primera ejecución para generar los .pyc
+            self._importtime(self.CODE, pycache_dir)
+            stdout, modules = self._importtime(self.CODE, pycache_dir)
+
+        self.assertFalse(modules & self.DEFERRED_MODULES, modules)
+        self.assertLess(int(stdout), budget)
+
+    def test_package_import_is_lazy(self):
+        """Probar que importar el paquete no carga los módulos de configuración"""
+        with TemporaryDirectory() as pycache_dir:
+            _, modules = self._importtime("import hg_aws_helpers", pycache_dir)
+
+        self.assertEqual(modules, {"hg_aws_helpers"})
+
+
+class TestConfigWatcher(unittest.TestCase):
+    """Pruebas para el modo watch de ConfigLoader"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+
+        self._write("base.toml", '[aws]\nregion = "us-east-1"\n')
+        self._write(
+            "proyecto.toml",
+            '[project]\nname = "proyecto"\n\n'
+            "[network]\nnat_gateways = 1\n\n"
+            "[environments.dev.compute]\nmin_capacity = 1\n",
+        )
+
+        ConfigLoader._cache.clear()
+        self.loader = ConfigLoader(config_dir=str(self.config_dir), environment="dev")
+        self.loader.load_config("proyecto.toml")
+        self.watcher = ConfigWatcher(self.loader)
+        self.events = []
+        self.watcher.subscribe(self.events.append)
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        self.watcher.stop()
+        ConfigLoader._cache.clear()
+        self.temp_dir.cleanup()
+
+    def _write(self, file_name, content, mtime_ns=None):
+        """Escribir una capa forzando un mtime distinto"""
+        file_path = self.config_dir / file_name
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(file_path, ns=(mtime_ns, mtime_ns))
+
+    def test_poll_without_changes(self):
+        """Probar que un sondeo sin cambios no notifica ni re-parsea"""
+        with mock.patch.object(
+            ConfigLoader, "_load_by_format", side_effect=AssertionError("parse")
+        ):
+            self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.events, [])
+
+    def test_changed_layer_reports_paths(self):
+        """Probar que solo se re-parsea la capa modificada y se reportan sus rutas"""
+        self._write("base.toml", '[aws]\nregion = "eu-west-1"\n', mtime_ns=10**9)
+
+        with mock.patch.object(
+            ConfigLoader,
+            "_load_by_format",
+            autospec=True,
+            side_effect=ConfigLoader._load_by_format,
+        ) as load:
+            event = self.watcher.poll()
+
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(event.changed_paths, ["aws.region"])
+        self.assertEqual(event.changed_layers, ["base"])
+        self.assertEqual(self.events, [event])
+        self.assertEqual(self.loader.get("aws.region"), "eu-west-1")
+        self.assertEqual(self.loader.get("compute.min_capacity"), 1)
+
+    def test_invalid_layer_keeps_last_good_config(self):
+        """Probar que un archivo inválido no detiene el sondeo ni cambia la config"""
+        self._write("base.toml", "[aws\nregion = ", mtime_ns=10**9)
+        with self.assertRaises(ValueError):
+            self.watcher.poll()
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.loader.get("aws.region"), "us-east-1")
+
+        self._write("base.toml", '[aws]\nregion = "eu-west-1"\n', mtime_ns=2 * 10**9)
+        event = self.watcher.poll()
+
+        self.assertEqual(event.changed_paths, ["aws.region"])
+        self.assertEqual(self.events, [event])
+        self.assertEqual(self.loader.get("aws.region"), "eu-west-1")
+
+    def test_background_thread_survives_errors(self):
+        """Probar que el hilo de sondeo reporta errores y sigue publicando cambios"""
+        errors = []
+        self.watcher.on_error = errors.append
+        self.watcher.interval = 0.01
+
+        def failing_subscriber(event):
+            raise RuntimeError("suscriptor")
+
+        self.watcher.subscribe(failing_subscriber)
+        self._write("base.toml", "[aws\nregion = ", mtime_ns=10**9)
+        self.watcher.start()
+        deadline = time.monotonic() + 5
+        while not errors and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsInstance(errors[0], ValueError)
+
+        self._write("base.toml", '[aws]\nregion = "eu-west-1"\n', mtime_ns=2 * 10**9)
+        while not self.events and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.watcher.stop()
+
+        self.assertEqual(self.events[0].changed_paths, ["aws.region"])
+        self.assertTrue(any(isinstance(e, RuntimeError) for e in errors))
+        self.assertEqual(self.loader.get("aws.region"), "eu-west-1")
+
+    def test_incremental_merge_matches_full_load(self):
+        """Probar que la re-fusión incremental coincide con una carga completa"""
+        self._write(
+            "proyecto.toml",
+            '[project]\nname = "proyecto"\n\n'
+            "[network]\nnat_gateways = 1\n\n"
+            "[environments.dev.compute]\nmin_capacity = 2\n",
+            mtime_ns=10**9,
+        )
+        self._write("env.dev.toml", "[network]\nnat_gateways = 3\n")
+
+        event = self.watcher.poll()
+        self.assertEqual(
+            event.changed_paths,
+            [
+                "compute.min_capacity",
+                "environments.dev.compute.min_capacity",
+                "network.nat_gateways",
+            ],
+        )
+        self.assertEqual(event.changed_layers, ["config", "environment"])
+
+        expected = ConfigLoader(config_dir=str(self.config_dir), environment="dev")
+        ConfigLoader._cache.clear()
+        expected.load_config("proyecto.toml")
+        self.assertEqual(self.loader.config_data, expected.config_data)
+
+    def test_reference_change_reports_dependent_paths(self):
+        """Probar que cambiar un valor referenciado notifica a quien lo usa"""
+        self._write(
+            "proyecto.toml",
+            '[project]\nname = "proyecto"\n\n'
+            '[network]\nnat_gateways = 1\nname = "${project.name}-vpc"\n',
+            mtime_ns=10**9,
+        )
+        self.watcher.poll()
+        self._write(
+            "proyecto.toml",
+            '[project]\nname = "otro"\n\n'
+            '[network]\nnat_gateways = 1\nname = "${project.name}-vpc"\n',
+            mtime_ns=2 * 10**9,
+        )
+
+        event = self.watcher.poll()
+        self.assertEqual(event.changed_paths, ["network.name", "project.name"])
+        self.assertEqual(self.loader.get("network.name"), "otro-vpc")
+
+    def test_rewrite_without_changes_does_not_notify(self):
+        """Probar que reescribir una capa con el mismo contenido no notifica"""
+        self._write("base.toml", '[aws]\nregion = "us-east-1"\n', mtime_ns=10**9)
+        self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.events, [])
+
+    def test_new_fragment_detected(self):
+        """Probar que la aparición de un fragmento en config.d/ se detecta"""
+        (self.config_dir / "config.d").mkdir()
+        self._write("config.d/10-aws.toml", '[aws]\naccount_id = "123"\n')
+
+        event = self.watcher.poll()
+        self.assertEqual(event.changed_paths, ["aws.account_id"])
+        self.assertEqual(event.changed_layers, ["config.d/10-aws.toml"])
+
+    def test_loader_watch_starts_thread(self):
+        """Probar que ConfigLoader.watch() reutiliza el observador y lo inicia"""
+        watcher = self.loader.watch(self.events.append, interval=0.01)
+        try:
+            self.assertIs(self.loader.watch(self.events.append), watcher)
+            self._write("base.toml", '[aws]\nregion = "sa-east-1"\n', 10**9)
+            for _ in range(500):
+                if self.events:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(self.events[0].changed_paths, ["aws.region"])
+        finally:
+            watcher.stop()
+
+
+class TestConfigBackends(unittest.TestCase):
+    """Pruebas para el registro de backends de parseo y serialización"""
+
+    DATA = {
+        "project": {"name": "proyecto-ñ", "tags": {"Owner": "DevOps"}},
+        "network": {
+            "vpc_cidr": "10.0.0.0/16",
+            "nat_gateways": 2,
+            "public_subnets": ["10.0.1.0/24", "10.0.2.0/24"],
+            "ratio": 0.5,
+            "enabled": True,
+        },
+        "storage": {"lifecycle_rules": [{"prefix": "logs/", "days": 30}]},
+    }
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        config_backends.unpin_backend()
+
+    def test_readers_produce_identical_results(self):
+        """Probar que todos los backends de lectura coinciden con la referencia"""
+        for format_type in ("toml", "json", "yaml"):
+            content = config_backends.dumps(format_type, self.DATA)
+            names = config_backends.available_backends(format_type)
+            self.assertIn(names[-1], ("toml", "json", "pyyaml"))
+
+            for name in names:
+                config_backends.pin_backend(format_type, name, config_backends.READ)
+                self.assertEqual(
+                    config_backends.loads(format_type, content),
+                    self.DATA,
+                    f"{format_type}/{name}",
+                )
+
+    def test_writers_produce_identical_output(self):
+        """Probar que los backends automáticos de escritura coinciden"""
+        for format_type in ("toml", "json", "yaml"):
+            outputs = set()
+            for name in config_backends.available_backends(
+                format_type, config_backends.WRITE
+            ):
+                if name == "orjson":
+                    continue
+                config_backends.pin_backend(format_type, name, config_backends.WRITE)
+                outputs.add(config_backends.dumps(format_type, self.DATA))
+            self.assertEqual(len(outputs), 1, format_type)
+
+    @unittest.skipUnless(
+        "libyaml" in config_backends.available_backends("yaml", config_backends.WRITE),
+        "PyYAML sin libyaml",
+    )
+    def test_libyaml_writer_is_safe(self):
+        """Probar que libyaml no emite etiquetas de Python para objetos arbitrarios"""
+        config_backends.pin_backend("yaml", "libyaml", config_backends.WRITE)
+        with self.assertRaises(yaml.representer.RepresenterError):
+            config_backends.dumps("yaml", {"value": object()})
+
+    def test_fallback_to_reference_parser(self):
+        """Probar que el contenido rechazado por un backend rápido usa la referencia"""
+        self.assertEqual(config_backends.loads("json", '{"a": 1e400}'), {"a": 1e400})
+
+    def test_pin_backend(self):
+        """Probar que se puede fijar un backend concreto"""
+        config_backends.pin_backend("json", "json")
+        self.assertEqual(config_backends.get_backend("json").name, "json")
+
+        config_backends.unpin_backend("json")
+        self.assertEqual(
+            config_backends.get_backend("json").name,
+            config_backends.available_backends("json")[0],
+        )
+
+        with self.assertRaises(ValueError):
+            config_backends.pin_backend("json", "inexistente")
+        with self.assertRaises(ValueError):
+            config_backends.loads("ini", "")
+
+
+class TestConfigConverter(unittest.TestCase):
+    """Pruebas para la clase ConfigConverter"""
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = Path(self.temp_dir.name)
+
+        # Crear archivos de prueba
+        self._create_test_files()
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        self.temp_dir.cleanup()
+
+    def _create_test_files(self):
+        """Crear archivos de prueba"""
+        # Archivo proyecto-test.toml
+        project_toml = """
+[project]
+name = "proyecto-test"
+tags = { Owner = "DevOps", Environment = "Development" }
+
+[aws]
+region = "us-east-1"
+account_id = "123456789012"
+"""
+
+        with open(self.config_dir / "proyecto-test.toml", "w", encoding="utf-8") as f:
+            f.write(project_toml)
+
+        # Archivo cdk.json
+        cdk_json = """{
+  "app": "npx ts-node --prefer-ts-exts bin/my-cdk-app.ts",
+  "context": {
+    "@aws-cdk/core:enableStackNameDuplicates": "true",
+    "aws-cdk:enableDiffNoFail": "true"
+  }
+}"""
+
+        with open(self.config_dir / "cdk.json", "w", encoding="utf-8") as f:
+            f.write(cdk_json)
+
+    def test_convert_toml_to_json(self):
+        """Probar conversión de TOML a JSON"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        json_file = converter.convert_file(
+            input_file=str(self.config_dir / "proyecto-test.toml"), output_format="json"
+        )
+
+        # Verificar que el archivo existe
+        self.assertTrue(Path(json_file).exists())
+
+        # Verificar contenido
+        with open(json_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.assertEqual(data["project"]["name"], "proyecto-test")
+        self.assertEqual(data["aws"]["region"], "us-east-1")
+
+    def test_convert_toml_to_yaml(self):
+        """Probar conversión de TOML a YAML"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        yaml_file = converter.convert_file(
+            input_file=str(self.config_dir / "proyecto-test.toml"), output_format="yaml"
+        )
+
+        # Verificar que el archivo existe
+        self.assertTrue(Path(yaml_file).exists())
+
+        # Verificar contenido
+        with open(yaml_file, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+
+        self.assertEqual(data["project"]["name"], "proyecto-test")
+        self.assertEqual(data["aws"]["region"], "us-east-1")
+
+    def test_import_cdk_context(self):
+        """Probar importación de CDK context"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        toml_file = converter.import_cdk_context(
+            cdk_json_path=str(self.config_dir / "cdk.json"), output_format="toml"
+        )
+
+        # Verificar que el archivo existe
+        self.assertTrue(Path(toml_file).exists())
+
+        # Verificar contenido
+        with open(toml_file, "r", encoding="utf-8") as f:
+            data = toml.load(f)
+
+        self.assertEqual(data["@aws-cdk/core:enableStackNameDuplicates"], "true")
+        self.assertEqual(data["aws-cdk:enableDiffNoFail"], "true")
+
+    def test_export_to_cdk_context(self):
+        """Probar exportación a CDK context"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        cdk_file = converter.export_to_cdk_context(
+            config_file=str(self.config_dir / "proyecto-test.toml"),
+            cdk_json_path=str(self.config_dir / "cdk.json"),
+        )
+
+        # Verificar que el archivo existe
+        self.assertTrue(Path(cdk_file).exists())
+        self.assertTrue(cdk_file.changed)
+
+        # Verificar contenido
+        with open(cdk_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.assertEqual(data["context"]["project"]["name"], "proyecto-test")
+        self.assertEqual(data["context"]["aws"]["region"], "us-east-1")
+        self.assertEqual(
+            data["context"]["@aws-cdk/core:enableStackNameDuplicates"], "true"
+        )
+
+    def test_export_to_cdk_context_change_summary(self):
+        """Probar el resumen de cambios y que sin cambios no se reescribe"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+        cdk_path = self.config_dir / "cdk.json"
+        config_file = str(self.config_dir / "proyecto-test.toml")
+
+        result = converter.export_to_cdk_context(config_file, str(cdk_path))
+        self.assertTrue(result.changed)
+        self.assertEqual(result.added, ["project", "aws"])
+        self.assertEqual(result.updated, [])
+        self.assertEqual(str(result), str(cdk_path))
+
+        with mock.patch.object(config_converter, "write_atomic") as write:
+            result = converter.export_to_cdk_context(config_file, str(cdk_path))
+        write.assert_not_called()
+        self.assertFalse(result.changed)
+        self.assertEqual((result.added, result.updated), ([], []))
+
+        (self.config_dir / "proyecto-test.toml").write_text(
+            '[aws]\nregion = "eu-west-1"\n', encoding="utf-8"
+        )
+        result = converter.export_to_cdk_context(config_file, str(cdk_path))
+        self.assertEqual(result.updated, ["aws.region"])
+
+    def test_export_to_cdk_context_ignores_merge_strategies(self):
+        """Probar que exportar dos veces con 'append' no duplica las listas"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+        cdk_path = self.config_dir / "cdk.json"
+        config_file = self.config_dir / "rules.toml"
+        config_file.write_text(
+            '[merge_strategies]\n"network.allowlist" = "append"\n\n'
+            '[network]\nallowlist = ["10.0.0.0/8"]\n',
+            encoding="utf-8",
+        )
+
+        converter.export_to_cdk_context(str(config_file), str(cdk_path))
+        result = converter.export_to_cdk_context(str(config_file), str(cdk_path))
+
+        self.assertFalse(result.changed)
+        with open(cdk_path, "r", encoding="utf-8") as f:
+            context = json.load(f)["context"]
+        self.assertEqual(context["network"]["allowlist"], ["10.0.0.0/8"])
+
+    def test_export_to_cdk_context_type_changes(self):
+        """Probar que un cambio de tipo con el mismo valor cuenta como modificación"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+        cdk_path = self.config_dir / "cdk.json"
+        cdk_path.write_text(
+            json.dumps({"context": {"flags": {"a": 1, "b": 1, "c": 1}}}),
+            encoding="utf-8",
+        )
+        config_file = self.config_dir / "flags.toml"
+        config_file.write_text("[flags]\na = true\nb = 1.0\nc = 1\n", encoding="utf-8")
+
+        result = converter.export_to_cdk_context(str(config_file), str(cdk_path))
+
+        self.assertTrue(result.changed)
+        self.assertEqual(result.updated, ["flags.a", "flags.b"])
+        with open(cdk_path, "r", encoding="utf-8") as f:
+            self.assertIs(json.load(f)["context"]["flags"]["a"], True)
+
+    def test_export_to_cdk_context_concurrent(self):
+        """Probar que exportaciones concurrentes no pierden cambios"""
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+        cdk_path = self.config_dir / "cdk.json"
+        environments = [f"env{i}" for i in range(8)]
+        for environment in environments:
+            (self.config_dir / f"{environment}.toml").write_text(
+                f"[{environment}]\nenabled = true\n", encoding="utf-8"
+            )
+
+        threads = [
+            threading.Thread(
+                target=converter.export_to_cdk_context,
+                args=(str(self.config_dir / f"{env}.toml"), str(cdk_path)),
+            )
+            for env in environments
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with open(cdk_path, "r", encoding="utf-8") as f:
+            context = json.load(f)["context"]
+        self.assertTrue(all(context[env]["enabled"] for env in environments))
+
+    def _mirror_sources(self, count):
+        """Crear un directorio de origen con archivos TOML numerados"""
+        src = self.config_dir / "src"
+        (src / "sub").mkdir(parents=True)
+        for i in range(count):
+            folder = src / "sub" if i % 2 else src
+            (folder / f"config-{i}.toml").write_text(
+                f'[project]\nname = "p{i}"\n', encoding="utf-8"
+            )
+        return src
+
+    def test_convert_directory(self):
+        """Probar la conversión de un directorio conservando subdirectorios"""
+        src = self._mirror_sources(3)
+        out = self.config_dir / "out"
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        result = converter.convert_directory(
+            str(src), "json", pattern="**/*.toml", output_dir=str(out)
+        )
+
+        self.assertEqual(len(result.converted), 3)
+        self.assertEqual(result.skipped, [])
+        with open(out / "sub" / "config-1.json", "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"project": {"name": "p1"}})
+
+    def test_source_change_during_conversion_is_reconverted(self):
+        """Probar que el manifiesto firma los bytes convertidos y no los actuales"""
+        src = self._mirror_sources(1)
+        source = src / "config-0.toml"
+        out = self.config_dir / "out"
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+        loads = config_backends.loads
+
+        def edit_after_read(format_type, content):
+            # Mismo tamaño: solo el hash de los bytes leídos detecta el cambio
+            source.write_text('[project]\nname = "p9"\n', encoding="utf-8")
+            return loads(format_type, content)
+
+        with mock.patch.object(config_backends, "loads", side_effect=edit_after_read):
+            converter.convert_directory(str(src), "json", output_dir=str(out))
+
+        result = converter.convert_directory(str(src), "json", output_dir=str(out))
+
+        self.assertEqual(len(result.converted), 1)
+        with open(out / "config-0.json", "r", encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["project"]["name"], "p9")
+
+    def test_convert_directory_is_incremental(self):
+        """Probar que solo se reconvierten los archivos modificados"""
+        src = self._mirror_sources(3)
+        out = self.config_dir / "out"
+        converter = ConfigConverter(config_dir=str(self.config_dir))
+
+        def convert():
+            return converter.convert_directory(
+                str(src), "yaml", pattern="**/*.toml", output_dir=str(out)
+            )
+
+        convert()
+
+        with mock.patch.object(
+            config_converter, "_convert_one", side_effect=config_converter._convert_one
+        ) as convert_one:
+            result = convert()
+            self.assertEqual(convert_one.call_count, 0)
+            self.assertEqual(len(result.skipped), 3)
+
+            (src / "config-0.toml").write_text(
+                '[project]\nname = "nuevo"\n', encoding="utf-8"
+            )
+            (out / "sub" / "config-1.yaml").unlink()
+            result = convert()
+
+        self.assertEqual(convert_one.call_count, 2)
+        self.assertEqual(
+            sorted(Path(p).name for p in result.converted),
+            ["config-0.yaml", "config-1.yaml"],
+        )
+        with open(out / "config-0.yaml", "r", encoding="utf-8") as f:
+            self.assertEqual(yaml.safe_load(f)["project"]["name"], "nuevo")
+
+    def test_convert_directory_in_process_pool(self):
+        """Probar la conversión en paralelo de muchos archivos"""
+        count = config_converter.PARALLEL_THRESHOLD + 2
+        src = self._mirror_sources(count)
+        converter = ConfigConverter(config_dir=str(self.config_dir / "out"))
+
+        result = converter.convert_directory(
+            str(src), "json", pattern="**/*.toml", max_workers=2
+        )
+
+        self.assertEqual(len(result.converted), count)
+        self.assertTrue(all(Path(p).exists() for p in result.converted))
+
+    def test_convert_directory_reports_errors(self):
+        """Probar que los errores se acumulan sin perder las conversiones válidas"""
+        src = self._mirror_sources(2)
+        (src / "roto.toml").write_text("[project\n", encoding="utf-8")
+        out = self.config_dir / "out"
+        converter = ConfigConverter(config_dir=str(out))
+
+        with self.assertRaises(ValueError) as ctx:
+            converter.convert_directory(str(src), "json", pattern="**/*.toml")
+        self.assertIn("roto.toml", str(ctx.exception))
+
+        (src / "roto.toml").unlink()
+        result = converter.convert_directory(str(src), "json", pattern="**/*.toml")
+        self.assertEqual(result.converted, [])
+        self.assertEqual(len(result.skipped), 2)
+
+
+class TestCdkContextStore(unittest.TestCase):
+    """Pruebas para el almacén de lookups de contexto de CDK"""
+
+    AZ_KEY = "availability-zones:account=111111111111:region=us-east-1"
+    AMI_KEY = (
+        "ami:account=111111111111:filters.name.0=al2023-ami-*:x86_64"
+        ":region=us-east-1"
+    )
+    VPC_KEY = "vpc-provider:account=222222222222:filter.vpc-id=vpc-1:region=eu-west-1"
+
+    def setUp(self):
+        """Configuración inicial para las pruebas"""
+        self.temp_dir = TemporaryDirectory()
+        self.store_dir = Path(self.temp_dir.name) / "context"
+        self.now = 1_000_000.0
+        self.store = CdkContextStore(
+            str(self.store_dir), max_age=3600, clock=lambda: self.now
+        )
+        self.cdk_context = {
+            self.AZ_KEY: ["us-east-1a", "us-east-1b", "us-east-1c"],
+            self.AMI_KEY: "ami-0123456789",
+            self.VPC_KEY: {"vpcId": "vpc-1", "availabilityZones": []},
+            "hosted-zone:account=111111111111:domainName=example.com"
+            ":region=us-east-1": {"$dontSaveContext": True, "$providerError": "x"},
+            "@aws-cdk/core:newStyleStackSynthesis": True,
+        }
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        self.temp_dir.cleanup()
+
+    def test_parse_context_key(self):
+        """Probar el análisis de claves de contexto de CDK"""
+        provider, params = parse_context_key(self.AMI_KEY)
+        self.assertEqual(provider, "ami")
+        self.assertEqual(params["filters.name.0"], "al2023-ami-*:x86_64")
+        self.assertEqual(params["region"], "us-east-1")
+        self.assertIsNone(parse_context_key("@aws-cdk/core:newStyleStackSynthesis"))
+
+    def test_record_and_replay(self):
+        """Probar que solo se registran lookups válidos y se reproducen filtrados"""
+        changed = self.store.record("dev", self.cdk_context)
+
+        self.assertEqual(set(changed), {self.AZ_KEY, self.AMI_KEY, self.VPC_KEY})
+        self.assertEqual(
+            set(self.store.context("dev", region="us-east-1")),
+            {self.AZ_KEY, self.AMI_KEY},
+        )
+        self.assertEqual(
+            self.store.availability_zones("dev", "111111111111", "us-east-1"),
+            ["us-east-1a", "us-east-1b", "us-east-1c"],
+        )
+        self.assertEqual(self.store.record("dev", self.cdk_context), [])
+
+    def test_unchanged_value_keeps_recorded_at(self):
+        """Probar que registrar el mismo valor no reescribe el shard"""
+        self.store.record("dev", self.cdk_context)
+        shard = self.store.shard_path("dev")
+        content = shard.read_bytes()
+        self.now += 600
+
+        self.assertEqual(self.store.record("dev", self.cdk_context), [])
+        self.assertEqual(shard.read_bytes(), content)
+
+        changed = self.store.record("dev", {self.AMI_KEY: "ami-2"})
+        with open(shard, "r", encoding="utf-8") as f:
+            entries = json.load(f)["entries"]
+        self.assertEqual(changed, [self.AMI_KEY])
+        self.assertEqual(entries[self.AMI_KEY]["recorded_at"], self.now)
+        self.assertEqual(entries[self.AZ_KEY]["recorded_at"], self.now - 600)
+
+    def test_record_refreshes_verified_at(self):
+        """Probar que volver a registrar un valor evita que prune lo elimine"""
+        day = 24 * 3600
+        store = CdkContextStore(
+            str(self.store_dir), max_age=30 * day, clock=lambda: self.now
+        )
+        start = self.now
+        store.record("dev", self.cdk_context)
+        shard = store.shard_path("dev")
+
+        self.now += 40 * day
+        self.assertEqual(store.record("dev", self.cdk_context), [])
+        content = shard.read_bytes()
+        self.now += 3600
+        store.record("dev", self.cdk_context)
+        self.assertEqual(shard.read_bytes(), content)
+
+        self.assertEqual(store.prune(), 0)
+        with open(shard, "r", encoding="utf-8") as f:
+            entry = json.load(f)["entries"][self.AZ_KEY]
+        self.assertEqual(entry["recorded_at"], start)
+        self.assertEqual(entry["verified_at"], start + 40 * day)
+
+    def test_shards_per_environment(self):
+        """Probar que cada ambiente tiene su propio archivo"""
+        self.store.record("dev", {self.AZ_KEY: ["us-east-1a"]})
+        self.store.record("PROD", {self.AZ_KEY: ["us-east-1b"]})
+
+        self.assertTrue(self.store.shard_path("dev").exists())
+        self.assertEqual(self.store.shard_path("PROD").name, "prod.json")
+        self.assertEqual(self.store.context("prod"), {self.AZ_KEY: ["us-east-1b"]})
+        self.assertEqual(self.store.context("staging"), {})
+
+    def test_stale_entries(self):
+        """Probar que las entradas caducadas se avisan y prune las elimina"""
+        self.store.record("dev", {self.AZ_KEY: ["us-east-1a"]})
+        self.now += 1800
+        self.store.record("dev", {self.AMI_KEY: "ami-1"})
+        self.now += 1801
+
+        with self.assertWarns(RuntimeWarning) as ctx:
+            context = self.store.context("dev")
+        self.assertEqual(context, {self.AZ_KEY: ["us-east-1a"], self.AMI_KEY: "ami-1"})
+        self.assertIn(self.AZ_KEY, str(ctx.warning))
+        self.assertNotIn(self.AMI_KEY, str(ctx.warning))
+
+        self.store.record("dev", {self.AMI_KEY: "ami-1"})
+        self.assertEqual(len(CdkContextStore(str(self.store_dir)).context("dev")), 2)
+        self.assertEqual(self.store.prune(), 1)
+        with open(self.store.shard_path("dev"), "r", encoding="utf-8") as f:
+            self.assertEqual(list(json.load(f)["entries"]), [self.AMI_KEY])
+
+    def test_record_cdk_context_file(self):
+        """Probar el registro desde cdk.context.json a través de ConfigConverter"""
+        config_dir = Path(self.temp_dir.name) / "config"
+        cdk_context_path = Path(self.temp_dir.name) / "cdk.context.json"
+        cdk_context_path.write_text(json.dumps(self.cdk_context), encoding="utf-8")
+        converter = ConfigConverter(config_dir=str(config_dir))
+
+        changed = converter.record_cdk_context("dev", str(cdk_context_path))
+
+        self.assertEqual(len(changed), 3)
+        self.assertTrue((config_dir / "context" / "dev.json").exists())
+        self.assertEqual(len(converter.context_store().context("dev")), 3)
+
+
+class TestProjectConfigTemplate(unittest.TestCase):
+    """Pruebas para el registro de ProjectConfig de la plantilla config.py"""
+
+    SKELETON_DIR = Path(__file__).resolve().parents[2]
+    TEMPLATE = SKELETON_DIR / "src" / "{module_name}" / "config.py.template"
+
+    def setUp(self):
+        """Renderizar e importar la plantilla con un directorio sin capas"""
+        self.temp_dir = TemporaryDirectory()
+        self.config_dir = str(Path(self.temp_dir.name) / "config")
+        module_path = Path(self.temp_dir.name) / "project_config.py"
+        module_path.write_text(
+            self.TEMPLATE.read_text(encoding="utf-8").replace(
+                "{module_name}", "proyecto"
+            ),
+            encoding="utf-8",
+        )
+
+        spec = importlib.util.spec_from_file_location("project_config", module_path)
+        module = importlib.util.module_from_spec(spec)
+        # La plantilla importa helpers.hg_aws_helpers desde el directorio del proyecto
+        with mock.patch.object(sys, "path", [str(self.SKELETON_DIR)] + sys.path):
+            spec.loader.exec_module(module)
+        self.ProjectConfig = module.ProjectConfig
+
+    def tearDown(self):
+        """Limpieza después de las pruebas"""
+        self.temp_dir.cleanup()
+
+    def _for_environments(self, environments):
+        """Obtener instancias compartidas desde varios hilos a la vez"""
+        barrier = threading.Barrier(len(environments), timeout=5)
+        instances = [None] * len(environments)
+
+        def get(position, environment):
+            barrier.wait()
+            instances[position] = self.ProjectConfig.for_environment(
+                environment, self.config_dir
+            )
+
+        threads = [
+            threading.Thread(target=get, args=item) for item in enumerate(environments)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return instances
+
+    def _counts(self):
+        """Número de cargas por ambiente"""
+        return {
+            environment: count
+            for (environment, _), count in self.ProjectConfig.load_counts.items()
+        }
+
+    def test_load_counts_with_invalidate(self):
+        """Probar que cada ambiente se carga una vez hasta que se invalida"""
+        instances = self._for_environments(["dev", "prod"] * 4)
+
+        self.assertEqual(self._counts(), {"dev": 1, "prod": 1})
+        self.assertTrue(all(i is instances[0] for i in instances[::2]))
+        self.assertEqual(instances[1].config.project.environment, "prod")
+
+        self.ProjectConfig.invalidate("dev", self.config_dir)
+        self._for_environments(["dev", "prod"] * 4)
+        self.assertEqual(self._counts(), {"dev": 2, "prod": 1})
+
+        self.ProjectConfig.invalidate()
+        self._for_environments(["dev", "prod"] * 4)
+        self.assertEqual(self._counts(), {"dev": 3, "prod": 2})
+
+    def test_unrepresentable_config_not_replaced_by_defaults(self):
+        """Probar que sin snapshot posible no se usan los valores por defecto"""
+        Path(self.config_dir).mkdir()
+        (Path(self.config_dir) / "base.toml").write_text(
+            '[project]\nname = "cargado"\nsince = 2024-01-31\n', encoding="utf-8"
+        )
+
+        with self.assertWarns(RuntimeWarning):
+            config = self.ProjectConfig("dev", self.config_dir).config
+
+        self.assertEqual(config.project.name, "cargado")
+        self.assertEqual(config.project.since, datetime.date(2024, 1, 31))
+
+    def test_context_store_created_once(self):
+        """Probar que el almacén de contexto se crea una vez por instancia"""
+        config = self.ProjectConfig("dev", self.config_dir)
+        self.assertIs(config.context_store, config.context_store)
+        self.assertEqual(config.cdk_context(), {})
+
 
 if __name__ == "__main__":
     unittest.main()
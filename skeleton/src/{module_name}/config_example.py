@@ -60,12 +60,10 @@ def demo_configuration_usage():
     # 8. Comparar con configuración de producción
     print("\n🚀 8. Comparación con configuración de producción:")
     prod_config = get_project_config("prod")
-    prod_config_obj = prod_config.config
     
     print("   Diferencias clave:")
-    print(f"   • NAT Gateways - Dev: {config.network.nat_gateways}, Prod: {prod_config_obj.network.nat_gateways}")
-    print(f"   • DB Multi-AZ - Dev: {config.database.get('multi_az', False)}, Prod: {prod_config_obj.database.get('multi_az', False)}")
-    print(f"   • Monitoreo detallado - Dev: {config.monitoring.detailed_monitoring}, Prod: {prod_config_obj.monitoring.detailed_monitoring}")
+    for path, (dev_value, prod_value) in dev_config.diff(prod_config).items():
+        print(f"   • {path} - Dev: {dev_value}, Prod: {prod_value}")
     
     # 9. Demostrar exportación a CDK context
     print("\n📤 9. Exportación a CDK context:")